@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import numpy as np
+from PIL import Image
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+sys.path.insert(0, SRC_DIR)
+
+LOADERS = ('full', 'reduced')
+
+
+def make_synthetic_image(path, megapixels):
+    """
+    Write a smooth synthetic photo-like image with the given pixel count.
+
+    :param path: str, output path; the format follows the extension
+    :param megapixels: float, number of pixels in millions
+    """
+    height = int((megapixels * 1e6 * 3 / 4) ** 0.5)
+    width = int(height * 4 / 3)
+    y = np.linspace(0, 255, height, dtype=np.float32)[:, None]
+    x = np.linspace(0, 255, width, dtype=np.float32)[None, :]
+    img = np.empty((height, width, 3), dtype=np.uint8)
+    img[:, :, 0] = x
+    img[:, :, 1] = y
+    img[:, :, 2] = (x + y) / 2
+    Image.fromarray(img).save(path, quality=90)
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and in kilobytes elsewhere
+    return peak / 1e6 if sys.platform == 'darwin' else peak / 1e3
+
+
+def run_loader(loader, image_path, width):
+    """
+    Decode an image in the current process and report its cost.
+
+    :param loader: str, 'full' for the previous skimage.io.imread path or 'reduced' for ImageHandler
+    :param image_path: str, path to the image
+    :param width: int, ASCII output width used by the reduced loader
+    :return: dict with decode time, peak RSS and decoded shape
+    """
+    from skimage import io
+    from ascii_art.image_handler import ImageHandler
+
+    baseline_mb = peak_rss_mb()
+    start = time.perf_counter()
+    if loader == 'full':
+        img = io.imread(image_path)
+    else:
+        img = ImageHandler('file', image_path, target_width=width).load_image()
+    elapsed = time.perf_counter() - start
+    return {
+        'loader': loader,
+        'seconds': elapsed,
+        'peak_rss_mb': peak_rss_mb(),
+        'peak_rss_delta_mb': peak_rss_mb() - baseline_mb,
+        'shape': list(img.shape),
+    }
+
+
+def run_child(*args):
+    """
+    Run this script in a fresh interpreter. Linux keeps ru_maxrss across
+    exec, so anything memory hungry, including generating the synthetic
+    image, happens in a child rather than in the parent.
+    """
+    return subprocess.check_output([sys.executable, os.path.abspath(__file__), *args])
+
+
+def measure(loader, image_path, width):
+    return json.loads(run_child('--child', loader, '--image', image_path, '--width', str(width)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare full and reduced-resolution image decoding.')
+    parser.add_argument('--image', type=str, default=None, help='Image to decode (default: synthetic JPEG)')
+    parser.add_argument('--megapixels', type=float, default=50, help='Size of the synthetic image (default: 50)')
+    parser.add_argument('--width', type=int, default=100, help='ASCII output width (default: 100)')
+    parser.add_argument('--child', choices=LOADERS, help=argparse.SUPPRESS)
+    parser.add_argument('--generate', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_loader(args.child, args.image, args.width)))
+        return
+    if args.generate:
+        make_synthetic_image(args.image, args.megapixels)
+        return
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        image_path = args.image
+        if image_path is None:
+            image_path = os.path.join(temp_dir, f'synthetic_{args.megapixels:g}mp.jpg')
+            run_child('--generate', '--image', image_path, '--megapixels', str(args.megapixels))
+
+        print(f'{os.path.basename(image_path)} at {args.width} columns')
+        for loader in LOADERS:
+            result = measure(loader, image_path, args.width)
+            print(f"{loader:>8}: {result['seconds'] * 1000:8.1f} ms, "
+                  f"peak RSS {result['peak_rss_mb']:7.1f} MB (+{result['peak_rss_delta_mb']:.1f} MB), "
+                  f"decoded {'x'.join(map(str, result['shape']))}")
+
+
+if __name__ == '__main__':
+    main()
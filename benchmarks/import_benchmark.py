@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+MAIN_SCRIPT = os.path.join(SRC_DIR, 'main.py')
+
+
+def best_wall_time(command, repeat):
+    """
+    Run a command several times and report the fastest run.
+
+    :param command: list of str, command line to run
+    :param repeat: int, number of runs
+    :return: float, best wall time in seconds
+    """
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(command, stdout=subprocess.DEVNULL, check=True)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Check the CLI startup time against a budget.')
+    parser.add_argument('--repeat', type=int, default=10, help='Runs per command, best time is kept (default: 10)')
+    parser.add_argument('--budget-ms', type=float, default=200,
+                        help='Allowed startup time of "main.py -h" on top of a bare interpreter (default: 200)')
+    args = parser.parse_args()
+
+    interpreter = best_wall_time([sys.executable, '-c', 'pass'], args.repeat)
+    cli_help = best_wall_time([sys.executable, MAIN_SCRIPT, '-h'], args.repeat)
+    overhead_ms = (cli_help - interpreter) * 1000
+    print(f'interpreter: {interpreter * 1000:7.1f} ms')
+    print(f'main.py -h:  {cli_help * 1000:7.1f} ms (+{overhead_ms:.1f} ms, budget {args.budget_ms:g} ms)')
+
+    if overhead_ms > args.budget_ms:
+        print(f'REGRESSION startup overhead {overhead_ms:.1f} ms exceeds the {args.budget_ms:g} ms budget')
+        sys.exit(1)
+    print('Startup is within budget')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+import numpy as np
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+sys.path.insert(0, SRC_DIR)
+
+from ascii_art.animation import Animation
+from ascii_art.ascii_handler import AsciiHandler, CHARACTER_ASPECT_RATIO
+from ascii_art.color_manager import ColorPalettes
+from ascii_art.recording import Recording, write_recording
+from ascii_art.terminal_renderer import DeltaRenderer
+
+
+def synthetic_frames(handler, num_frames, height=480, width=640):
+    """
+    Convert a synthetic animation of a square moving over a slowly shifting gradient.
+
+    :param handler: AsciiHandler used for the conversion
+    :param num_frames: int, number of frames
+    :return: list of (AsciiFrame, duration in ms)
+    """
+    y = np.linspace(0, 255, height, dtype=np.float32)[:, None]
+    x = np.linspace(0, 255, width, dtype=np.float32)[None, :]
+    num_rows = max(1, int(height * (handler.width / width) * CHARACTER_ASPECT_RATIO))
+    frames = []
+    for index in range(num_frames):
+        img = np.empty((height, width, 3), dtype=np.uint8)
+        img[:, :, 0] = (x + index) % 256
+        img[:, :, 1] = y
+        img[:, :, 2] = 128
+        left = index * 5 % (width - 80)
+        img[200:280, left:left + 80] = (240, 240, 40)
+        frames.append((handler.generate_frame(img, num_rows, handler.width, False), 40))
+    return frames
+
+
+def timed(function):
+    start = time.perf_counter()
+    result = function()
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure recording size, playback cost and seek latency.')
+    parser.add_argument('--image', type=str, default=None,
+                        help='Animated image to record (default: synthetic animation)')
+    parser.add_argument('--frames', type=int, default=300, help='Frames of the synthetic animation (default: 300)')
+    parser.add_argument('--width', type=int, default=120, help='ASCII output width (default: 120)')
+    parser.add_argument('--palette', type=ColorPalettes, choices=list(ColorPalettes), default=ColorPalettes.xterm256,
+                        help='Color palette (default: xterm256)')
+    parser.add_argument('--seeks', type=int, default=100, help='Random seeks to time (default: 100)')
+    args = parser.parse_args()
+
+    handler = AsciiHandler(None, args.width, palette=args.palette)
+    if args.image:
+        frames, convert_seconds = timed(lambda: list(Animation(args.image, handler, adaptive_hist_eq=True).frames()))
+    else:
+        frames, convert_seconds = timed(lambda: synthetic_frames(handler, args.frames))
+    num_frames = len(frames)
+
+    with tempfile.TemporaryDirectory() as temp_dir, open(os.devnull, 'w') as devnull:
+        path = os.path.join(temp_dir, 'benchmark.arec')
+        recorder, record_seconds = timed(lambda: write_recording(frames, path))
+        ansi_bytes = sum(len(handler.renderer.render(frame)) for frame, _ in frames)
+
+        recording = Recording(path)
+        renderer = DeltaRenderer(recording.frame(0).color_manager, devnull)
+        _, play_seconds = timed(lambda: [renderer.write_frame(frame) for frame, _ in recording.frames()])
+        decoded, decode_seconds = timed(lambda: list(recording.frames()))
+        if [frame.to_bytes() for frame, _ in decoded] != [frame.to_bytes() for frame, _ in frames]:
+            raise AssertionError('Recorded frames differ from the converted ones')
+
+        seek_times = []
+        for position in random.Random(0).choices(range(num_frames), k=args.seeks):
+            recording.decoded = None
+            seek_times.append(timed(lambda: recording.frame(position))[1])
+        recording.close()
+        file_bytes = os.path.getsize(path)
+
+    print(f"{num_frames} frames at {args.width} columns, {args.palette.value}")
+    print(f"{'grids':>10}: {recorder.raw_bytes / num_frames:10.0f} bytes/frame")
+    print(f"{'ansi':>10}: {ansi_bytes / num_frames:10.0f} bytes/frame")
+    print(f"{'recording':>10}: {file_bytes / num_frames:10.0f} bytes/frame "
+          f"({recorder.raw_bytes / file_bytes:.0f}x smaller than the grids)")
+    print(f"{'convert':>10}: {convert_seconds / num_frames * 1000:10.2f} ms/frame")
+    print(f"{'record':>10}: {record_seconds / num_frames * 1000:10.2f} ms/frame")
+    print(f"{'decode':>10}: {decode_seconds / num_frames * 1000:10.2f} ms/frame")
+    print(f"{'play':>10}: {play_seconds / num_frames * 1000:10.2f} ms/frame, decoding and rendering")
+    print(f"{'seek':>10}: {np.mean(seek_times) * 1000:10.2f} ms mean, {np.max(seek_times) * 1000:.2f} ms max")
+
+
+if __name__ == '__main__':
+    main()
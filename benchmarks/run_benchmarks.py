@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+sys.path.insert(0, SRC_DIR)
+
+from ascii_art.artifact_cache import artifact_cache
+from ascii_art.ascii_handler import AsciiHandler, CHARACTER_ASPECT_RATIO
+from ascii_art.color_manager import ColorManager, ColorPalettes
+from ascii_art.image_handler import ImageHandler
+
+# cv2 is imported lazily by the package; load it up front so that its import
+# time is not charged to the first CLAHE measurement
+import cv2  # noqa: E402,F401
+
+BUNDLED_IMAGE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'asciiart1.gif')
+IMAGE_SIZES = {
+    'thumbnail': (120, 160),
+    '1mp': (866, 1155),
+    '12mp': (3000, 4000),
+    '50mp': (6124, 8165),
+}
+WIDTHS = (40, 100, 200, 400)
+MIN_TIME_REGRESSION = 0.001
+
+
+def synthetic_image(height, width, seed=0):
+    """
+    Create a deterministic photo-like test image with gradients, shapes and noise.
+
+    :param height: int, image height in pixels
+    :param width: int, image width in pixels
+    :param seed: int, optional random seed (default: 0)
+    :return: numpy.ndarray of shape (height, width, 3) and dtype uint8
+    """
+    rng = np.random.default_rng(seed)
+    y = np.linspace(0, 1, height, dtype=np.float32)[:, None]
+    x = np.linspace(0, 1, width, dtype=np.float32)[None, :]
+    img = np.empty((height, width, 3), dtype=np.uint8)
+    img[:, :, 0] = 255 * x
+    img[:, :, 1] = 255 * y
+    img[:, :, 2] = 127 + 127 * np.sin(12 * x) * np.cos(9 * y)
+    img[(x - 0.5) ** 2 + (y - 0.5) ** 2 < 0.05] = (230, 40, 40)
+    img[height // 3:height // 3 + max(1, height // 50)] = 255
+    noise = rng.integers(0, 16, size=(height, 1, 1), dtype=np.uint8)
+    img -= np.minimum(img, noise)
+    return img
+
+
+def load_images(sizes):
+    images = {}
+    for name in sizes:
+        if name == 'bundled':
+            images[name] = ImageHandler('file', BUNDLED_IMAGE).load_image()
+        else:
+            images[name] = synthetic_image(*IMAGE_SIZES[name])
+    return images
+
+
+def measure(function, repeat):
+    """
+    Run a function several times and report the best wall time, then once
+    more with tracemalloc on for its peak traced memory. Tracing slows down
+    every allocation, so it stays off while timing.
+
+    :return: tuple of (result, seconds, peak bytes)
+    """
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        elapsed = time.perf_counter() - start
+        best = min(best, elapsed)
+    tracemalloc.start()
+    try:
+        function()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, best, peak
+
+
+def benchmark_case(image_name, img, width, palette, repeat, threads=(1,)):
+    results = []
+
+    def record(stage, seconds, peak, output_bytes=None):
+        results.append({
+            'image': image_name, 'megapixels': round(img.shape[0] * img.shape[1] / 1e6, 3),
+            'width': width, 'palette': palette.value, 'stage': stage,
+            'seconds': seconds, 'peak_bytes': peak, 'output_bytes': output_bytes,
+        })
+
+    def build_color_manager():
+        # Builds the palette lookup table here from scratch, so that it is
+        # neither loaded from an earlier run nor charged to the convert stage
+        ColorManager._lookup_tables.clear()
+        artifact_cache.clear()
+        color_manager = ColorManager(palette)
+        if palette not in (ColorPalettes.truecolor, ColorPalettes.xterm256):
+            color_manager.lookup_table()
+        return color_manager
+
+    color_manager, seconds, peak = measure(build_color_manager, repeat)
+    record('color_manager', seconds, peak)
+
+    handler = AsciiHandler(img, width, color_manager=color_manager)
+    equalized, seconds, peak = measure(lambda: handler.adaptive_histogram_equalization(img), repeat)
+    record('clahe', seconds, peak)
+
+    num_rows = max(1, int(img.shape[0] * (width / img.shape[1]) * CHARACTER_ASPECT_RATIO))
+    frame, seconds, peak = measure(lambda: handler.generate_frame(equalized, num_rows, width, False), repeat)
+    record('convert', seconds, peak)
+
+    for thread_count in threads:
+        if thread_count == 1:
+            continue
+        threaded_handler = AsciiHandler(img, width, color_manager=color_manager, threads=thread_count)
+        threaded_frame, seconds, peak = measure(
+            lambda: threaded_handler.generate_frame(equalized, num_rows, width, False), repeat)
+        threaded_handler.close()
+        if threaded_frame.to_bytes() != frame.to_bytes():
+            raise AssertionError(f'{image_name} at {width} columns differs on {thread_count} threads')
+        record(f'convert_{thread_count}t', seconds, peak)
+
+    data, seconds, peak = measure(lambda: handler.renderer.render(frame), repeat)
+    record('render', seconds, peak, len(data))
+    return results
+
+
+def case_key(result):
+    return (result['image'], result['width'], result['palette'], result['stage'])
+
+
+def compare(results, baseline, threshold):
+    """
+    Compare results against a stored baseline.
+
+    :param results: list of result dicts from this run
+    :param baseline: list of result dicts from a previous run
+    :param threshold: float, relative increase that counts as a regression
+    :return: list of human readable regression descriptions
+    """
+    baseline_by_key = {case_key(result): result for result in baseline}
+    regressions = []
+    for result in results:
+        previous = baseline_by_key.get(case_key(result))
+        if previous is None:
+            continue
+        for metric in ('seconds', 'peak_bytes', 'output_bytes'):
+            old, new = previous.get(metric), result.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            # Sub-millisecond stages are dominated by timer noise
+            if metric == 'seconds' and new - old < MIN_TIME_REGRESSION:
+                continue
+            if change > threshold:
+                regressions.append(f"{'/'.join(map(str, case_key(result)))} {metric}: "
+                                   f"{old:.4g} -> {new:.4g} (+{change:.0%})")
+    return regressions
+
+
+def print_table(results):
+    print(f"{'image':>10} {'width':>5} {'palette':>9} {'stage':>13} {'ms':>9} {'peak MB':>8} {'bytes':>8}")
+    for result in results:
+        output_bytes = result['output_bytes'] if result['output_bytes'] is not None else ''
+        print(f"{result['image']:>10} {result['width']:>5} {result['palette']:>9} {result['stage']:>13} "
+              f"{result['seconds'] * 1000:9.2f} {result['peak_bytes'] / 1e6:8.2f} {output_bytes:>8}")
+
+
+def print_scaling(results):
+    """
+    Print the speedup of every threaded conversion over the single-threaded one.
+
+    :param results: list of result dicts including convert_<n>t stages
+    """
+    single = {(r['image'], r['width'], r['palette']): r['seconds'] for r in results if r['stage'] == 'convert'}
+    print(f"\nthread scaling on {os.cpu_count()} CPUs")
+    print(f"{'image':>10} {'width':>5} {'palette':>9} {'threads':>7} {'ms':>9} {'speedup':>7}")
+    for result in results:
+        if not (result['stage'].startswith('convert_') and result['stage'].endswith('t')):
+            continue
+        baseline = single[(result['image'], result['width'], result['palette'])]
+        print(f"{result['image']:>10} {result['width']:>5} {result['palette']:>9} {result['stage'][8:-1]:>7} "
+              f"{result['seconds'] * 1000:9.2f} {baseline / result['seconds']:6.2f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the image to ASCII conversion hot path.')
+    parser.add_argument('--sizes', nargs='+', choices=list(IMAGE_SIZES) + ['bundled'],
+                        default=list(IMAGE_SIZES) + ['bundled'], help='Images to benchmark (default: all)')
+    parser.add_argument('--widths', nargs='+', type=int, default=list(WIDTHS),
+                        help='Output widths in characters (default: 40 100 200 400)')
+    parser.add_argument('--palettes', nargs='+', type=ColorPalettes, choices=list(ColorPalettes),
+                        default=list(ColorPalettes), help='Palettes to benchmark (default: all)')
+    parser.add_argument('--threads', nargs='+', type=int, default=[1],
+                        help='Also convert on these thread counts, checking that the output is identical '
+                             '(e.g. 1 2 4 8; default: 1)')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per stage, best time is kept (default: 3)')
+    parser.add_argument('--output', type=str, default=None, help='Write results to this JSON file')
+    parser.add_argument('--compare', type=str, default=None, help='Baseline JSON file to compare against')
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help='Relative increase reported as a regression (default: 0.25)')
+    args = parser.parse_args()
+
+    images = load_images(args.sizes)
+    results = []
+    with tempfile.TemporaryDirectory() as cache_dir:
+        # Lookup tables are cached in a scratch directory rather than the user's
+        artifact_cache.directory = cache_dir
+        for image_name, img in images.items():
+            for width in args.widths:
+                for palette in args.palettes:
+                    results.extend(benchmark_case(image_name, img, width, palette, args.repeat, args.threads))
+    print_table(results)
+    if any(thread_count > 1 for thread_count in args.threads):
+        print_scaling(results)
+
+    if args.output:
+        report = {
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'machine': platform.machine(),
+            'results': results,
+        }
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)['results']
+        regressions = compare(results, baseline, args.threshold)
+        for regression in regressions:
+            print(f'REGRESSION {regression}')
+        if regressions:
+            sys.exit(1)
+        print(f'No regressions against {args.compare}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+import argparse
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO
+import numpy as np
+from PIL import Image
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+sys.path.insert(0, SRC_DIR)
+
+from ascii_art.image_handler import ImageHandler  # noqa: E402
+from ascii_art.url_loader import UrlLoader  # noqa: E402
+
+
+def make_image_bytes(width, height, image_format, seed):
+    """
+    Encode a noisy gradient image.
+
+    :param width: int, image width in pixels
+    :param height: int, image height in pixels
+    :param image_format: str, Pillow format name such as 'JPEG' or 'PNG'
+    :param seed: int, random seed so that every image differs
+    :return: bytes of the encoded image
+    """
+    rng = np.random.default_rng(seed)
+    x = np.linspace(0, 255, width, dtype=np.float32)[None, :, None]
+    y = np.linspace(0, 255, height, dtype=np.float32)[:, None, None]
+    img = ((x + y) / 2 + rng.normal(0, 20, (height, width, 3))).clip(0, 255).astype(np.uint8)
+    buffer = BytesIO()
+    Image.fromarray(img).save(buffer, image_format)
+    return buffer.getvalue()
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    # Serves /<n>.<ext> from the images on the server after a fixed delay,
+    # sending the body in slices to mimic a slow link
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        name = self.path.lstrip('/')
+        data = self.server.images.get(name)
+        if data is None:
+            self.send_error(404)
+            return
+        time.sleep(self.server.latency)
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/octet-stream')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        slice_size = max(1, len(data) // self.server.slices)
+        try:
+            for start in range(0, len(data), slice_size):
+                self.wfile.write(data[start:start + slice_size])
+                time.sleep(self.server.latency / self.server.slices)
+        except ConnectionError:
+            # The client gave up, e.g. because the image exceeded its size limit
+            self.close_connection = True
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_stand_in_server(images, latency, slices):
+    """
+    Start a local HTTP server in a background thread.
+
+    :param images: dict of path name to image bytes
+    :param latency: float, seconds before each response, also spread over its body
+    :param slices: int, number of writes each body is split into
+    :return: tuple of (server, base URL)
+    """
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StandInHandler)
+    server.daemon_threads = True
+    server.images = images
+    server.latency = latency
+    server.slices = slices
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_address[1]}'
+
+
+def fetch_serial(urls, width):
+    # The previous behavior: one requests.get per image, no pooling
+    import requests
+    images = {}
+    for url in urls:
+        response = requests.get(url)
+        images[url] = ImageHandler('bytes', response.content, target_width=width).load_image()
+    return images
+
+
+def fetch_concurrent(urls, width, connections, connections_per_host):
+    images = {}
+
+    def collect(url, result):
+        if isinstance(result, Exception):
+            raise result
+        images[url] = result
+
+    UrlLoader(target_width=width, connections=connections,
+              connections_per_host=connections_per_host).load_all(urls, collect)
+    return images
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare serial and concurrent URL loading against a local server.')
+    parser.add_argument('--count', type=int, default=32, help='Number of images (default: 32)')
+    parser.add_argument('--size', type=str, default='1600x1200', help='Image size as WxH (default: 1600x1200)')
+    parser.add_argument('--format', choices=['JPEG', 'PNG', 'GIF', 'BMP'], default='JPEG',
+                        help='Image format (default: JPEG)')
+    parser.add_argument('--latency', type=float, default=0.05,
+                        help='Simulated seconds of server latency per image (default: 0.05)')
+    parser.add_argument('--width', type=int, default=100, help='ASCII output width (default: 100)')
+    parser.add_argument('--connections', type=int, default=16, help='Concurrent downloads (default: 16)')
+    parser.add_argument('--connections-per-host', type=int, default=8,
+                        help='Concurrent downloads per host (default: 8)')
+    args = parser.parse_args()
+
+    width, height = (int(part) for part in args.size.lower().split('x'))
+    extension = args.format.lower()
+    images = {f'{index}.{extension}': make_image_bytes(width, height, args.format, index)
+              for index in range(args.count)}
+    server, base_url = start_stand_in_server(images, args.latency, slices=8)
+    urls = [f'{base_url}/{name}' for name in images]
+    total_mb = sum(map(len, images.values())) / 1e6
+    print(f'{args.count} {args.format} images of {args.size}, {total_mb:.1f} MB, {args.latency * 1000:g} ms latency')
+
+    try:
+        start = time.perf_counter()
+        serial = fetch_serial(urls, args.width)
+        serial_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        concurrent = fetch_concurrent(urls, args.width, args.connections, args.connections_per_host)
+        concurrent_seconds = time.perf_counter() - start
+    finally:
+        server.shutdown()
+
+    print(f'    serial: {serial_seconds * 1000:8.1f} ms')
+    print(f'concurrent: {concurrent_seconds * 1000:8.1f} ms ({serial_seconds / concurrent_seconds:.1f}x)')
+    mismatched = [url for url in urls if not np.array_equal(serial[url], concurrent[url])]
+    if mismatched:
+        print(f'MISMATCH {len(mismatched)} images decoded differently, e.g. {mismatched[0]}')
+        sys.exit(1)
+    print('All images decoded identically')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+import argparse
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+sys.path.insert(0, SRC_DIR)
+
+from ascii_art.ascii_handler import AsciiHandler
+from ascii_art.strip_source import MemoryStrips, open_strip_source
+from ascii_art.viewer import PyramidViewer, TilePyramid
+
+# Zoom all the way in from the fitted view, pan around, zoom back out and
+# revisit the places already seen
+ZOOM_IN = ['+'] * 12
+PAN = ['l'] * 8 + ['j'] * 8 + ['h'] * 8 + ['k'] * 8
+KEYS = ZOOM_IN + PAN + ['-'] * 4 + PAN + ['f'] + ZOOM_IN + PAN
+
+
+def make_synthetic_image(path, megapixels):
+    """
+    Write a smooth synthetic image with fine detail as an NPY file.
+
+    :param path: str, output path
+    :param megapixels: float, number of pixels in millions
+    """
+    height = int((megapixels * 1e6 * 3 / 4) ** 0.5)
+    width = int(height * 4 / 3)
+    img = np.lib.format.open_memmap(path, mode='w+', dtype=np.uint8, shape=(height, width, 3))
+    x = np.arange(width, dtype=np.float32)
+    for start in range(0, height, 1024):
+        y = np.arange(start, min(start + 1024, height), dtype=np.float32)[:, None]
+        img[start:start + len(y), :, 0] = x * 255 / width
+        img[start:start + len(y), :, 1] = y * 255 / height
+        img[start:start + len(y), :, 2] = 128 + 127 * np.sin(x / 7) * np.cos(y / 5)
+    img.flush()
+
+
+def percentile_ms(times, q):
+    return np.percentile(times, q) * 1000 if times else 0.0
+
+
+def run_keys(source, viewport, memory_bytes):
+    """
+    Replay KEYS through a viewer drawing to /dev/null.
+
+    :param source: strip source of the image
+    :param viewport: (rows, columns) of the simulated terminal
+    :param memory_bytes: int, chunk memory budget of the pyramid
+    :return: dict with the first draw time, keypress times split by whether
+        they built new chunks, and the pyramid counters
+    """
+    with open(os.devnull, 'w') as devnull:
+        pyramid = TilePyramid(source, AsciiHandler(None, viewport[1]), memory_bytes=memory_bytes)
+        viewer = PyramidViewer(pyramid, stream=devnull, viewport=viewport)
+        start = time.perf_counter()
+        viewer.fit()
+        viewer.draw()
+        first_draw = time.perf_counter() - start
+
+        cached, building = [], []
+        for key in KEYS:
+            built = pyramid.counters['chunks_built']
+            start = time.perf_counter()
+            viewer.handle_key(key)
+            viewer.draw()
+            elapsed = time.perf_counter() - start
+            (building if pyramid.counters['chunks_built'] > built else cached).append(elapsed)
+    return {'first_draw': first_draw, 'cached': cached, 'building': building, 'counters': pyramid.counters}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure keypress latency of the zoom and pan viewer.')
+    parser.add_argument('--image', type=str, default=None,
+                        help='Image to view (default: synthetic NPY read in strips)')
+    parser.add_argument('--megapixels', type=float, default=100, help='Size of the synthetic image (default: 100)')
+    parser.add_argument('--viewport', type=str, default='40x120', help='Terminal ROWSxCOLUMNS (default: 40x120)')
+    parser.add_argument('--memory-bytes', type=int, default=64 << 20, help='Chunk memory budget (default: 64 MiB)')
+    parser.add_argument('--budget-ms', type=float, default=None,
+                        help='Exit with status 1 if the p95 latency of keypresses that reuse chunks exceeds this')
+    args = parser.parse_args()
+    viewport = tuple(int(part) for part in args.viewport.lower().split('x'))
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        image_path = args.image
+        if image_path is None:
+            image_path = os.path.join(temp_dir, f'synthetic_{args.megapixels:g}mp.npy')
+            make_synthetic_image(image_path, args.megapixels)
+            source = open_strip_source(image_path)
+        else:
+            from ascii_art.image_handler import ImageHandler
+            source = MemoryStrips(ImageHandler('file', image_path).load_image())
+        result = run_keys(source, viewport, args.memory_bytes)
+
+    height, width = source.shape[:2]
+    counters = result['counters']
+    print(f'{os.path.basename(image_path)} ({width}x{height}) in a {viewport[0]}x{viewport[1]} viewport')
+    print(f"{'first draw':>12}: {result['first_draw'] * 1000:8.1f} ms")
+    for name in ('cached', 'building'):
+        times = result[name]
+        print(f'{name:>12}: {len(times):4d} keys, p50 {percentile_ms(times, 50):7.1f} ms, '
+              f'p95 {percentile_ms(times, 95):7.1f} ms, max {percentile_ms(times, 100):7.1f} ms')
+    print(f"{'chunks':>12}: {counters['chunks_built']} built, {counters['chunk_hits']} reused, "
+          f"{counters['chunks_evicted']} evicted")
+
+    if args.budget_ms is not None and percentile_ms(result['cached'], 95) > args.budget_ms:
+        print(f'Keypresses exceed the {args.budget_ms:g} ms budget', file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
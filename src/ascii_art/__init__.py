@@ -1,4 +1,37 @@
-from ascii_art.ascii_handler import AsciiHandler
-from ascii_art.cli import get_cli_arguments
-from ascii_art.color_manager import ColorManager, ColorPalettes
-from ascii_art.image_handler import ImageHandler
+import importlib
+
+# Public names and the modules that define them. Modules are imported on first
+# access (PEP 562) so that a CLI invocation only pays for the backends it uses.
+_EXPORTS = {
+    "Animation": "ascii_art.animation",
+    "AsciiFrame": "ascii_art.ascii_frame",
+    "AsciiHandler": "ascii_art.ascii_handler",
+    "BatchConverter": "ascii_art.batch",
+    "get_cli_arguments": "ascii_art.cli",
+    "ColorManager": "ascii_art.color_manager",
+    "ColorPalettes": "ascii_art.options",
+    "ImageHandler": "ascii_art.image_handler",
+    "PyramidViewer": "ascii_art.viewer",
+    "Recorder": "ascii_art.recording",
+    "Recording": "ascii_art.recording",
+    "TilePyramid": "ascii_art.viewer",
+    "ConversionServer": "ascii_art.server",
+    "ConversionService": "ascii_art.server",
+    "TerminalRenderer": "ascii_art.terminal_renderer",
+    "DeltaRenderer": "ascii_art.terminal_renderer",
+    "VideoStream": "ascii_art.video_stream",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_EXPORTS[name]), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,104 @@
+import sys
+import time
+from PIL import Image
+from ascii_art.image_handler import ImageHandler
+from ascii_art.profiler import profiler
+from ascii_art.recording import write_recording
+from ascii_art.terminal_renderer import DeltaRenderer
+from ascii_art.video_stream import CLEAR_SCREEN, HIDE_CURSOR, SHOW_CURSOR
+from ascii_art.writers import write_animated_html, write_animated_text, write_glyph_gif
+
+# Browsers and most viewers show GIF frames without a delay for this long
+DEFAULT_FRAME_DURATION = 100
+
+
+def is_animated(path):
+    with Image.open(path) as img:
+        return getattr(img, "n_frames", 1) > 1
+
+
+def iter_frames(path, target_width=None):
+    # Yields (image array, duration in ms) for every frame of an animated
+    # GIF, PNG or WebP. Frames are decoded one at a time as they are
+    # consumed, so memory does not depend on the number of frames.
+    handler = ImageHandler("file", path, target_width=target_width)
+    with Image.open(path) as img:
+        for index in range(getattr(img, "n_frames", 1)):
+            with profiler.span("decode_image"):
+                img.seek(index)
+                frame = handler.reduce_image(img)
+            yield frame, img.info.get("duration") or DEFAULT_FRAME_DURATION
+
+
+def play_frames(frames, color_manager, monochrome=False, loop=False, stream=None):
+    # Shows every (frame, duration in ms) pair that frames() yields at its
+    # duration, calling frames() again for every loop. The next frame is
+    # produced while the current one is on screen; when that takes longer
+    # than the frame duration, playback slows down instead of dropping frames.
+    renderer = DeltaRenderer(color_manager, stream)
+    renderer.write((CLEAR_SCREEN + HIDE_CURSOR).encode())
+    frames_shown = 0
+    late_frames = 0
+    try:
+        while True:
+            due = time.perf_counter()
+            for frame, duration in frames():
+                delay = due - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                else:
+                    if frames_shown:
+                        late_frames += 1
+                    due = time.perf_counter()
+                renderer.write_frame(frame.monochrome() if monochrome else frame)
+                frames_shown += 1
+                due += duration / 1000
+            time.sleep(max(0.0, due - time.perf_counter()))
+            if not loop:
+                break
+    except KeyboardInterrupt:
+        pass
+    finally:
+        renderer.write(SHOW_CURSOR.encode())
+        print(f"{frames_shown} frames, {late_frames} late", file=sys.stderr)
+
+
+class Animation:
+    def __init__(self, path, ascii_handler, adaptive_hist_eq=False, invert=False):
+        self.path = path
+        self.ascii_handler = ascii_handler
+        self.adaptive_hist_eq = adaptive_hist_eq
+        self.invert = invert
+
+    def frames(self):
+        # Converts the frames as they are decoded. The handler, and with it the
+        # palette lookup table, character ramp and CLAHE state, is shared by
+        # all frames; a result cache also skips frames repeated in a loop.
+        handler = self.ascii_handler
+        try:
+            for img, duration in iter_frames(self.path, handler.width):
+                handler.img = img
+                yield handler.image_to_frame(adaptive_hist_eq=self.adaptive_hist_eq, invert=self.invert), duration
+        finally:
+            handler.img = None
+
+    def play(self, monochrome=False, loop=False, stream=None):
+        play_frames(self.frames, self.ascii_handler.color_manager, monochrome, loop, stream)
+
+    def save_text(self, output_path, compress=False):
+        write_animated_text(self.frames(), output_path, compress)
+
+    def save_html(self, output_path, compress=False):
+        write_animated_html(self.frames(), self.ascii_handler.color_manager, output_path, compress)
+
+    def save_recording(self, output_path, monochrome=False):
+        frames = self.frames()
+        if monochrome:
+            frames = ((frame.monochrome(), duration) for frame, duration in frames)
+        return write_recording(frames, output_path)
+
+    def save_gif(self, output_path, monochrome=False, font_path=None):
+        frames = self.frames()
+        if monochrome:
+            frames = ((frame.monochrome(), duration) for frame, duration in frames)
+        write_glyph_gif(frames, output_path, font_path=font_path)
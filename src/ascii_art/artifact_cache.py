@@ -0,0 +1,113 @@
+import hashlib
+import os
+import tempfile
+import numpy as np
+
+CACHE_DIR = os.path.join(os.environ.get("XDG_CACHE_HOME", os.path.expanduser("~/.cache")), "img2ascii")
+# Bump when the layout or meaning of any cached artifact changes; older
+# versions live in their own directory and are never read again
+CACHE_VERSION = 1
+CACHE_MAX_BYTES_ENV_VAR = "IMG2ASCII_CACHE_MAX_BYTES"
+DEFAULT_CACHE_MAX_BYTES = 64 << 20
+
+
+def file_digest(path, chunk_size=1 << 20):
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ArtifactCache:
+    def __init__(self, cache_dir=CACHE_DIR, max_bytes=None):
+        self.directory = os.path.join(cache_dir, f"v{CACHE_VERSION}")
+        if max_bytes is None:
+            max_bytes = int(os.environ.get(CACHE_MAX_BYTES_ENV_VAR, DEFAULT_CACHE_MAX_BYTES))
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+    def path_for(self, kind, key):
+        # key is any tuple whose repr identifies the inputs of the artifact
+        digest = hashlib.sha1(repr(key).encode()).hexdigest()[:20]
+        return os.path.join(self.directory, f"{kind}-{digest}.npy")
+
+    def load(self, kind, key):
+        path = self.path_for(kind, key)
+        try:
+            array = np.load(path, mmap_mode="r")
+        except (OSError, ValueError):
+            return None
+        try:
+            # The modification time doubles as the last use time for eviction
+            os.utime(path)
+        except OSError:
+            pass
+        return array
+
+    def store(self, kind, key, array):
+        path = self.path_for(kind, key)
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            # Written under a temporary name so that concurrent processes
+            # never map a partially written file
+            fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    np.save(f, array)
+                os.replace(temp_path, path)
+            except BaseException:
+                os.unlink(temp_path)
+                raise
+        except OSError:
+            return
+        self.evict()
+
+    def get_or_create(self, kind, key, build):
+        array = self.load(kind, key)
+        if array is not None:
+            self.hits += 1
+            return array
+        self.misses += 1
+        array = build()
+        self.store(kind, key, array)
+        return array
+
+    def entries(self):
+        entries = []
+        try:
+            with os.scandir(self.directory) as it:
+                for entry in it:
+                    if entry.name.endswith(".npy"):
+                        try:
+                            stat = entry.stat()
+                        except OSError:
+                            continue
+                        entries.append((stat.st_mtime, stat.st_size, entry.path))
+        except OSError:
+            pass
+        return entries
+
+    def evict(self):
+        # Removes the least recently used artifacts until the cache fits
+        entries = sorted(self.entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.unlink(path)
+            except OSError:
+                continue
+            total -= size
+
+    def clear(self):
+        for _, _, path in self.entries():
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+
+
+artifact_cache = ArtifactCache()
@@ -0,0 +1,158 @@
+import struct
+import numpy as np
+from ascii_art.color_manager import ColorManager
+
+FRAME_MAGIC = b"AFRM"
+FRAME_VERSION = 1
+# magic, version, rows, columns, glyph itemsize, color itemsize (0 for a
+# monochrome frame), palette name length, ramp length in bytes
+FRAME_HEADER = struct.Struct("<4sBIIBBBI")
+
+
+class AsciiFrame:
+    # A converted image as two index grids: glyphs indexes chars, the
+    # character ramp, and colors indexes the palette of color_manager (packed
+    # 0xRRGGBB for truecolor) or is None for a monochrome frame. Slicing a
+    # frame returns a frame viewing the same grids.
+    def __init__(self, glyphs, colors, chars, color_manager=None):
+        self.glyphs = glyphs
+        self.colors = colors
+        self.chars = np.asarray(chars)
+        self.color_manager = color_manager
+        self._ramp_codepoints = None
+
+    @classmethod
+    def from_maps(cls, ascii_map, color_map=None, color_manager=None):
+        # Builds a frame from a nested list of characters and an array of RGB
+        # colors, which are quantized to color_manager's palette
+        cells = np.array(ascii_map, dtype=str)
+        chars, glyphs = np.unique(cells.ravel(), return_inverse=True)
+        glyphs = glyphs.reshape(cells.shape).astype(np.uint8 if len(chars) <= 256 else np.uint16)
+        colors = None
+        if color_map is not None:
+            colors, _ = color_manager.quantize(color_map)
+        return cls(glyphs, colors, chars, color_manager)
+
+    @classmethod
+    def from_buffer(cls, buffer, color_manager=None):
+        # Inverse of to_bytes. The grids are read-only views of buffer, which
+        # may be any object supporting the buffer protocol (bytes, mmap, ...)
+        buffer = memoryview(buffer).cast("B")
+        magic, version, rows, columns, glyph_size, color_size, palette_length, ramp_length = \
+            FRAME_HEADER.unpack_from(buffer)
+        if magic != FRAME_MAGIC or version != FRAME_VERSION:
+            raise ValueError("Not an ASCII frame buffer")
+        offset = FRAME_HEADER.size
+        palette = bytes(buffer[offset:offset + palette_length]).decode("ascii")
+        offset += palette_length
+        chars = list(bytes(buffer[offset:offset + ramp_length]).decode("utf-8"))
+        offset += ramp_length
+        glyphs = np.frombuffer(buffer, dtype=f"<u{glyph_size}", count=rows * columns, offset=offset)
+        offset += glyphs.nbytes
+        colors = None
+        if color_size:
+            colors = np.frombuffer(buffer, dtype=f"<u{color_size}", count=rows * columns, offset=offset)
+            colors = colors.reshape(rows, columns)
+            if color_manager is None:
+                color_manager = ColorManager(palette)
+        return cls(glyphs.reshape(rows, columns), colors, chars, color_manager)
+
+    @property
+    def shape(self):
+        return self.glyphs.shape
+
+    def __len__(self):
+        return self.glyphs.shape[0]
+
+    def __getitem__(self, key):
+        # Integer indices select a single row or column but keep the grid 2D
+        if not isinstance(key, tuple):
+            key = (key,)
+        key = tuple(slice(index, index + 1 or None) if isinstance(index, (int, np.integer)) else index
+                    for index in key)
+        colors = self.colors[key] if self.colors is not None else None
+        frame = AsciiFrame(self.glyphs[key], colors, self.chars, self.color_manager)
+        frame._ramp_codepoints = self._ramp_codepoints
+        return frame
+
+    def monochrome(self):
+        frame = AsciiFrame(self.glyphs, None, self.chars, self.color_manager)
+        frame._ramp_codepoints = self._ramp_codepoints
+        return frame
+
+    @property
+    def ascii_map(self):
+        return self.chars[self.glyphs].tolist()
+
+    @property
+    def color_map(self):
+        if self.colors is None:
+            return None
+        return self.color_manager.palette_colors(self.colors)
+
+    def ramp_codepoints(self):
+        if self._ramp_codepoints is None:
+            self._ramp_codepoints = np.frombuffer("".join(self.chars.tolist()).encode("utf-32-le"), dtype=np.uint32)
+        return self._ramp_codepoints
+
+    def codepoints(self):
+        return self.ramp_codepoints()[self.glyphs]
+
+    def row_text(self, index):
+        return self.ramp_codepoints()[self.glyphs[index]].tobytes().decode("utf-32-le")
+
+    def color_keys(self, color_manager=None):
+        # Palette index of every cell in color_manager's palette, requantizing
+        # when the frame was converted with a different palette
+        if self.colors is None:
+            return None
+        if color_manager is not None and color_manager.palette_type != self.color_manager.palette_type:
+            keys, _ = color_manager.quantize(self.color_map)
+            return keys.astype(np.int64)
+        return self.colors.astype(np.int64)
+
+    def to_text(self):
+        # Builds the whole text as one UTF-32 buffer, a newline after every row
+        rows, columns = self.shape
+        text = np.empty((rows, columns + 1), dtype=np.uint32)
+        text[:, :columns] = self.codepoints()
+        text[:, columns] = ord("\n")
+        return text.tobytes().decode("utf-32-le")
+
+    def text_rows(self):
+        # Decodes one row at a time, so that writers streaming the rows never
+        # hold the whole text
+        for index in range(len(self)):
+            yield self.row_text(index)
+
+    def to_ansi(self):
+        from ascii_art.terminal_renderer import TerminalRenderer
+        return TerminalRenderer(self.color_manager).render(self).decode()
+
+    def to_html(self):
+        from ascii_art.writers import colored_html_rows
+        return "".join(colored_html_rows(self, None, self.color_manager))
+
+    def to_bytes(self):
+        glyphs = np.ascontiguousarray(self.glyphs)
+        glyphs = glyphs.astype(glyphs.dtype.newbyteorder("<"), copy=False)
+        colors = b""
+        color_size = 0
+        palette = ""
+        if self.colors is not None:
+            colors = np.ascontiguousarray(self.colors)
+            colors = colors.astype(colors.dtype.newbyteorder("<"), copy=False)
+            color_size = colors.dtype.itemsize
+            palette = self.color_manager.palette_type.value
+        ramp = "".join(self.chars.tolist()).encode("utf-8")
+        header = FRAME_HEADER.pack(FRAME_MAGIC, FRAME_VERSION, *self.shape, glyphs.dtype.itemsize, color_size,
+                                   len(palette), len(ramp))
+        return b"".join([header, palette.encode("ascii"), ramp, glyphs.data, memoryview(colors)])
+
+
+def as_frame(ascii_map, color_map=None, color_manager=None):
+    # Lets the renderers and writers take either a frame, whose own colors are
+    # used, or the nested list ascii_map with an RGB color_map
+    if isinstance(ascii_map, AsciiFrame):
+        return ascii_map
+    return AsciiFrame.from_maps(ascii_map, color_map, color_manager)
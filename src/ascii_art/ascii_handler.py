@@ -1,58 +1,236 @@
-import cv2
+import warnings
 import numpy as np
+from ascii_art.ascii_frame import AsciiFrame, as_frame
 from ascii_art.color_manager import ColorManager, ColorPalettes
-from skimage import exposure
-from skimage.filters import threshold_local
-from colorama import Fore, Back, Style
-import itertools
+from ascii_art.image_handler import MIN_PIXELS_PER_COLUMN
+from ascii_art.options import (CHARACTER_ASPECT_RATIO, DENSITY_MAP_16, DENSITY_MAP_256, RAMP_FILE_VERSION,
+                               load_ramp)
+from ascii_art.profiler import profiler
+from ascii_art.terminal_renderer import TerminalRenderer
+from ascii_art.writers import write_monochrome_text, write_colored_html
 
-DENSITY_MAP_256 = ' _,.`;\':-~"|!\/<()L>+J^=c*[{}]zirj1?syulvCIZt7oTx2Yng3pSqaeU5fVwEFOQXGmd9hHbD6PAk4%WB8K&N$#R0M@'
-DENSITY_MAP_16 = ' .,:"<+[?e=E*%#@'
-CHARACTER_ASPECT_RATIO = 0.4897959183673469
+# Upper bound on source elements reduced at once, which bounds the float32
+# working buffer that np.add.reduceat casts its input to
+AREA_REDUCE_CHUNK_ELEMENTS = 1 << 22
+# Source bytes read per strip when converting images too large for memory.
+# Reducing a strip takes a float32 copy of it, about five times this in all.
+STRIP_BYTES = 8 << 20
+
+
+def area_reduce_bins(values, num_bins, axis, first_bin, last_bin, size=None, offset=0):
+    # Averages values over bins first_bin..last_bin-1 of num_bins equal-width
+    # bins along axis. Bin edges may fall inside a pixel, in which case the
+    # pixel is split between the two bins in proportion to its overlap.
+    # values may hold only part of an axis of length size, starting at
+    # offset, as long as it covers the pixels of the requested bins.
+    if size is None:
+        size = values.shape[axis]
+    if num_bins > size:
+        # More bins than pixels: sample the pixel under each bin center
+        centers = ((np.arange(first_bin, last_bin) + 0.5) * size / num_bins).astype(int)
+        return np.take(values, centers - offset, axis=axis).astype(np.float32)
+
+    edges = np.arange(first_bin, last_bin + 1)
+    # First whole pixel after every edge, ceil(edge * size / num_bins) in integer math
+    starts = -(-edges * size // num_bins)
+    region = [slice(None)] * values.ndim
+    region[axis] = slice(starts[0] - offset, starts[-1] - offset)
+    sums = np.add.reduceat(values[tuple(region)], starts[:-1] - starts[0], axis=axis, dtype=np.float32)
+
+    # The pixel just before each edge's start straddles the edge. reduceat
+    # counts it fully in the bin on the left, so move the part lying right of
+    # the edge into the next bin.
+    shape = [1] * values.ndim
+    shape[axis] = -1
+    fractions = (starts - edges * size / num_bins).astype(np.float32).reshape(shape)
+    straddling = np.take(values, np.maximum(starts - 1, 0) - offset, axis=axis).astype(np.float32)
+    corrections = straddling * fractions
+    left = [slice(None)] * values.ndim
+    right = [slice(None)] * values.ndim
+    left[axis] = slice(None, -1)
+    right[axis] = slice(1, None)
+    sums += corrections[tuple(left)]
+    sums -= corrections[tuple(right)]
+    return sums * np.float32(num_bins / size)
+
+
+def area_reduce(values, num_bins, axis, first_bin=0, last_bin=None):
+    # Averages values into num_bins bins along axis, or into bins
+    # first_bin..last_bin-1 of them, a chunk of bins at a time
+    if last_bin is None:
+        last_bin = num_bins
+    shape = list(values.shape)
+    shape[axis] = last_bin - first_bin
+    reduced = np.empty(shape, dtype=np.float32)
+
+    elements_per_bin = max(1, values.size // num_bins)
+    bins_per_chunk = max(1, AREA_REDUCE_CHUNK_ELEMENTS // elements_per_bin)
+    index = [slice(None)] * values.ndim
+    for chunk_first in range(first_bin, last_bin, bins_per_chunk):
+        chunk_last = min(chunk_first + bins_per_chunk, last_bin)
+        index[axis] = slice(chunk_first - first_bin, chunk_last - first_bin)
+        reduced[tuple(index)] = area_reduce_bins(values, num_bins, axis, chunk_first, chunk_last)
+    return reduced
+
+
+def bin_pixel_range(first_bin, last_bin, num_bins, size):
+    # Pixels that bins first_bin..last_bin-1 of num_bins draw from, including
+    # the one straddling the first bin's edge
+    start = max(0, -(-first_bin * size // num_bins) - 1)
+    stop = min(size, -(-last_bin * size // num_bins))
+    return start, stop
+
+
+def reduce_strips(source, num_rows, num_columns, strip_bytes=STRIP_BYTES, row_bins=None, column_bins=None):
+    # Area-reduces a source too large for memory to a (num_rows, num_columns,
+    # channels) float32 grid, or to the part of it given by (first, last)
+    # row_bins and column_bins. The source is read in horizontal strips of
+    # about strip_bytes, each holding the pixels of a run of output rows, and
+    # every strip is reduced to those rows before the next one is read.
+    height, width, channels = source.shape
+    first_row, last_row = row_bins or (0, num_rows)
+    first_column, last_column = column_bins or (0, num_columns)
+    column_start, column_stop = bin_pixel_range(first_column, last_column, num_columns, width)
+    reduced = np.empty((last_row - first_row, last_column - first_column, channels), dtype=np.float32)
+    rows_per_strip = max(1, strip_bytes // ((column_stop - column_start) * channels))
+    bins_per_strip = max(1, rows_per_strip * num_rows // height)
+    for first_bin in range(first_row, last_row, bins_per_strip):
+        last_bin = min(first_bin + bins_per_strip, last_row)
+        start, stop = bin_pixel_range(first_bin, last_bin, num_rows, height)
+        strip = source.read_rows(start, stop, column_start, column_stop)
+        profiler.count("strip_bytes_read", strip.nbytes)
+        rows = area_reduce_bins(strip, num_rows, 0, first_bin, last_bin, size=height, offset=start)
+        reduced[first_bin - first_row:last_bin - first_row] = area_reduce_bins(
+            rows, num_columns, 1, first_column, last_column, size=width, offset=column_start)
+        del strip, rows
+        source.release()
+    return reduced
 
 
 class AsciiHandler:
-    def __init__(self, img, width, palette=ColorPalettes.xterm256, density_map=DENSITY_MAP_16):
+    def __init__(self, img, width, palette=ColorPalettes.xterm256, density_map=DENSITY_MAP_16, color_manager=None,
+                 glyph_matcher=None, result_cache=None, threads=1, character_aspect_ratio=CHARACTER_ASPECT_RATIO):
         if width <= 0:
             raise ValueError("Width should be greater than 0.")
         self.img = img
         self.width = width
         self.density_map = density_map
-        self.color_manager = ColorManager(palette)
+        self.density_chars = np.array(list(density_map))
+        # Width over height of the font's character cells, which sets how many
+        # rows keep the image's proportions
+        self.character_aspect_ratio = character_aspect_ratio
+        self.color_manager = color_manager if color_manager is not None else ColorManager(palette)
+        # Matches tiles to glyphs by shape instead of by mean intensity when set
+        self.glyph_matcher = glyph_matcher
+        # Skips the conversion of images already converted with the same settings
+        self.result_cache = result_cache
+        self.renderer = TerminalRenderer(self.color_manager)
+        # Number of row bands converted concurrently, and the pool converting
+        # them, created on first use
+        self.threads = max(1, threads)
+        self.thread_pool = None
+        # Created on first use and reused for every later image
+        self.clahe = None
 
     def adaptive_histogram_equalization(self, image_np):
+        import cv2
         lab = cv2.cvtColor(image_np, cv2.COLOR_RGB2LAB)
         l, a, b = cv2.split(lab)
-        clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
-        cl = clahe.apply(l)
+        if self.clahe is None:
+            self.clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
+        cl = self.clahe.apply(l)
         limg = cv2.merge((cl, a, b))
         return cv2.cvtColor(limg, cv2.COLOR_LAB2RGB)
 
     def preprocess_image(self, image_np, adaptive_hist_eq=False):
         if adaptive_hist_eq:
-            image_np = self.adaptive_histogram_equalization(image_np)
+            with profiler.span("adaptive_histogram_equalization"):
+                image_np = self.adaptive_histogram_equalization(image_np)
         return image_np
 
+    def char_set(self):
+        return self.glyph_matcher.char_array if self.glyph_matcher is not None else self.density_chars
+
+    def conversion_settings(self, adaptive_hist_eq, invert):
+        # Everything besides the image that determines the conversion result
+        glyphs = None
+        if self.glyph_matcher is not None:
+            glyphs = (self.glyph_matcher.glyph_size, self.glyph_matcher.digest)
+        return (self.width, self.color_manager.palette_type.value, ''.join(self.char_set()), glyphs,
+                bool(invert), bool(adaptive_hist_eq), self.character_aspect_ratio)
+
     def image_to_ascii(self, adaptive_hist_eq=False, invert=False):
-        img_np = self.img.copy()
+        # The ascii_map of characters and color_map of RGB values; prefer
+        # image_to_frame, which every renderer and writer takes directly
+        frame = self.image_to_frame(adaptive_hist_eq, invert)
+        return frame.ascii_map, frame.color_map
+
+    def image_to_frame(self, adaptive_hist_eq=False, invert=False):
+        with profiler.span("image_to_ascii"):
+            if self.result_cache is None:
+                return self.make_frame(*self.image_to_index_maps(adaptive_hist_eq, invert))
+
+            key = self.result_cache.key_for(self.img, self.conversion_settings(adaptive_hist_eq, invert))
+            cached = self.result_cache.get(key)
+            if cached is not None:
+                profiler.count("result_cache_hits")
+                return self.make_frame(*cached)
+            profiler.count("result_cache_misses")
+            char_indices, color_indices = self.image_to_index_maps(adaptive_hist_eq, invert)
+            self.result_cache.put(key, char_indices, color_indices)
+            return self.make_frame(char_indices, color_indices)
 
+    def image_to_index_maps(self, adaptive_hist_eq=False, invert=False):
         img_np = self.preprocess_image(
-            img_np, adaptive_hist_eq=adaptive_hist_eq)
+            self.img, adaptive_hist_eq=adaptive_hist_eq)
 
-        img_height, img_width, _ = img_np.shape
+        img_height, img_width = img_np.shape[:2]
         num_columns = self.width
 
         # Calculate the number of rows considering the pixel aspect ratio
-        num_rows = int(img_height * (num_columns / img_width)
-                       * CHARACTER_ASPECT_RATIO)
+        num_rows = max(1, int(img_height * (num_columns / img_width)
+                              * self.character_aspect_ratio))
 
-        column_step = img_width // num_columns
-        row_step = img_height // num_rows
+        return self.generate_index_maps(img_np, num_rows, num_columns, invert)
 
-        ascii_map, color_map = self.generate_ascii_and_color_maps(
-            img_np, num_rows, num_columns, row_step, column_step, invert)
+    def strips_to_frame(self, source, adaptive_hist_eq=False, invert=False):
+        # Converts a strip source (see strip_source) without loading it. The
+        # strips are reduced to the resolution ImageHandler decodes large
+        # images at, and that grid is converted like an in-memory image.
+        # CLAHE sees the whole grid at once, so its tiles and their
+        # interpolation do not depend on where strips start and end.
+        height, width = source.shape[:2]
+        num_columns = self.width
+        num_rows = max(1, int(height * (num_columns / width) * self.character_aspect_ratio))
+        factor = max(1, width // (num_columns * MIN_PIXELS_PER_COLUMN))
+        grid_rows, grid_columns = -(-height // factor), -(-width // factor)
+        with profiler.span("image_to_ascii"):
+            with profiler.span("reduce_strips"):
+                grid = reduce_strips(source, grid_rows, grid_columns)
+            if grid.shape[2] == 1:
+                grid = np.repeat(grid, 3, axis=2)
+            if adaptive_hist_eq:
+                grid = self.preprocess_image(np.rint(grid).astype(np.uint8), adaptive_hist_eq=True)
+            return self.generate_frame(grid, num_rows, num_columns, invert)
+
+    def make_frame(self, char_indices, color_indices):
+        return AsciiFrame(char_indices, color_indices, self.char_set(), self.color_manager)
 
-        return ascii_map, color_map
+    def reduce_tiles(self, img_np, num_rows, num_columns, row_bins=None):
+        # Mean color of every tile as a (num_rows, num_columns, channels)
+        # float32 grid, or of the rows of tiles given by (first, last)
+        # row_bins. Rows are reduced first since there are fewer output rows
+        # than columns, which keeps the intermediate buffer small.
+        first_row, last_row = row_bins or (0, num_rows)
+        profiler.count("tiles_processed", (last_row - first_row) * num_columns)
+        with profiler.span("reduce_tiles"):
+            if img_np.ndim == 2:
+                img_np = img_np[:, :, np.newaxis]
+            rows_reduced = area_reduce(img_np, num_rows, 0, first_row, last_row)
+            tiles = area_reduce(rows_reduced, num_columns, axis=1)
+            if tiles.shape[2] == 1:
+                tiles = np.repeat(tiles, 3, axis=2)
+            return tiles
 
     def select_character(self, tile_np):
         alpha = 1 if tile_np.shape[2] < 4 else np.mean(tile_np[:, :, 3]) / 255
@@ -69,53 +247,103 @@ class AsciiHandler:
         return self.density_map[index]
 
 
-    def generate_ascii_and_color_maps(self, img_np, num_rows, num_columns, row_step, column_step, invert):
-        # Resize the input image to have dimensions (num_rows * row_step, num_columns * column_step, 3)
-        img_np_resized = cv2.resize(img_np, (num_columns * column_step, num_rows * row_step))
-        
-        # Reshape the resized image to have dimensions (num_rows, num_columns, row_step, column_step, 3)
-        img_np_reshaped = img_np_resized.reshape(num_rows, row_step, num_columns, column_step, -1)
-        
-        # Calculate the means per tile and reshape the color_map_as_array to dimensions (num_rows, num_columns, 3)
-        color_map_as_array = np.mean(img_np_reshaped, axis=(1, 3))
-        
+    def generate_ascii_and_color_maps(self, img_np, num_rows, num_columns, row_step=None, column_step=None,
+                                      invert=False):
+        # row_step and column_step are ignored: tiles are area averages over
+        # the exact fraction of the image under each cell
+        if row_step is not None or column_step is not None:
+            warnings.warn("row_step and column_step are deprecated and ignored", DeprecationWarning, stacklevel=2)
+        frame = self.generate_frame(img_np, num_rows, num_columns, invert)
+        return frame.ascii_map, frame.color_map
+
+    def generate_frame(self, img_np, num_rows, num_columns, invert):
+        return self.make_frame(*self.generate_index_maps(img_np, num_rows, num_columns, invert))
+
+    def generate_index_maps(self, img_np, num_rows, num_columns, invert):
+        # Returns the index of every cell's character in char_set() and of its
+        # color in the palette, each in the smallest dtype that holds it.
+        # With several threads, bands of rows are converted concurrently
+        # straight into their part of the two grids. Every cell only depends
+        # on the pixels under it, so the result does not depend on the bands.
+        char_dtype = np.uint8 if len(self.char_set()) <= 256 else np.uint16
+        char_indices = np.empty((num_rows, num_columns), dtype=char_dtype)
+        color_indices = np.empty((num_rows, num_columns), dtype=self.color_manager.index_dtype())
+        num_bands = min(self.threads, num_rows)
+        edges = [band * num_rows // num_bands for band in range(num_bands + 1)]
+        bands = [(img_np, num_rows, num_columns, invert, first_row, last_row, char_indices, color_indices)
+                 for first_row, last_row in zip(edges[:-1], edges[1:])]
+        if num_bands == 1:
+            self.convert_band(*bands[0])
+        else:
+            # Raises the first exception of any band
+            list(self.band_pool().map(lambda band: self.convert_band(*band), bands))
+        return char_indices, color_indices
+
+    def band_pool(self):
+        if self.thread_pool is None:
+            from concurrent.futures import ThreadPoolExecutor
+            self.thread_pool = ThreadPoolExecutor(self.threads, thread_name_prefix="ascii-band")
+        return self.thread_pool
+
+    def close(self):
+        # Stops the band threads; the handler can still convert on one thread
+        # or start a new pool afterwards
+        if self.thread_pool is not None:
+            self.thread_pool.shutdown()
+            self.thread_pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def convert_band(self, img_np, num_rows, num_columns, invert, first_row, last_row, char_indices, color_indices):
+        # Converts rows first_row..last_row-1 of the grids
+        if self.glyph_matcher is not None:
+            # Sample every tile at the glyph bitmap resolution; the tile means
+            # are the means of those samples
+            glyph_width, glyph_height = self.glyph_matcher.glyph_size
+            samples = self.reduce_tiles(img_np, num_rows * glyph_height, num_columns * glyph_width,
+                                        row_bins=(first_row * glyph_height, last_row * glyph_height))
+            samples = samples.reshape(last_row - first_row, glyph_height, num_columns, glyph_width, -1)
+            samples = samples.transpose(0, 2, 1, 3, 4)
+            color_map_as_array = samples.mean(axis=(2, 3))
+        else:
+            color_map_as_array = self.reduce_tiles(img_np, num_rows, num_columns, row_bins=(first_row, last_row))
+
         if invert:
             color_map_as_array = 255 - color_map_as_array
 
-        # Create color_map by iterating through color_map_as_array and applying the closest_color function
-        color_map = []
-        for row in color_map_as_array:
-            color_row = []
-            for color in row:
-                color_row.append(self.color_manager.closest_color(color[:3], invert))
-            color_map.append(color_row)
-        color_map = np.array(color_map)
+        # Quantize every tile mean to the palette in one batch query
+        color_indices[first_row:last_row], _ = self.color_manager.quantize(color_map_as_array, invert)
 
-        # Calculate the grayscale intensities for each tile
-        intensities = np.dot(color_map_as_array[:, :, :3], [0.2989, 0.5870, 0.1140]) / 255
-    
-        indices = (intensities * (len(self.density_map) - 1)).astype(int)
-        
-        index_pairs = list(itertools.product(range(num_rows), range(num_columns)))
+        with profiler.span("select_glyphs"):
+            if self.glyph_matcher is not None:
+                sample_intensities = np.dot(samples[..., :3], [0.2989, 0.5870, 0.1140]) / 255
+                if invert:
+                    sample_intensities = 1 - sample_intensities
+                char_indices[first_row:last_row] = self.glyph_matcher.match(sample_intensities)
+            else:
+                # Calculate the grayscale intensities for each tile
+                intensities = np.dot(color_map_as_array[:, :, :3], [0.2989, 0.5870, 0.1140]) / 255
 
-        # Create the ASCII map using the grayscale intensities
-        ascii_map = [[self.density_map[indices[i, j]] for j in range(num_columns)] for i in range(num_rows)]
-        
-        return ascii_map, color_map
+                char_indices[first_row:last_row] = (intensities * (len(self.density_map) - 1)).astype(int)
 
 
     def print_monochrome_ascii(self, ascii_map):
-        for row in ascii_map:
-            print(''.join(row))
+        self.renderer.write_frame(as_frame(ascii_map).monochrome())
+
+    def print_colored_ascii(self, ascii_map, color_map=None):
+        self.renderer.write_frame(ascii_map, color_map)
+
+    def save_monochrome_ascii(self, ascii_map, output_path, compress=False):
+        write_monochrome_text(ascii_map, output_path, compress)
 
-    def print_colored_ascii(self, ascii_map, color_map):
-        for i, row in enumerate(ascii_map):
-            for j, char in enumerate(row):
-                color_code = self.color_manager.xterm256_color_code(*color_map[i][j])
-                print(self.color_manager.xterm256_color(char, color_code), end="")
-            print()
+    def save_colored_ascii_html(self, ascii_map, color_map, output_path, compress=False):
+        write_colored_html(ascii_map, color_map, self.color_manager, output_path, compress)
 
-    def print_ascii(self, ascii_map, color_map, monochrome=False):
+    def print_ascii(self, ascii_map, color_map=None, monochrome=False):
         if monochrome:
             self.print_monochrome_ascii(ascii_map)
         else:
@@ -0,0 +1,282 @@
+import glob
+import gzip
+import hashlib
+import json
+import os
+import queue
+import sys
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from multiprocessing.util import Finalize
+from urllib.parse import urlsplit
+from ascii_art.ascii_handler import CHARACTER_ASPECT_RATIO, AsciiHandler
+from ascii_art.color_manager import ColorManager, ColorPalettes
+from ascii_art.image_handler import ImageHandler
+from ascii_art.result_cache import DEFAULT_DISK_BYTES, ResultCache
+from ascii_art.url_loader import UrlLoader
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".gif", ".bmp", ".tif", ".tiff", ".webp")
+OUTPUT_EXTENSIONS = {"text": ".txt", "ansi": ".ans", "html": ".html"}
+# Settings every output in the output directory was converted with
+STAMPS_FILE = ".batch-stamps.json"
+
+# Per-process conversion state, built once by init_worker
+_worker = {}
+
+
+def is_url(path):
+    return path.startswith(("http://", "https://"))
+
+
+def url_relative_path(url):
+    # Outputs for URLs go under <host>/<path>; a query string gets a short
+    # hash so that URLs differing only in their query do not collide
+    parts = urlsplit(url)
+    path = parts.path.strip("/") or "index"
+    if parts.query:
+        path += "-" + hashlib.sha1(parts.query.encode()).hexdigest()[:8]
+    return os.path.join(parts.netloc.replace(":", "_"), *path.split("/"))
+
+
+def collect_inputs(paths):
+    # Returns (input path, path relative to its source root) pairs so that the
+    # output tree can mirror the input layout
+    inputs = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, filenames in os.walk(path):
+                for filename in sorted(filenames):
+                    if filename.lower().endswith(IMAGE_EXTENSIONS):
+                        file_path = os.path.join(root, filename)
+                        inputs.append((file_path, os.path.relpath(file_path, path)))
+        elif os.path.isfile(path):
+            inputs.append((path, os.path.basename(path)))
+        else:
+            # Treat anything else as a glob; outputs mirror the part after its
+            # last non-wildcard directory
+            root = path
+            while glob.has_magic(root):
+                root = os.path.dirname(root)
+            for file_path in sorted(glob.glob(path, recursive=True)):
+                if os.path.isfile(file_path) and file_path.lower().endswith(IMAGE_EXTENSIONS):
+                    inputs.append((file_path, os.path.relpath(file_path, root or ".")))
+    return inputs
+
+
+def output_path_for(relative_path, output_dir, output_format, compress=False):
+    extension = OUTPUT_EXTENSIONS[output_format] + (".gz" if compress else "")
+    return os.path.join(output_dir, os.path.splitext(relative_path)[0] + extension)
+
+
+def settings_stamp(settings):
+    return hashlib.sha1(repr(settings).encode()).hexdigest()[:16]
+
+
+def load_stamps(output_dir):
+    try:
+        with open(os.path.join(output_dir, STAMPS_FILE)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_stamps(output_dir, stamps):
+    os.makedirs(output_dir, exist_ok=True)
+    path = os.path.join(output_dir, STAMPS_FILE)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "w") as f:
+        json.dump(stamps, f, indent=0, sort_keys=True)
+    os.replace(temp_path, path)
+
+
+def is_up_to_date(input_path, output_path, stamp, recorded_stamp):
+    # An output converted with other settings is out of date however new it is
+    return (recorded_stamp == stamp and os.path.exists(output_path)
+            and os.path.getmtime(output_path) >= os.path.getmtime(input_path))
+
+
+def init_worker(width, palette, density_map, invert, adaptive_hist_eq, output_format, compress,
+                result_cache=None, result_cache_bytes=DEFAULT_DISK_BYTES, glyph_matcher=None, threads=1,
+                character_aspect_ratio=CHARACTER_ASPECT_RATIO):
+    color_manager = ColorManager(palette)
+    cache = None
+    if result_cache is not None:
+        cache = ResultCache(disk=result_cache == "disk", disk_bytes=result_cache_bytes)
+    _worker["handler"] = AsciiHandler(None, width, density_map=density_map, color_manager=color_manager,
+                                      glyph_matcher=glyph_matcher, result_cache=cache, threads=threads,
+                                      character_aspect_ratio=character_aspect_ratio)
+    # Pool workers leave through os._exit, which skips atexit but runs
+    # multiprocessing finalizers
+    Finalize(None, _worker["handler"].close, exitpriority=0)
+    _worker["invert"] = invert
+    _worker["adaptive_hist_eq"] = adaptive_hist_eq
+    _worker["output_format"] = output_format
+    _worker["compress"] = compress
+
+
+def convert_file(input_path, output_path):
+    handler = _worker["handler"]
+    return convert_image(ImageHandler("file", input_path, target_width=handler.width).load_image(), output_path)
+
+
+def convert_image(img, output_path):
+    handler = _worker["handler"]
+    handler.img = img
+    frame = handler.image_to_frame(
+        adaptive_hist_eq=_worker["adaptive_hist_eq"], invert=_worker["invert"])
+
+    # Write through a temporary file so an interrupted run never leaves a
+    # partial output that looks up to date
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    temp_path = f"{output_path}.{os.getpid()}.tmp"
+    output_format, compress = _worker["output_format"], _worker["compress"]
+    try:
+        if output_format == "html":
+            handler.save_colored_ascii_html(frame, None, temp_path, compress)
+        elif output_format == "text":
+            handler.save_monochrome_ascii(frame, temp_path, compress)
+        else:
+            data = handler.renderer.render(frame)
+            with (gzip.open(temp_path, "wb") if compress else open(temp_path, "wb")) as f:
+                f.write(data)
+        os.replace(temp_path, output_path)
+    except BaseException:
+        try:
+            os.unlink(temp_path)
+        except FileNotFoundError:
+            pass
+        raise
+    return os.path.getsize(output_path)
+
+
+class BatchConverter:
+    def __init__(self, paths, output_dir, width, palette, density_map, invert=False,
+                 adaptive_hist_eq=True, output_format="text", workers=None, force=False, compress=False,
+                 url_loader=None, result_cache=None, result_cache_bytes=DEFAULT_DISK_BYTES, glyph_matcher=None,
+                 threads=1, character_aspect_ratio=CHARACTER_ASPECT_RATIO):
+        if output_format not in OUTPUT_EXTENSIONS:
+            raise ValueError(f"Invalid output format: {output_format}")
+        self.paths = [path for path in paths if not is_url(path)]
+        self.urls = [path for path in paths if is_url(path)]
+        self.width = width
+        self.url_loader = url_loader
+        self.output_dir = output_dir
+        self.worker_args = (width, palette, density_map, invert, adaptive_hist_eq, output_format, compress,
+                            result_cache, result_cache_bytes, glyph_matcher, threads, character_aspect_ratio)
+        self.output_format = output_format
+        self.compress = compress
+        self.workers = workers
+        self.force = force
+        self.errors = {}
+        glyphs = None
+        if glyph_matcher is not None:
+            glyphs = (glyph_matcher.glyph_size, glyph_matcher.digest)
+        self.stamp = settings_stamp((width, ColorPalettes(palette).value, density_map, glyphs, bool(invert),
+                                     bool(adaptive_hist_eq), output_format, bool(compress),
+                                     character_aspect_ratio))
+        # Settings stamps of the outputs, keyed by path relative to output_dir
+        self.stamps = load_stamps(output_dir)
+
+    def recorded_stamp(self, output_path):
+        return self.stamps.get(os.path.relpath(output_path, self.output_dir))
+
+    def pending_jobs(self):
+        jobs = []
+        skipped = 0
+        for input_path, relative_path in collect_inputs(self.paths):
+            output_path = output_path_for(relative_path, self.output_dir, self.output_format, self.compress)
+            if not self.force and is_up_to_date(input_path, output_path, self.stamp,
+                                                self.recorded_stamp(output_path)):
+                skipped += 1
+            else:
+                jobs.append((input_path, output_path))
+        # A URL has no modification time to compare against, so any existing
+        # output converted with the same settings counts as up to date
+        url_jobs = []
+        for url in self.urls:
+            output_path = output_path_for(url_relative_path(url), self.output_dir, self.output_format, self.compress)
+            if not self.force and self.recorded_stamp(output_path) == self.stamp and os.path.exists(output_path):
+                skipped += 1
+            else:
+                url_jobs.append((url, output_path))
+        return jobs, url_jobs, skipped
+
+    def report_progress(self, done, total, start):
+        elapsed = time.perf_counter() - start
+        rate = done / elapsed if elapsed > 0 else 0
+        print(f"\r[{done}/{total}] {rate:.1f} images/s, {len(self.errors)} errors",
+              end="", file=sys.stderr, flush=True)
+
+    def run(self):
+        jobs, url_jobs, skipped = self.pending_jobs()
+        if skipped:
+            print(f"Skipping {skipped} up-to-date outputs", file=sys.stderr)
+
+        start = time.perf_counter()
+        bytes_written = 0
+        total = len(jobs) + len(url_jobs)
+        # Every job, including a failed download, puts exactly one finished
+        # future on this queue
+        completed = queue.Queue()
+        with ProcessPoolExecutor(max_workers=self.workers, initializer=init_worker,
+                                 initargs=self.worker_args) as executor:
+            # future -> (input path or URL, output path)
+            futures = {}
+
+            def track(future, source, output_path):
+                futures[future] = (source, output_path)
+                future.add_done_callback(completed.put)
+
+            for input_path, output_path in jobs:
+                track(executor.submit(convert_file, input_path, output_path), input_path, output_path)
+            if url_jobs:
+                # Downloads run on their own thread so that the pool converts
+                # files and downloaded images, and finished outputs are
+                # recorded, while the remaining downloads are still in flight
+                output_paths = dict(url_jobs)
+                reported = set()
+
+                def submit(url, result):
+                    if isinstance(result, Exception):
+                        future = Future()
+                        future.set_exception(result)
+                    else:
+                        future = executor.submit(convert_image, result, output_paths[url])
+                    track(future, url, output_paths[url])
+                    reported.add(url)
+
+                def download():
+                    url_loader = self.url_loader or UrlLoader(target_width=self.width)
+                    try:
+                        url_loader.load_all(list(output_paths), submit)
+                    except Exception as e:
+                        # Fail whatever was not handed over so the loop below
+                        # still sees one result per URL
+                        for url in output_paths.keys() - reported:
+                            submit(url, e)
+
+                threading.Thread(target=download, daemon=True).start()
+
+            try:
+                for done in range(1, total + 1):
+                    future = completed.get()
+                    source, output_path = futures[future]
+                    try:
+                        bytes_written += future.result()
+                    except Exception as e:
+                        self.errors[source] = e
+                    else:
+                        self.stamps[os.path.relpath(output_path, self.output_dir)] = self.stamp
+                    self.report_progress(done, total, start)
+            finally:
+                # Saved on Ctrl-C too, so a resumed run skips what was finished
+                if total:
+                    save_stamps(self.output_dir, self.stamps)
+
+        elapsed = time.perf_counter() - start
+        converted = total - len(self.errors)
+        print(f"\nConverted {converted} images ({bytes_written} bytes) in {elapsed:.1f}s", file=sys.stderr)
+        for input_path, error in self.errors.items():
+            print(f"Failed to convert {input_path}: {error}", file=sys.stderr)
+        return converted
@@ -1,6 +1,15 @@
 import argparse
-from ascii_art.ascii_handler import DENSITY_MAP_16, DENSITY_MAP_256
-from ascii_art.color_manager import ColorPalettes
+from ascii_art.options import (CHARACTER_ASPECT_RATIO, DENSITY_MAP_16, DENSITY_MAP_256, ColorPalettes, load_ramp,
+                               parse_glyph_size, parse_raw_size)
+from ascii_art.profiler import PROFILE_FORMATS
+
+
+def ramp_file(path):
+    # argparse only reports ValueError and TypeError as usage errors
+    try:
+        return load_ramp(path)
+    except (OSError, ValueError, KeyError) as e:
+        raise argparse.ArgumentTypeError(f"cannot read ramp file {path}: {e}")
 
 
 def get_cli_arguments():
@@ -17,19 +26,116 @@ def get_cli_arguments():
         "--webcam", action="store_true", help="Capture an image using the webcam")
     source_group.add_argument(
         "--clipboard", action="store_true", help="Load image from the clipboard")
+    source_group.add_argument(
+        "--video", help="Stream ASCII video from a video file or camera index (e.g. 0)")
+    source_group.add_argument(
+        "--batch", nargs="+", metavar="PATH",
+        help="Convert every image in the given directories, files, globs or http(s) URLs")
+    source_group.add_argument(
+        "--serve", metavar="ADDRESS",
+        help="Run a conversion server on [HOST:]PORT or on a Unix socket path")
+    source_group.add_argument(
+        "--play", metavar="FILE", help="Play a recording made with --record at its recorded timing")
 
     # Output style
     style_group = parser.add_argument_group("style")
     style_group.add_argument("--mono", action="store_true",
                              help="Print the ASCII art in monochrome (grayscale)")
-    style_group.add_argument("--palette", choices=list(ColorPalettes),
+    style_group.add_argument("--palette", type=ColorPalettes, choices=list(ColorPalettes),
                              default=ColorPalettes.xterm256, help="Choose a color palette for the ASCII art")
     style_group.add_argument("--density-map", default=DENSITY_MAP_16,
                              help="Specify a custom density map for the ASCII art")
+    style_group.add_argument("--ramp", type=ramp_file, metavar="FILE",
+                             help="Use the density map and character aspect ratio of a ramp file written for "
+                                  "a font by src/utils/generate_char_density_map.py")
+    style_group.add_argument("--glyph-mode", choices=["density", "shape"], default="density",
+                             help="Pick characters by tile brightness (density) or by matching their "
+                                  "shape to the tile (shape), which draws edges and lines with /, |, _ "
+                                  "and similar characters (default: density)")
+    style_group.add_argument("--glyph-size", type=parse_glyph_size, default="4x8",
+                             help="Glyph bitmap resolution used by --glyph-mode shape (default: 4x8)")
+    style_group.add_argument("--font", help="TrueType font used to render glyphs for --glyph-mode shape and --gif")
     style_group.add_argument(
         "--invert", action="store_true", help="Invert colors of the ASCII art")
     style_group.add_argument("-w", "--width", type=int, default=100,
                              help="Width of the ASCII art in characters (default: 100)")
+    style_group.add_argument("--threads", type=int, default=1,
+                             help="Convert bands of rows on this many threads, which speeds up wide outputs "
+                                  "(default: 1)")
+    style_group.add_argument("--report-bytes", action="store_true",
+                             help="Report the number of bytes written per frame to stderr")
+
+    # Large images
+    large_group = parser.add_argument_group("large images")
+    large_group.add_argument("--out-of-core", action="store_true",
+                             help="Read --file in strips instead of loading it, for images larger than memory. "
+                                  "Used automatically for NPY and raw files and for large uncompressed TIFF, "
+                                  "BMP and PPM images")
+    large_group.add_argument("--raw-size", type=parse_raw_size,
+                             help="Size of a raw 8-bit --file as WIDTHxHEIGHT or WIDTHxHEIGHTxCHANNELS "
+                                  "(default: 3 channels)")
+
+    # Viewer
+    viewer_group = parser.add_argument_group("viewer")
+    viewer_group.add_argument("--view", action="store_true",
+                              help="Explore --file interactively: pan with the arrow keys or hjkl, zoom with + "
+                                   "and -, fit with f and quit with q")
+    viewer_group.add_argument("--view-memory-bytes", type=int, default=64 << 20,
+                              help="Memory for converted viewer tiles (default: 64 MiB)")
+
+    # Streaming
+    stream_group = parser.add_argument_group("streaming")
+    stream_group.add_argument("--fps", type=float, default=15,
+                              help="Target frame rate when streaming video (default: 15)")
+    stream_group.add_argument("--loop", action="store_true",
+                              help="Repeat animated images and recordings until interrupted instead of playing "
+                                   "them once")
+    stream_group.add_argument("--seek", type=float, default=0, metavar="SECONDS",
+                              help="Start playing a recording this far in (default: 0)")
+
+    # Batch conversion
+    batch_group = parser.add_argument_group("batch")
+    batch_group.add_argument("--output-dir", default="ascii_output",
+                             help="Directory that mirrors the batch inputs (default: ascii_output)")
+    batch_group.add_argument("--format", choices=["text", "ansi", "html"], default="text",
+                             help="Output format for batch conversion and the server (default: text)")
+    batch_group.add_argument("--workers", type=int, default=None,
+                             help="Number of worker processes (default: number of CPUs)")
+    batch_group.add_argument("--force", action="store_true",
+                             help="Convert images even if their outputs are up to date")
+
+    batch_group.add_argument("--url-list", metavar="FILE",
+                             help="File with one image URL per line to add to the batch")
+
+    # Result cache
+    cache_group = parser.add_argument_group("result cache")
+    cache_group.add_argument("--result-cache", choices=["memory", "disk"], default=None,
+                             help="Reuse the conversion of an image already converted with the same settings. "
+                                  "memory keeps results for the life of the process (server, batch), disk also "
+                                  "keeps them across runs")
+    cache_group.add_argument("--result-cache-bytes", type=int, default=256 << 20,
+                             help="Size limit of the on-disk result cache in bytes (default: 256 MiB)")
+
+    # Downloads
+    network_group = parser.add_argument_group("network")
+    network_group.add_argument("--connections", type=int, default=16,
+                               help="Concurrent downloads for batch URLs (default: 16)")
+    network_group.add_argument("--connections-per-host", type=int, default=4,
+                               help="Concurrent downloads from a single host (default: 4)")
+    network_group.add_argument("--timeout", type=float, default=10.0,
+                               help="Seconds allowed for each batch URL download (default: 10)")
+    network_group.add_argument("--max-download-bytes", type=int, default=32 << 20,
+                               help="Largest image downloaded for batch URLs in bytes (default: 32 MiB)")
+
+    # Conversion server
+    server_group = parser.add_argument_group("server")
+    server_group.add_argument("--server-workers", type=int, default=None,
+                              help="Number of concurrent conversions (default: number of CPUs)")
+    server_group.add_argument("--queue-size", type=int, default=None,
+                              help="Requests allowed to wait for a worker before the server answers "
+                                   "503 (default: twice the number of workers)")
+    server_group.add_argument("--max-request-bytes", type=int, default=32 << 20,
+                              help="Largest accepted image upload in bytes (default: 32 MiB)")
 
     # Fun examples
     fun_group = parser.add_argument_group("fun")
@@ -44,5 +150,25 @@ def get_cli_arguments():
         "-o", "--output", help="Output monochrome ASCII art to a text file")
     output_group.add_argument(
         "--html", help="Output colored ASCII art to an HTML file")
+    output_group.add_argument(
+        "--gif", help="Draw the ASCII art with font glyphs into a GIF file, animated for animated "
+                      "input (with --file)")
+    output_group.add_argument(
+        "--record", metavar="FILE",
+        help="Save the converted frames of --video or --file to a compact recording for --play")
+    output_group.add_argument(
+        "--gzip", action="store_true", help="Compress text and HTML output with gzip (implied by a .gz file name)")
+
+    # Profiling
+    profile_group = parser.add_argument_group("profiling")
+    profile_group.add_argument("--profile", choices=PROFILE_FORMATS,
+                               help="Record per-stage timings and counters and report them in this format "
+                                    "(also enabled by the IMG2ASCII_PROFILE environment variable)")
+    profile_group.add_argument("--profile-output",
+                               help="Write the profile to this file instead of stderr")
 
-    return parser.parse_args()
+    args = parser.parse_args()
+    args.character_aspect_ratio = CHARACTER_ASPECT_RATIO
+    if args.ramp:
+        args.density_map, args.character_aspect_ratio = args.ramp
+    return args
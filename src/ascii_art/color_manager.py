@@ -1,18 +1,39 @@
+import hashlib
 import numpy as np
-from scipy.spatial import KDTree
-from enum import Enum
+from ascii_art.artifact_cache import artifact_cache
+from ascii_art.options import ColorPalettes
+from ascii_art.profiler import profiler
 
+# Bits per channel used to index the RGB lookup table of small palettes
+# (5 -> 32K entries, 6 -> 256K entries)
+LOOKUP_TABLE_BITS = 6
 
-class ColorPalettes(Enum):
-    xterm256 = "xterm256"
-    ansi = "ansi"
-    truecolor = "truecolor"
+XTERM256_CUBE_LEVELS = np.array([0, 95, 135, 175, 215, 255])
+XTERM256_GRAY_LEVELS = np.arange(8, 248, 10)
 
 
 class ColorManager:
+    # Lookup tables shared by every ColorManager in the process, keyed by palette digest
+    _lookup_tables = {}
+
     def __init__(self, palette: ColorPalettes = ColorPalettes.xterm256):
-        self.palette = self.get_palette_for(palette)
-        self.palette_tree = KDTree(self.palette)
+        self.palette_type = ColorPalettes(palette)
+        if self.palette_type == ColorPalettes.truecolor:
+            # Every RGB value is its own palette entry, so there is nothing to build
+            self.palette = None
+            self.palette_array = None
+        else:
+            self.palette = self.get_palette_for(self.palette_type)
+            self.palette_array = np.array(self.palette, dtype=np.uint8)
+        self._palette_tree = None
+
+    @property
+    def palette_tree(self):
+        if self._palette_tree is None:
+            from scipy.spatial import KDTree
+            palette = self.palette if self.palette is not None else self.truecolor_palette()
+            self._palette_tree = KDTree(palette)
+        return self._palette_tree
 
     def get_palette_for(self, palette: ColorPalettes):
         if palette == ColorPalettes.xterm256:
@@ -51,11 +72,119 @@ class ColorManager:
         return [(r, g, b) for r in range(256) for g in range(256) for b in range(256)]
 
     def closest_color(self, tile_color, invert=False):
-        if invert:
-            tile_color = 255 - tile_color
+        _, color = self.quantize(np.asarray(tile_color)[:3], invert)
+        return tuple(color.tolist())
+
+    def quantize(self, colors, invert=False):
+        # Batch version of closest_color: maps an (..., 3+) array of colors to
+        # palette indices and their RGB values in one vectorized call.
+        with profiler.span("quantize"):
+            colors = np.asarray(colors)
+            if invert:
+                colors = 255 - colors
+            colors = np.clip(colors[..., :3], 0, 255)
+            profiler.count("palette_lookups", colors.size // 3)
+
+            if self.palette_type == ColorPalettes.truecolor:
+                indices = self.truecolor_indices(colors)
+            elif self.palette_type == ColorPalettes.xterm256:
+                indices = self.xterm256_indices(colors)
+            else:
+                indices = self.lookup_table_indices(colors)
+            return indices, self.palette_colors(indices)
+
+    def palette_colors(self, indices):
+        if self.palette_type == ColorPalettes.truecolor:
+            indices = np.asarray(indices, dtype=np.uint32)
+            return np.stack([indices >> 16, (indices >> 8) & 0xFF, indices & 0xFF], axis=-1).astype(np.uint8)
+        return self.palette_array[indices]
+
+    def index_dtype(self):
+        if self.palette is None:
+            return np.uint32
+        return np.uint8 if len(self.palette) <= 256 else np.uint32
+
+    def truecolor_indices(self, colors):
+        rgb = np.rint(colors).astype(np.uint32)
+        return (rgb[..., 0] << 16) | (rgb[..., 1] << 8) | rgb[..., 2]
+
+    def xterm256_indices(self, colors):
+        # The xterm256 palette is 8 basic colors, a 6x6x6 cube and a 24 step
+        # gray ramp. The nearest cube and gray entries can be found per channel
+        # in closed form, leaving only the basic colors to compare directly.
+        colors = colors.astype(np.float32)
+        cube_midpoints = (XTERM256_CUBE_LEVELS[1:] + XTERM256_CUBE_LEVELS[:-1]) / 2
+        cube_steps = np.searchsorted(cube_midpoints, colors, side="left")
+        cube_indices = 8 + 36 * cube_steps[..., 0] + 6 * cube_steps[..., 1] + cube_steps[..., 2]
+
+        gray_steps = np.clip(np.rint((colors.mean(axis=-1) - 8) / 10), 0, 23).astype(int)
+        gray_indices = 224 + gray_steps
+
+        candidates = np.concatenate([
+            np.broadcast_to(np.arange(8), colors.shape[:-1] + (8,)),
+            cube_indices[..., None],
+            gray_indices[..., None],
+        ], axis=-1)
+        distances = np.sum((self.palette_array[candidates] - colors[..., None, :]) ** 2, axis=-1)
+        best = np.argmin(distances, axis=-1)
+        return np.take_along_axis(candidates, best[..., None], axis=-1)[..., 0].astype(np.uint8)
+
+    def lookup_table_indices(self, colors):
+        lookup_table = self.lookup_table()
+        shift = 8 - LOOKUP_TABLE_BITS
+        buckets = colors.astype(np.uint8) >> shift
+        keys = ((buckets[..., 0].astype(np.uint32) << (2 * LOOKUP_TABLE_BITS))
+                | (buckets[..., 1].astype(np.uint32) << LOOKUP_TABLE_BITS)
+                | buckets[..., 2])
+        entries = lookup_table[keys]
+        indices = entries.astype(self.index_dtype())
+
+        # Buckets straddling a Voronoi boundary are marked ambiguous and
+        # resolved exactly against the palette
+        ambiguous = entries == len(self.palette)
+        if ambiguous.any():
+            indices[ambiguous] = self.nearest_indices(colors[ambiguous])
+        return indices
+
+    def nearest_indices(self, colors):
+        distances = np.sum((colors[:, None, :].astype(np.float32) - self.palette_array[None, :, :]) ** 2, axis=-1)
+        return np.argmin(distances, axis=-1)
+
+    def lookup_table(self):
+        digest = hashlib.sha1(self.palette_array.tobytes()).hexdigest()
+        key = (digest, LOOKUP_TABLE_BITS)
+        if key not in ColorManager._lookup_tables:
+            ColorManager._lookup_tables[key] = artifact_cache.get_or_create("lut", key, self.build_lookup_table)
+        return ColorManager._lookup_tables[key]
+
+    def build_lookup_table(self):
+        # Classify every corner of the bucket lattice, then mark a bucket as
+        # resolved only when all eight of its corners agree. Voronoi cells are
+        # convex, so such a bucket lies entirely inside one palette cell.
+        size = 1 << LOOKUP_TABLE_BITS
+        step = 256 // size
+        axis = np.arange(size + 1) * step
+        corners = np.stack(np.meshgrid(axis, axis, axis, indexing="ij"), axis=-1).reshape(-1, 3)
+        labels = np.concatenate([self.nearest_indices(chunk) for chunk in np.array_split(corners, 16)])
+        labels = labels.reshape(size + 1, size + 1, size + 1)
+
+        lookup_table = labels[:-1, :-1, :-1].copy()
+        for dr in (0, 1):
+            for dg in (0, 1):
+                for db in (0, 1):
+                    corner_labels = labels[dr:size + dr, dg:size + dg, db:size + db]
+                    lookup_table[corner_labels != lookup_table] = len(self.palette)
+        dtype = np.uint8 if len(self.palette) < 256 else np.uint16
+        return lookup_table.reshape(-1).astype(dtype)
 
-        min_color_index = self.palette_tree.query(tile_color[:3])[1]
-        return self.palette[min_color_index]
+    def terminal_color_codes(self):
+        # xterm 256-color code of every palette entry: codes 0-15 are the ANSI
+        # colors, and the xterm256 palette skips codes 8-15 after its 8 basic colors
+        if self.palette_type == ColorPalettes.xterm256:
+            return [index if index < 8 else index + 8 for index in range(len(self.palette))]
+        elif self.palette_type == ColorPalettes.ansi:
+            return list(range(len(self.palette)))
+        raise ValueError(f"Palette {self.palette_type.value} has no terminal color codes")
 
     def xterm256_color(self, text, color_code):
         return f"\x1b[38;5;{color_code}m{text}\x1b[0m"
@@ -0,0 +1,99 @@
+import hashlib
+import numpy as np
+import PIL
+from PIL import Image, ImageDraw, ImageFont
+from ascii_art.artifact_cache import artifact_cache, file_digest
+from ascii_art.options import DEFAULT_GLYPH_SIZE, parse_glyph_size
+from ascii_art.profiler import profiler
+
+GLYPH_CHARS = ''.join(chr(code) for code in range(32, 127))
+# Relative weight of matching a tile's brightness versus its shape
+BRIGHTNESS_WEIGHT = 4.0
+# Number of tiles matched per matrix multiply, bounding the score matrix
+MATCH_CHUNK_TILES = 1 << 16
+
+
+def load_font(font_path, font_size):
+    if font_path:
+        return ImageFont.truetype(font_path, font_size)
+    try:
+        return ImageFont.load_default(size=font_size)
+    except TypeError:
+        # Pillow < 10.1 only ships a fixed size bitmap font
+        return ImageFont.load_default()
+
+
+def render_glyph_cells(chars, font):
+    # Draws every character into a cell of the font's advance width and line
+    # height, yielding one grayscale image per character
+    ascent, descent = font.getmetrics()
+    cell_width = max(1, int(round(font.getlength("M"))))
+    cell_height = ascent + descent
+    for char in chars:
+        img = Image.new("L", (cell_width, cell_height), color=0)
+        ImageDraw.Draw(img).text((0, 0), char, font=font, fill=255)
+        yield img
+
+
+class GlyphMatcher:
+    def __init__(self, chars=GLYPH_CHARS, glyph_size=DEFAULT_GLYPH_SIZE, font_path=None, font_size=32,
+                 brightness_weight=BRIGHTNESS_WEIGHT):
+        self.chars = chars
+        self.brightness_weight = brightness_weight
+        self.char_array = np.array(list(chars))
+        self.glyph_size = glyph_size
+        self.bitmaps = self.load_bitmaps(font_path, font_size)
+        self.prepare()
+
+    def prepare(self):
+        # Every glyph is described by its ink coverage and by its unit-norm,
+        # zero-mean bitmap, which carries its shape independent of brightness
+        self.coverage = self.bitmaps.mean(axis=1)
+        centered = self.bitmaps - self.coverage[:, np.newaxis]
+        norms = np.linalg.norm(centered, axis=1, keepdims=True)
+        self.shapes = np.divide(centered, norms, out=np.zeros_like(centered), where=norms > 0)
+        # Tile brightness is mapped onto the coverage range so that white
+        # corresponds to the densest glyph, as with the density maps
+        self.coverage_scale = self.coverage.max()
+        # Identifies the rendered glyph set, e.g. in result cache keys
+        self.digest = hashlib.sha1(np.ascontiguousarray(self.bitmaps).tobytes()).hexdigest()
+
+    def load_bitmaps(self, font_path, font_size):
+        # Pillow's built-in font only changes with Pillow itself
+        font_id = file_digest(font_path) if font_path else f"pillow-{PIL.__version__}"
+        key = (font_id, font_size, self.chars, self.glyph_size)
+        return artifact_cache.get_or_create(
+            "glyphs", key, lambda: self.render_bitmaps(font_path, font_size))
+
+    def render_bitmaps(self, font_path, font_size):
+        # Area-averages every rendered glyph cell down to glyph_size samples
+        font = load_font(font_path, font_size)
+        width, height = self.glyph_size
+
+        bitmaps = np.empty((len(self.chars), width * height), dtype=np.float32)
+        for index, img in enumerate(render_glyph_cells(self.chars, font)):
+            reduced = img.resize((width, height), Image.BOX)
+            bitmaps[index] = np.asarray(reduced, dtype=np.float32).reshape(-1) / 255
+        return bitmaps
+
+    def match(self, intensities):
+        # intensities: (rows, cols, height, width) array of values in [0, 1].
+        # A tile t is modeled as its mean plus a non-negative multiple of a
+        # glyph's shape s, leaving a shape error of |t_c|^2 - max(t_c.s, 0)^2
+        # for the centered tile t_c. A brightness error against the glyph's
+        # coverage keeps flat tiles on the density ramp. The shape term for
+        # all tiles and glyphs comes from one matrix multiply per chunk.
+        rows, cols = intensities.shape[:2]
+        tiles = intensities.reshape(rows * cols, -1).astype(np.float32)
+        num_samples = tiles.shape[1]
+        profiler.count("glyph_matches", tiles.shape[0])
+        with profiler.span("match_glyphs"):
+            indices = np.empty(tiles.shape[0], dtype=np.intp)
+            for start in range(0, tiles.shape[0], MATCH_CHUNK_TILES):
+                chunk = tiles[start:start + MATCH_CHUNK_TILES]
+                means = chunk.mean(axis=1, keepdims=True)
+                shape_fit = np.maximum((chunk - means) @ self.shapes.T, 0)
+                brightness_error = (means * self.coverage_scale - self.coverage) ** 2
+                scores = self.brightness_weight * num_samples * brightness_error - shape_fit ** 2
+                indices[start:start + MATCH_CHUNK_TILES] = np.argmin(scores, axis=1)
+            return indices.reshape(rows, cols)
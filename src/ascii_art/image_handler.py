@@ -1,39 +1,73 @@
+import mmap
 import sys
-import cv2
-import requests
 import numpy as np
 from io import BytesIO
-from PIL import Image, ImageGrab
-from skimage import io
+from PIL import Image
+from ascii_art.profiler import profiler
+
+# Keep at least this many source pixels per output column when decoding at a
+# reduced resolution, so tile averaging still has detail to work with
+MIN_PIXELS_PER_COLUMN = 4
 
 
 class ImageHandler:
-    def __init__(self, source_type, source):
+    def __init__(self, source_type, source, target_width=None):
         self.source_type = source_type
         self.source = source
+        self.target_width = target_width
 
     def load_image(self):
-        if self.source_type == "url":
-            return self.load_image_from_url(self.source)
-        elif self.source_type == "file":
-            return self.load_image_from_file(self.source)
-        elif self.source_type == "webcam":
-            return self.load_image_from_webcam()
-        elif self.source_type == "clipboard":
-            return self.load_image_from_clipboard()
-        else:
-            raise ValueError("Invalid source type")
+        with profiler.span(f"load_image:{self.source_type}"):
+            if self.source_type == "url":
+                return self.load_image_from_url(self.source)
+            elif self.source_type == "file":
+                return self.load_image_from_file(self.source)
+            elif self.source_type == "webcam":
+                return self.load_image_from_webcam()
+            elif self.source_type == "clipboard":
+                return self.load_image_from_clipboard()
+            elif self.source_type == "bytes":
+                return self.decode_image(BytesIO(self.source))
+            else:
+                raise ValueError("Invalid source type")
 
     def load_image_from_url(self, url):
-        response = requests.get(url)
-        img = io.imread(BytesIO(response.content))
-        return img
+        from ascii_art.url_loader import create_session, fetch_image
+        with create_session(1) as session:
+            return fetch_image(session, url, self.target_width)
 
     def load_image_from_file(self, file_path):
-        img = io.imread(file_path)
-        return img
+        with open(file_path, "rb") as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                return self.decode_image(mapped)
+
+    def decode_image(self, data):
+        with profiler.span("decode_image"), Image.open(data) as img:
+            return self.reduce_image(img)
+
+    def reduce_image(self, img):
+        if self.target_width:
+            target_pixels = self.target_width * MIN_PIXELS_PER_COLUMN
+            if img.width > target_pixels:
+                scale = target_pixels / img.width
+                # JPEG decodes straight to a 1/2, 1/4 or 1/8 scale via
+                # DCT scaling; other formats ignore the draft request
+                img.draft(None, (target_pixels, max(1, int(img.height * scale))))
+                factor = img.width // target_pixels
+                if factor >= 2:
+                    # reduce() does not support palette images
+                    img = self.normalize_mode(img).reduce(factor)
+        return np.asarray(self.normalize_mode(img))
+
+    def normalize_mode(self, img):
+        if img.mode in ("RGB", "RGBA"):
+            return img
+        if img.mode in ("LA", "PA") or (img.mode == "P" and "transparency" in img.info):
+            return img.convert("RGBA")
+        return img.convert("RGB")
 
     def load_image_from_webcam(self):
+        import cv2
         cap = cv2.VideoCapture(0)
         ret, frame = cap.read()
         cap.release()
@@ -46,6 +80,7 @@ class ImageHandler:
         if sys.platform not in ["win32", "darwin"]:
             raise OSError(
                 "ImageGrab.grabclipboard() is macOS and Windows only")
+        from PIL import ImageGrab
         image = ImageGrab.grabclipboard()
         if image is None:
             raise ValueError("No image data found in clipboard")
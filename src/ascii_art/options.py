@@ -0,0 +1,51 @@
+import json
+from enum import Enum
+
+# Option values and parsers of the command line. main.py parses its arguments
+# before importing anything else, so this module must not import numpy, PIL or
+# any other backend.
+
+DENSITY_MAP_256 = ' _,.`;\':-~"|!\/<()L>+J^=c*[{}]zirj1?syulvCIZt7oTx2Yng3pSqaeU5fVwEFOQXGmd9hHbD6PAk4%WB8K&N$#R0M@'
+DENSITY_MAP_16 = ' .,:"<+[?e=E*%#@'
+# Width over height of a character cell
+CHARACTER_ASPECT_RATIO = 0.4897959183673469
+# Version of the ramp files written by utils/generate_char_density_map.py
+RAMP_FILE_VERSION = 1
+DEFAULT_GLYPH_SIZE = (4, 8)
+
+
+class ColorPalettes(Enum):
+    xterm256 = "xterm256"
+    ansi = "ansi"
+    truecolor = "truecolor"
+
+
+def load_ramp(path):
+    # The density map, darkest character first, and the character aspect
+    # ratio of a ramp file measured on a font by
+    # utils/generate_char_density_map.py
+    with open(path, encoding="utf-8") as f:
+        ramp = json.load(f)
+    if not isinstance(ramp, dict) or ramp.get("version") != RAMP_FILE_VERSION or not ramp.get("ramp"):
+        raise ValueError(f"{path} is not a version {RAMP_FILE_VERSION} ramp file")
+    aspect_ratio = ramp.get("aspect_ratio", CHARACTER_ASPECT_RATIO)
+    if not isinstance(aspect_ratio, (int, float)) or aspect_ratio <= 0:
+        raise ValueError(f"{path} has an invalid aspect ratio")
+    return ramp["ramp"], float(aspect_ratio)
+
+
+def parse_glyph_size(value):
+    width, height = (int(part) for part in value.lower().split("x"))
+    if width <= 0 or height <= 0:
+        raise ValueError("Glyph size should be positive.")
+    return width, height
+
+
+def parse_raw_size(value):
+    # WIDTHxHEIGHT or WIDTHxHEIGHTxCHANNELS, three channels by default
+    parts = [int(part) for part in value.lower().split("x")]
+    if len(parts) == 2:
+        parts.append(3)
+    if len(parts) != 3 or min(parts) <= 0 or parts[2] not in (1, 3, 4):
+        raise ValueError("Raw size should be WIDTHxHEIGHT or WIDTHxHEIGHTxCHANNELS with 1, 3 or 4 channels.")
+    return tuple(parts)
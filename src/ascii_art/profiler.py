@@ -0,0 +1,131 @@
+import json
+import os
+import sys
+import threading
+import time
+from collections import defaultdict
+
+PROFILE_ENV_VAR = "IMG2ASCII_PROFILE"
+PROFILE_OUTPUT_ENV_VAR = "IMG2ASCII_PROFILE_OUTPUT"
+PROFILE_FORMATS = ("table", "json", "chrome")
+
+
+class NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+# Shared by every disabled span() call so that profiling costs a single
+# attribute check when it is off
+NULL_SPAN = NullSpan()
+
+
+class Span:
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.profiler.record(self.name, self.start, time.perf_counter() - self.start)
+        return False
+
+
+class Profiler:
+    def __init__(self):
+        self.enabled = False
+        self.events = []
+        self.counters = defaultdict(int)
+        self.lock = threading.Lock()
+        self.origin = time.perf_counter()
+
+    def enable(self):
+        self.reset()
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def reset(self):
+        with self.lock:
+            self.events = []
+            self.counters = defaultdict(int)
+            self.origin = time.perf_counter()
+
+    def span(self, name):
+        if not self.enabled:
+            return NULL_SPAN
+        return Span(self, name)
+
+    def count(self, name, value=1):
+        if self.enabled:
+            with self.lock:
+                self.counters[name] += value
+
+    def record(self, name, start, duration):
+        with self.lock:
+            self.events.append((name, start - self.origin, duration, threading.get_ident()))
+
+    def span_totals(self):
+        totals = {}
+        for name, _, duration, _ in self.events:
+            calls, total, longest = totals.get(name, (0, 0.0, 0.0))
+            totals[name] = (calls + 1, total + duration, max(longest, duration))
+        return totals
+
+    def stats_table(self):
+        lines = [f"{'span':<32} {'calls':>7} {'total ms':>10} {'mean ms':>9} {'max ms':>9}"]
+        totals = sorted(self.span_totals().items(), key=lambda item: item[1][1], reverse=True)
+        for name, (calls, total, longest) in totals:
+            lines.append(f"{name:<32} {calls:>7} {total * 1000:>10.2f} {total / calls * 1000:>9.2f} {longest * 1000:>9.2f}")
+        if self.counters:
+            lines.append("")
+            lines.append(f"{'counter':<32} {'value':>7}")
+            for name, value in sorted(self.counters.items()):
+                lines.append(f"{name:<32} {value:>7}")
+        return "\n".join(lines) + "\n"
+
+    def json_lines(self):
+        lines = [json.dumps({"type": "span", "name": name, "start": start, "duration": duration, "thread": thread})
+                 for name, start, duration, thread in self.events]
+        lines.extend(json.dumps({"type": "counter", "name": name, "value": value})
+                     for name, value in sorted(self.counters.items()))
+        return "\n".join(lines) + "\n"
+
+    def chrome_trace(self):
+        # Trace Event Format, viewable in chrome://tracing or Perfetto
+        pid = os.getpid()
+        trace_events = [{"name": name, "ph": "X", "ts": start * 1e6, "dur": duration * 1e6, "pid": pid, "tid": thread}
+                        for name, start, duration, thread in self.events]
+        end = max((start + duration for _, start, duration, _ in self.events), default=0.0)
+        trace_events.extend({"name": name, "ph": "C", "ts": end * 1e6, "pid": pid, "args": {name: value}}
+                            for name, value in sorted(self.counters.items()))
+        return json.dumps({"traceEvents": trace_events, "displayTimeUnit": "ms"}) + "\n"
+
+    def export(self, profile_format, path=None):
+        if profile_format == "table":
+            report = self.stats_table()
+        elif profile_format == "json":
+            report = self.json_lines()
+        elif profile_format == "chrome":
+            report = self.chrome_trace()
+        else:
+            raise ValueError(f"Invalid profile format: {profile_format}")
+
+        if path:
+            with open(path, "w") as f:
+                f.write(report)
+        else:
+            sys.stderr.write(report)
+
+
+profiler = Profiler()
+
+if os.environ.get(PROFILE_ENV_VAR) in PROFILE_FORMATS:
+    profiler.enable()
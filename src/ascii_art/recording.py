@@ -0,0 +1,166 @@
+import mmap
+import struct
+import zlib
+import numpy as np
+from ascii_art.ascii_frame import FRAME_HEADER, AsciiFrame
+from ascii_art.color_manager import ColorManager, ColorPalettes
+
+RECORDING_MAGIC = b"AREC"
+INDEX_MAGIC = b"ARIX"
+RECORDING_VERSION = 1
+# magic, version, frames between keyframes
+RECORDING_HEADER = struct.Struct("<4sBxxxI")
+# index offset, frame count, magic
+RECORDING_FOOTER = struct.Struct("<QI4s")
+INDEX_DTYPE = np.dtype([("offset", "<u8"), ("size", "<u4"), ("start", "<u8"), ("duration", "<u4"),
+                        ("keyframe", "u1")])
+# A seek decodes at most this many frames past the keyframe before it
+KEYFRAME_INTERVAL = 60
+COMPRESSION_LEVEL = 6
+
+
+def xor_bytes(data, previous):
+    return np.bitwise_xor(np.frombuffer(data, dtype=np.uint8), np.frombuffer(previous, dtype=np.uint8)).tobytes()
+
+
+class Recorder:
+    # Writes converted frames to a recording. Every frame is stored as its
+    # AsciiFrame.to_bytes() grids, XORed with the previous frame's when they
+    # have the same size so that unchanged cells become runs of zeros, and
+    # compressed. Every keyframe_interval frames, and whenever the size
+    # changes, a frame is stored whole. An index of where every frame starts
+    # and when it is shown is written at the end.
+    def __init__(self, path, keyframe_interval=KEYFRAME_INTERVAL, level=COMPRESSION_LEVEL):
+        self.file = open(path, "wb")
+        self.keyframe_interval = keyframe_interval
+        self.level = level
+        self.entries = []
+        self.previous = None
+        self.start = 0
+        # Sizes of the frames before and after encoding
+        self.raw_bytes = 0
+        self.compressed_bytes = 0
+        self.file.write(RECORDING_HEADER.pack(RECORDING_MAGIC, RECORDING_VERSION, keyframe_interval))
+
+    def add(self, frame, duration):
+        data = frame.to_bytes()
+        keyframe = (len(self.entries) % self.keyframe_interval == 0 or self.previous is None
+                    or len(data) != len(self.previous))
+        payload = zlib.compress(data if keyframe else xor_bytes(data, self.previous), self.level)
+        self.entries.append((self.file.tell(), len(payload), self.start, duration, keyframe))
+        self.file.write(payload)
+        self.previous = data
+        self.start += duration
+        self.raw_bytes += len(data)
+        self.compressed_bytes += len(payload)
+
+    def close(self):
+        if self.file.closed:
+            return
+        index_offset = self.file.tell()
+        self.file.write(np.array(self.entries, dtype=INDEX_DTYPE).tobytes())
+        self.file.write(RECORDING_FOOTER.pack(index_offset, len(self.entries), INDEX_MAGIC))
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        # Closing writes the index, so a recording interrupted with Ctrl-C
+        # keeps the frames captured so far
+        self.close()
+        return False
+
+
+def write_recording(frames, output_path, keyframe_interval=KEYFRAME_INTERVAL):
+    # frames: iterable of (AsciiFrame, duration in ms)
+    with Recorder(output_path, keyframe_interval) as recorder:
+        for frame, duration in frames:
+            recorder.add(frame, duration)
+    return recorder
+
+
+class Recording:
+    # Reads a recording through a memory map. Frames are decoded on demand
+    # from the keyframe before them, so seeking anywhere costs at most
+    # keyframe_interval decompressions, and reading frames in order costs
+    # one per frame.
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self.mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.view = memoryview(self.mapped)
+        if len(self.view) < RECORDING_HEADER.size + RECORDING_FOOTER.size:
+            self.close()
+            raise ValueError(f"{path} is not an ASCII recording")
+        magic, version, self.keyframe_interval = RECORDING_HEADER.unpack_from(self.view)
+        if magic != RECORDING_MAGIC or version != RECORDING_VERSION:
+            self.close()
+            raise ValueError(f"{path} is not an ASCII recording")
+        index_offset, count, index_magic = RECORDING_FOOTER.unpack_from(self.view,
+                                                                        len(self.view) - RECORDING_FOOTER.size)
+        if index_magic != INDEX_MAGIC:
+            self.close()
+            raise ValueError(f"{path} is incomplete: its index is missing")
+        self.index = np.frombuffer(self.view, dtype=INDEX_DTYPE, count=count, offset=index_offset)
+        self.keyframes = np.flatnonzero(self.index["keyframe"])
+        self.color_manager = None
+        # Last decoded frame, as (position, to_bytes() data)
+        self.decoded = None
+
+    def __len__(self):
+        return len(self.index)
+
+    @property
+    def duration(self):
+        # Total length in ms
+        if not len(self.index):
+            return 0
+        return int(self.index["start"][-1] + self.index["duration"][-1])
+
+    def position_at(self, time_ms):
+        # The frame on screen time_ms into the recording
+        return max(0, int(np.searchsorted(self.index["start"], time_ms, side="right")) - 1)
+
+    def frame_bytes(self, position):
+        entry = self.index[position]
+        if self.decoded is not None and self.decoded[0] == position:
+            return self.decoded[1]
+        if self.decoded is not None and self.decoded[0] == position - 1 and not entry["keyframe"]:
+            first = position
+            data = self.decoded[1]
+        else:
+            first = int(self.keyframes[np.searchsorted(self.keyframes, position, side="right") - 1])
+            data = None
+        for current in range(first, position + 1):
+            offset, size = int(self.index["offset"][current]), int(self.index["size"][current])
+            payload = zlib.decompress(self.view[offset:offset + size])
+            data = payload if self.index["keyframe"][current] else xor_bytes(payload, data)
+        self.decoded = (position, data)
+        return data
+
+    def frame(self, position):
+        data = self.frame_bytes(position)
+        if self.color_manager is None:
+            # Every frame shares one ColorManager for the recorded palette
+            palette_length = FRAME_HEADER.unpack_from(data)[6]
+            palette = data[FRAME_HEADER.size:FRAME_HEADER.size + palette_length].decode("ascii")
+            # Monochrome recordings have no palette, but the renderer needs one
+            self.color_manager = ColorManager(palette or ColorPalettes.xterm256)
+        return AsciiFrame.from_buffer(data, self.color_manager)
+
+    def frames(self, start_ms=0):
+        # Yields (frame, duration in ms) from the frame on screen at start_ms
+        for position in range(self.position_at(start_ms), len(self.index)):
+            yield self.frame(position), int(self.index["duration"][position])
+
+    def play(self, monochrome=False, loop=False, start_ms=0, stream=None):
+        from ascii_art.animation import play_frames
+        if len(self.index):
+            self.frame(self.position_at(start_ms))
+        play_frames(lambda: self.frames(start_ms), self.color_manager, monochrome, loop, stream)
+
+    def close(self):
+        self.index = None
+        self.decoded = None
+        self.view.release()
+        self.mapped.close()
@@ -0,0 +1,91 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+import numpy as np
+from ascii_art.artifact_cache import ArtifactCache, CACHE_DIR
+
+RESULT_CACHE_DIR = os.path.join(CACHE_DIR, "results")
+DEFAULT_MEMORY_BYTES = 64 << 20
+DEFAULT_DISK_BYTES = 256 << 20
+
+
+def image_digest(img):
+    # Content hash of the decoded pixels; shape and dtype are part of it so
+    # that reshaped views of the same buffer do not collide
+    img = np.ascontiguousarray(img)
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(f"{img.shape}{img.dtype.str}".encode())
+    digest.update(img.data)
+    return digest.hexdigest()
+
+
+def pack_index_maps(char_indices, color_indices):
+    # Stores both maps as one structured array so that a result is a single
+    # compact .npy file on disk
+    packed = np.empty(char_indices.shape, dtype=[("char", char_indices.dtype), ("color", color_indices.dtype)])
+    packed["char"] = char_indices
+    packed["color"] = color_indices
+    return packed
+
+
+class ResultCache:
+    # Conversion results keyed by image content and settings, held as char
+    # and palette index maps. An in-memory LRU tier is backed by an optional
+    # on-disk tier; both are bounded in bytes.
+    def __init__(self, memory_bytes=DEFAULT_MEMORY_BYTES, disk=False, disk_bytes=DEFAULT_DISK_BYTES,
+                 directory=RESULT_CACHE_DIR):
+        self.memory_bytes = memory_bytes
+        self.entries = OrderedDict()
+        self.bytes_used = 0
+        self.lock = threading.Lock()
+        self.disk = ArtifactCache(directory, max_bytes=disk_bytes) if disk else None
+        self.counters = dict.fromkeys(("hits", "disk_hits", "misses", "evictions"), 0)
+
+    def key_for(self, img, settings):
+        return (image_digest(img),) + tuple(settings)
+
+    def get(self, key):
+        with self.lock:
+            packed = self.entries.get(key)
+            if packed is not None:
+                self.entries.move_to_end(key)
+                self.counters["hits"] += 1
+                return packed["char"], packed["color"]
+        if self.disk is not None:
+            packed = self.disk.load("result", key)
+            if packed is not None:
+                packed = np.array(packed)
+                self.remember(key, packed)
+                with self.lock:
+                    self.counters["disk_hits"] += 1
+                return packed["char"], packed["color"]
+        with self.lock:
+            self.counters["misses"] += 1
+        return None
+
+    def put(self, key, char_indices, color_indices):
+        packed = pack_index_maps(char_indices, color_indices)
+        self.remember(key, packed)
+        if self.disk is not None:
+            self.disk.store("result", key, packed)
+
+    def remember(self, key, packed):
+        with self.lock:
+            if key in self.entries:
+                self.bytes_used -= self.entries.pop(key).nbytes
+            self.entries[key] = packed
+            self.bytes_used += packed.nbytes
+            while self.bytes_used > self.memory_bytes and self.entries:
+                _, evicted = self.entries.popitem(last=False)
+                self.bytes_used -= evicted.nbytes
+                self.counters["evictions"] += 1
+
+    def stats(self):
+        with self.lock:
+            stats = dict(self.counters)
+            stats["entries"] = len(self.entries)
+            stats["bytes"] = self.bytes_used
+        lookups = stats["hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_rate"] = round((stats["hits"] + stats["disk_hits"]) / lookups, 4) if lookups else 0.0
+        return stats
@@ -0,0 +1,396 @@
+import json
+import os
+import signal
+import socketserver
+import stat
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+import numpy as np
+from ascii_art.ascii_handler import CHARACTER_ASPECT_RATIO, AsciiHandler, DENSITY_MAP_16
+from ascii_art.color_manager import ColorManager, ColorPalettes
+from ascii_art.image_handler import ImageHandler
+
+CONTENT_TYPES = {
+    "text": "text/plain; charset=utf-8",
+    "ansi": "text/plain; charset=utf-8",
+    "html": "text/html; charset=utf-8",
+}
+DEFAULT_MAX_REQUEST_BYTES = 32 << 20
+MAX_WIDTH = 2000
+# Number of recent requests that latency percentiles are computed over
+LATENCY_WINDOW = 10000
+TRUE_VALUES = ("1", "true", "yes", "on")
+# Density maps come from clients, so each worker only keeps handlers for the
+# most recently used palette and density map combinations
+MAX_HANDLERS_PER_WORKER = 16
+
+
+class ServerOverloaded(Exception):
+    pass
+
+
+def parse_address(value):
+    # A value with a path separator names a Unix socket, anything else is
+    # [HOST:]PORT with the host defaulting to the loopback interface
+    if os.sep in value or value.endswith(".sock"):
+        return value
+    host, _, port = value.rpartition(":")
+    return host or "127.0.0.1", int(port)
+
+
+class ServerStats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started = time.monotonic()
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.counters = dict.fromkeys(
+            ("completed", "rejected", "failed", "bytes_in", "bytes_out"), 0)
+        self.in_flight = 0
+
+    def count(self, name, value=1):
+        with self.lock:
+            self.counters[name] += value
+
+    def record(self, latency, bytes_in, bytes_out):
+        with self.lock:
+            self.latencies.append(latency)
+            self.counters["completed"] += 1
+            self.counters["bytes_in"] += bytes_in
+            self.counters["bytes_out"] += bytes_out
+
+    def snapshot(self):
+        with self.lock:
+            latencies = np.array(self.latencies)
+            counters = dict(self.counters)
+            in_flight = self.in_flight
+        uptime = time.monotonic() - self.started
+        snapshot = {
+            "uptime_seconds": round(uptime, 3),
+            "in_flight": in_flight,
+            **counters,
+            "requests_per_second": round(counters["completed"] / uptime, 3) if uptime > 0 else 0.0,
+        }
+        if len(latencies):
+            p50, p90, p99 = np.percentile(latencies, [50, 90, 99]) * 1000
+            snapshot["latency_ms"] = {
+                "p50": round(p50, 3), "p90": round(p90, 3), "p99": round(p99, 3),
+                "max": round(latencies.max() * 1000, 3), "window": len(latencies),
+            }
+        return snapshot
+
+
+class ConversionService:
+    def __init__(self, width=100, palette=ColorPalettes.xterm256, density_map=DENSITY_MAP_16, invert=False,
+                 adaptive_hist_eq=True, output_format="text", glyph_matcher=None, workers=None, queue_size=None,
+                 max_request_bytes=DEFAULT_MAX_REQUEST_BYTES, result_cache=None,
+                 character_aspect_ratio=CHARACTER_ASPECT_RATIO):
+        self.defaults = {
+            "width": width, "palette": ColorPalettes(palette), "density_map": density_map,
+            "invert": invert, "format": output_format,
+        }
+        self.adaptive_hist_eq = adaptive_hist_eq
+        self.glyph_matcher = glyph_matcher
+        self.character_aspect_ratio = character_aspect_ratio
+        # Shared by all workers; ResultCache is thread-safe
+        self.result_cache = result_cache
+        self.workers = workers or os.cpu_count() or 1
+        # Requests beyond the running and queued ones are turned away at once
+        # instead of piling up behind a slow pool
+        self.queue_size = queue_size if queue_size is not None else 2 * self.workers
+        self.slots = threading.BoundedSemaphore(self.workers + self.queue_size)
+        self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="convert")
+        self.max_request_bytes = max_request_bytes
+        self.stats = ServerStats()
+        # Color managers are read-only after setup and shared by all workers.
+        # AsciiHandlers hold per-image state and a CLAHE object, so every
+        # worker thread keeps its own.
+        self.color_managers = {}
+        self.color_managers_lock = threading.Lock()
+        self.local = threading.local()
+        # The handlers of every worker thread, closed on shutdown
+        self.worker_handlers = []
+        self.worker_handlers_lock = threading.Lock()
+
+    def color_manager_for(self, palette):
+        with self.color_managers_lock:
+            if palette not in self.color_managers:
+                self.color_managers[palette] = ColorManager(palette)
+            return self.color_managers[palette]
+
+    def handler_for(self, palette, density_map):
+        handlers = getattr(self.local, "handlers", None)
+        if handlers is None:
+            handlers = self.local.handlers = {}
+            with self.worker_handlers_lock:
+                self.worker_handlers.append(handlers)
+        key = (palette, density_map)
+        if key in handlers:
+            # Move to the end so the least recently used handler is evicted first
+            handlers[key] = handlers.pop(key)
+        else:
+            if len(handlers) >= MAX_HANDLERS_PER_WORKER:
+                handlers.pop(next(iter(handlers))).close()
+            handlers[key] = AsciiHandler(None, self.defaults["width"], density_map=density_map,
+                                         color_manager=self.color_manager_for(palette),
+                                         glyph_matcher=self.glyph_matcher, result_cache=self.result_cache,
+                                         character_aspect_ratio=self.character_aspect_ratio)
+        return handlers[key]
+
+    def warm_up(self):
+        # Builds the default color manager and its lookup table up front so
+        # the first request does not pay for them
+        color_manager = self.color_manager_for(self.defaults["palette"])
+        color_manager.quantize(np.zeros((1, 1, 3), dtype=np.uint8))
+
+    def parse_options(self, query):
+        params = {name: values[-1] for name, values in parse_qs(query, keep_blank_values=True).items()}
+        options = dict(self.defaults)
+        if "width" in params:
+            options["width"] = int(params["width"])
+            if not 0 < options["width"] <= MAX_WIDTH:
+                raise ValueError(f"Width should be between 1 and {MAX_WIDTH}.")
+        if "palette" in params:
+            options["palette"] = ColorPalettes(params["palette"])
+        if "density_map" in params:
+            options["density_map"] = params["density_map"]
+            if not options["density_map"]:
+                raise ValueError("Density map should not be empty.")
+        if "invert" in params:
+            options["invert"] = params["invert"].lower() in TRUE_VALUES
+        if "format" in params:
+            options["format"] = params["format"]
+            if options["format"] not in CONTENT_TYPES:
+                raise ValueError(f"Invalid output format: {options['format']}")
+        return options
+
+    def acquire(self):
+        if not self.slots.acquire(blocking=False):
+            self.stats.count("rejected")
+            raise ServerOverloaded()
+        with self.stats.lock:
+            self.stats.in_flight += 1
+
+    def release(self):
+        with self.stats.lock:
+            self.stats.in_flight -= 1
+        self.slots.release()
+
+    def convert(self, data, options):
+        handler = self.handler_for(options["palette"], options["density_map"])
+        handler.width = options["width"]
+        handler.img = ImageHandler("bytes", data, target_width=options["width"]).load_image()
+        try:
+            frame = handler.image_to_frame(
+                adaptive_hist_eq=self.adaptive_hist_eq, invert=options["invert"])
+        finally:
+            handler.img = None
+
+        if options["format"] == "ansi":
+            return handler.renderer.render(frame)
+        elif options["format"] == "html":
+            return frame.to_html().encode("utf-8")
+        return frame.to_text().encode("utf-8")
+
+    def submit(self, data, options):
+        # The caller must hold a slot from acquire(); it is released when the
+        # conversion finishes
+        start = time.perf_counter()
+        future = self.executor.submit(self.convert, data, options)
+
+        def done(future):
+            self.release()
+            if future.exception() is not None:
+                self.stats.count("failed")
+            else:
+                self.stats.record(time.perf_counter() - start, len(data), len(future.result()))
+
+        future.add_done_callback(done)
+        return future
+
+    def stats_snapshot(self):
+        snapshot = self.stats.snapshot()
+        if self.result_cache is not None:
+            snapshot["result_cache"] = self.result_cache.stats()
+        return snapshot
+
+    def shutdown(self):
+        self.executor.shutdown(wait=True)
+        with self.worker_handlers_lock:
+            for handlers in self.worker_handlers:
+                for handler in handlers.values():
+                    handler.close()
+
+
+class ConversionRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        # Headers and body go out in separate writes, and without TCP_NODELAY
+        # the body waits for the client's delayed ACK. Unix sockets have no
+        # Nagle algorithm to disable.
+        self.disable_nagle_algorithm = isinstance(self.client_address, tuple)
+        super().setup()
+
+    def send_body(self, status, body, content_type, retry_after=None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        if retry_after is not None:
+            self.send_header("Retry-After", str(retry_after))
+        if self.close_connection:
+            self.send_header("Connection", "close")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_error_body(self, status, message, retry_after=None):
+        self.send_body(status, (message + "\n").encode("utf-8"), "text/plain; charset=utf-8", retry_after)
+
+    def do_GET(self):
+        path = urlsplit(self.path).path
+        if path == "/stats":
+            body = json.dumps(self.server.service.stats_snapshot(), indent=2).encode("utf-8") + b"\n"
+            self.send_body(HTTPStatus.OK, body, "application/json")
+        else:
+            self.send_error_body(HTTPStatus.NOT_FOUND, "Not found")
+
+    def content_length(self):
+        length = self.headers.get("Content-Length")
+        return int(length) if length is not None and length.isdigit() else None
+
+    def reject(self, status, message, retry_after=None, body_sent=True):
+        # Reading a bounded body lets the client finish its upload and see the
+        # answer; a client waiting for 100 Continue never sent one
+        length = self.content_length()
+        if body_sent and length is not None and length <= self.server.service.max_request_bytes:
+            self.rfile.read(length)
+        else:
+            self.close_connection = True
+        self.send_error_body(status, message, retry_after)
+
+    def admit(self, body_sent=True):
+        # Validates a conversion request and reserves a worker slot for it.
+        # Returns the options, or None once the request has been answered.
+        service = self.server.service
+        url = urlsplit(self.path)
+        if url.path != "/convert":
+            return self.reject(HTTPStatus.NOT_FOUND, "Not found", body_sent=body_sent)
+        length = self.content_length()
+        if length is None:
+            return self.reject(HTTPStatus.LENGTH_REQUIRED, "Content-Length required", body_sent=body_sent)
+        if length > service.max_request_bytes:
+            return self.reject(HTTPStatus.REQUEST_ENTITY_TOO_LARGE,
+                               f"Images are limited to {service.max_request_bytes} bytes", body_sent=body_sent)
+        try:
+            options = service.parse_options(url.query)
+        except ValueError as e:
+            return self.reject(HTTPStatus.BAD_REQUEST, str(e), body_sent=body_sent)
+        try:
+            service.acquire()
+        except ServerOverloaded:
+            return self.reject(HTTPStatus.SERVICE_UNAVAILABLE, "Server busy", retry_after=1, body_sent=body_sent)
+        return options
+
+    def handle_expect_100(self):
+        # Clients that send "Expect: 100-continue" are admitted before they
+        # upload, so a busy server turns them away without reading the image
+        self.admitted = None
+        if self.command == "POST":
+            self.admitted = self.admit(body_sent=False)
+            if self.admitted is None:
+                return False
+        return super().handle_expect_100()
+
+    def do_POST(self):
+        options, self.admitted = getattr(self, "admitted", None), None
+        if options is None:
+            options = self.admit()
+            if options is None:
+                return
+
+        service = self.server.service
+        try:
+            data = self.rfile.read(self.content_length())
+        except OSError:
+            service.release()
+            raise
+        try:
+            body = service.submit(data, options).result()
+        except (OSError, ValueError) as e:
+            # Pillow raises these for truncated and unknown images
+            self.send_error_body(HTTPStatus.UNPROCESSABLE_ENTITY, f"Could not convert image: {e}")
+            return
+        except Exception as e:
+            self.send_error_body(HTTPStatus.INTERNAL_SERVER_ERROR, f"Conversion failed: {e}")
+            return
+        self.send_body(HTTPStatus.OK, body, CONTENT_TYPES[options["format"]])
+
+    def log_message(self, format, *args):
+        # Per-request logging would dominate the output of a busy server;
+        # /stats reports on the traffic instead
+        pass
+
+
+class ConversionHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, service):
+        super().__init__(address, ConversionRequestHandler)
+        self.service = service
+
+
+class UnixConversionHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path, service):
+        # A socket left behind by a previous run would make bind fail
+        if os.path.exists(path) and stat.S_ISSOCK(os.stat(path).st_mode):
+            os.unlink(path)
+        super().__init__(path, ConversionRequestHandler)
+        self.service = service
+
+    def server_close(self):
+        super().server_close()
+        try:
+            os.unlink(self.server_address)
+        except OSError:
+            pass
+
+
+class ConversionServer:
+    def __init__(self, address, service):
+        self.service = service
+        if isinstance(address, str):
+            self.httpd = UnixConversionHTTPServer(address, service)
+        else:
+            self.httpd = ConversionHTTPServer(address, service)
+
+    @property
+    def address(self):
+        address = self.httpd.server_address
+        if isinstance(address, str):
+            return address
+        return f"http://{address[0]}:{address[1]}"
+
+    def serve_forever(self):
+        self.service.warm_up()
+        if threading.current_thread() is threading.main_thread():
+            # httpd.shutdown() blocks until serve_forever returns, so it has
+            # to be called from another thread
+            signal.signal(signal.SIGTERM, lambda *_: threading.Thread(target=self.httpd.shutdown).start())
+        print(f"Serving on {self.address} with {self.service.workers} workers", file=sys.stderr)
+        try:
+            self.httpd.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.shutdown()
+
+    def shutdown(self):
+        self.httpd.server_close()
+        self.service.shutdown()
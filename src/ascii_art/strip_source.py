@@ -0,0 +1,170 @@
+import mmap
+import os
+from contextlib import contextmanager
+import numpy as np
+from PIL import Image
+from ascii_art.options import parse_raw_size
+
+# Images whose decoded pixels would take more than this are converted strip
+# by strip when their format allows it
+OUT_OF_CORE_BYTES = 512 << 20
+# Pillow raw modes that can be viewed in place, with their channel order
+RAW_MODE_CHANNELS = {"L": [0], "RGB": [0, 1, 2], "RGBA": [0, 1, 2, 3], "BGR": [2, 1, 0]}
+
+
+@contextmanager
+def unlimited_pixels():
+    # Opening an image only reads its header, so Pillow's decompression bomb
+    # check does not apply to images that are never decoded as a whole
+    limit = Image.MAX_IMAGE_PIXELS
+    Image.MAX_IMAGE_PIXELS = None
+    try:
+        yield
+    finally:
+        Image.MAX_IMAGE_PIXELS = limit
+
+
+class MemoryStrips:
+    # Strips of an image already in memory
+    def __init__(self, img):
+        self.img = img if img.ndim == 3 else img[:, :, np.newaxis]
+        self.shape = self.img.shape
+
+    def read_rows(self, start, stop, column_start=0, column_stop=None):
+        return self.img[start:stop, column_start:column_stop]
+
+    def release(self):
+        pass
+
+
+class MappedStrips:
+    # Base for sources read through a memory map of the whole file. Pages of
+    # a strip are dropped from the process once it has been reduced, so the
+    # resident size stays at about one strip however large the file is.
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self.mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def release(self):
+        if hasattr(mmap, "MADV_DONTNEED"):
+            self.mapped.madvise(mmap.MADV_DONTNEED)
+
+
+class ArrayStrips(MappedStrips):
+    # Strips of a (height, width[, channels]) uint8 array stored at offset,
+    # such as the data of an NPY or raw file
+    def __init__(self, path, shape, offset=0):
+        super().__init__(path)
+        height, width = shape[:2]
+        channels = shape[2] if len(shape) == 3 else 1
+        self.shape = (height, width, channels)
+        self.array = np.frombuffer(self.mapped, dtype=np.uint8, count=height * width * channels,
+                                   offset=offset).reshape(self.shape)
+
+    def read_rows(self, start, stop, column_start=0, column_stop=None):
+        return self.array[start:stop, column_start:column_stop]
+
+
+def raw_tile_layouts(img):
+    # (extents, offset, stride, orientation, channel order) of every tile of
+    # img, or None unless all of them are uncompressed in one pixel layout
+    # that RawTileStrips can view in place
+    layouts = []
+    for tile in img.tile:
+        # Tiles are plain tuples before Pillow 11, so they are read by position
+        codec_name, extents, offset, args = tile[:4]
+        args = (args,) if isinstance(args, str) else tuple(args)
+        rawmode = args[0] if args else None
+        stride = args[1] if len(args) > 1 else 0
+        orientation = args[2] if len(args) > 2 else 1
+        if codec_name != "raw" or rawmode not in RAW_MODE_CHANNELS or orientation not in (1, -1):
+            return None
+        order = RAW_MODE_CHANNELS[rawmode]
+        if layouts and len(layouts[0][4]) != len(order):
+            return None
+        layouts.append((extents, offset, stride, orientation, order))
+    return layouts or None
+
+
+class RawTileStrips(MappedStrips):
+    # Strips assembled from the uncompressed tiles that Pillow locates in a
+    # TIFF, BMP or PPM file. Only the tiles overlapping the requested rows are
+    # read, each through a view of the memory-mapped file.
+    def __init__(self, path, img):
+        self.tiles = raw_tile_layouts(img)
+        if self.tiles is None:
+            raise ValueError(f"{path} is compressed or uses an unsupported pixel layout")
+        super().__init__(path)
+        self.shape = (img.height, img.width, len(self.tiles[0][4]))
+
+    def tile_pixels(self, extents, offset, stride, orientation, order):
+        left, top, right, bottom = extents
+        tile_width = right - left
+        row_bytes = stride or tile_width * len(order)
+        rows = np.frombuffer(self.mapped, dtype=np.uint8, count=(bottom - top) * row_bytes, offset=offset)
+        pixels = rows.reshape(bottom - top, row_bytes)[:, :tile_width * len(order)]
+        pixels = pixels.reshape(bottom - top, tile_width, len(order))
+        if orientation < 0:
+            pixels = pixels[::-1]
+        return pixels
+
+    def read_rows(self, start, stop, column_start=0, column_stop=None):
+        # Only the tiles overlapping the rows and columns are touched, and of
+        # those only the pages holding the requested span of each row
+        height, width, channels = self.shape
+        column_stop = width if column_stop is None else min(column_stop, width)
+        strip = np.empty((stop - start, column_stop - column_start, channels), dtype=np.uint8)
+        for extents, offset, stride, orientation, order in self.tiles:
+            left, top, right, bottom = extents
+            right = min(right, width)
+            if bottom <= start or top >= stop or right <= column_start or left >= column_stop:
+                continue
+            pixels = self.tile_pixels(extents, offset, stride, orientation, order)
+            first, last = max(top, start), min(bottom, stop, height)
+            first_column, last_column = max(left, column_start), min(right, column_stop)
+            strip[first - start:last - start, first_column - column_start:last_column - column_start] = \
+                pixels[first - top:last - top, first_column - left:last_column - left][..., order]
+        return strip
+
+
+def npy_layout(path):
+    # Shape and data offset of an NPY file, read from its header
+    with open(path, "rb") as f:
+        version = np.lib.format.read_magic(f)
+        if version == (1, 0):
+            shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+        else:
+            shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+        if dtype != np.uint8 or fortran_order or len(shape) not in (2, 3):
+            raise ValueError(f"{path} should hold a C-ordered 2D or 3D uint8 array")
+        return shape, f.tell()
+
+
+def open_strip_source(path, raw_size=None):
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".npy":
+        shape, offset = npy_layout(path)
+        return ArrayStrips(path, shape, offset)
+    if raw_size is not None or extension == ".raw":
+        if raw_size is None:
+            raise ValueError("Raw images need their size, e.g. --raw-size 40000x30000")
+        width, height, channels = raw_size
+        if os.path.getsize(path) < width * height * channels:
+            raise ValueError(f"{path} is smaller than a {width}x{height}x{channels} image")
+        return ArrayStrips(path, (height, width, channels))
+    with unlimited_pixels(), Image.open(path) as img:
+        return RawTileStrips(path, img)
+
+
+def needs_strips(path, raw_size=None):
+    # NPY and raw files can only be read as strips; other images are when
+    # they would not comfortably fit in memory and can be read in strips
+    extension = os.path.splitext(path)[1].lower()
+    if extension in (".npy", ".raw") or raw_size is not None:
+        return True
+    try:
+        with unlimited_pixels(), Image.open(path) as img:
+            decoded_bytes = img.width * img.height * len(img.getbands())
+            return decoded_bytes > OUT_OF_CORE_BYTES and raw_tile_layouts(img) is not None
+    except OSError:
+        return False
@@ -0,0 +1,165 @@
+import io
+import os
+import sys
+import numpy as np
+from ascii_art.ascii_frame import as_frame
+from ascii_art.color_manager import ColorPalettes
+from ascii_art.profiler import profiler
+
+RESET = "\x1b[0m"
+CURSOR_HOME = "\x1b[H"
+
+
+def raw_fd(stream):
+    # The file descriptor under stream when its bytes can be written there
+    # directly, or None when they have to go through stream.write: on
+    # Windows, and for wrappers such as the one colorama.init() puts around
+    # sys.stdout to translate escape codes for legacy consoles
+    if sys.platform == "win32" or not isinstance(stream, io.IOBase):
+        return None
+    try:
+        return stream.fileno()
+    except (AttributeError, io.UnsupportedOperation):
+        return None
+
+
+def color_runs(text, keys, current_key=-1):
+    # Splits a row of cells into runs of one color. Spaces look the same in
+    # any foreground color, so they extend the current run instead of
+    # starting a new one. Returns the offsets where a run starts and the
+    # color of every cell after spaces are folded into their run.
+    blank = np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32) == ord(' ')
+    source = np.where(blank, -1, np.arange(len(text)))
+    np.maximum.accumulate(source, out=source)
+    filled = np.where(source >= 0, keys[np.maximum(source, 0)], current_key)
+    previous = np.concatenate(([current_key], filled[:-1]))
+    return np.flatnonzero(filled != previous), filled
+
+
+class TerminalRenderer:
+    def __init__(self, color_manager, stream=None):
+        self.color_manager = color_manager
+        self.stream = stream if stream is not None else sys.stdout
+        self.last_frame_bytes = 0
+        self._sgr_sequences = None
+
+    def sgr_sequence(self, key):
+        if self.color_manager.palette_type == ColorPalettes.truecolor:
+            return f"\x1b[38;2;{key >> 16};{(key >> 8) & 0xFF};{key & 0xFF}m"
+        if self._sgr_sequences is None:
+            self._sgr_sequences = [f"\x1b[38;5;{code}m" for code in self.color_manager.terminal_color_codes()]
+        return self._sgr_sequences[key]
+
+    def encode_cells(self, text, keys, current_key=-1):
+        # Emits text with an SGR sequence wherever the color changes. Returns
+        # the text and the color the terminal is left in.
+        if keys is None or not text:
+            return text, current_key
+        changes, filled = color_runs(text, keys, current_key)
+
+        parts = []
+        start = 0
+        for change in changes:
+            parts.append(text[start:change])
+            parts.append(self.sgr_sequence(int(filled[change])))
+            start = change
+        parts.append(text[start:])
+        return ''.join(parts), int(filled[-1])
+
+    def render(self, ascii_map, color_map=None):
+        frame = as_frame(ascii_map, color_map, self.color_manager)
+        rows = frame.text_rows()
+        keys = frame.color_keys(self.color_manager)
+        if keys is None:
+            return ('\n'.join(rows) + '\n').encode()
+
+        parts = []
+        current_key = -1
+        for row, row_keys in zip(rows, keys):
+            encoded, current_key = self.encode_cells(row, row_keys, current_key)
+            parts.append(encoded)
+            parts.append('\n')
+        parts.insert(-1, RESET)
+        return ''.join(parts).encode()
+
+    def write(self, data):
+        profiler.count("bytes_emitted", len(data))
+        with profiler.span("terminal_write"):
+            fd = raw_fd(self.stream)
+            if fd is None:
+                self.stream.write(data.decode())
+                return
+            self.stream.flush()
+            view = memoryview(data)
+            while view:
+                view = view[os.write(fd, view):]
+
+    def write_frame(self, ascii_map, color_map=None):
+        with profiler.span("render_frame"):
+            data = self.render(ascii_map, color_map)
+        self.write(data)
+        self.last_frame_bytes = len(data)
+        return self.last_frame_bytes
+
+    def legacy_frame_bytes(self, ascii_map, color_map):
+        # Size of the same frame written one character at a time, each wrapped
+        # in its own xterm256 color sequence and reset
+        frame = as_frame(ascii_map, color_map, self.color_manager)
+        color_map = np.asarray(frame.color_map, dtype=np.float64)
+        steps = np.rint(color_map / 255 * 5).astype(int)
+        codes = 16 + 36 * steps[..., 0] + 6 * steps[..., 1] + steps[..., 2]
+        code_digits = np.where(codes >= 100, 3, np.where(codes >= 10, 2, 1))
+        wrapper_bytes = len("\x1b[38;5;m") + len(RESET)
+        text_bytes = len(frame.to_text().encode())
+        return int(code_digits.sum()) + wrapper_bytes * codes.size + text_bytes
+
+
+class DeltaRenderer(TerminalRenderer):
+    # Unchanged gaps up to this many cells are rewritten rather than skipped
+    # with a cursor move, which would cost about as many bytes
+    MAX_GAP = 6
+
+    def __init__(self, color_manager, stream=None, full_redraw_ratio=0.5):
+        super().__init__(color_manager, stream)
+        self.full_redraw_ratio = full_redraw_ratio
+        self.previous_glyphs = None
+        self.previous_keys = None
+
+    def reset(self):
+        self.previous_glyphs = None
+        self.previous_keys = None
+
+    def render(self, ascii_map, color_map=None):
+        frame = as_frame(ascii_map, color_map, self.color_manager)
+        glyphs = frame.codepoints()
+        keys = frame.color_keys(self.color_manager)
+        compare_keys = keys if keys is not None else np.zeros(glyphs.shape, dtype=np.int64)
+
+        full_redraw = self.previous_glyphs is None or self.previous_glyphs.shape != glyphs.shape
+        if not full_redraw:
+            changed = (glyphs != self.previous_glyphs) | (
+                (compare_keys != self.previous_keys) & (glyphs != ord(' ')))
+            full_redraw = changed.mean() > self.full_redraw_ratio
+
+        self.previous_glyphs = glyphs
+        self.previous_keys = compare_keys
+        if full_redraw:
+            return CURSOR_HOME.encode() + super().render(frame)
+
+        parts = []
+        current_key = -1
+        for row_index in np.flatnonzero(changed.any(axis=1)):
+            row = frame.row_text(row_index)
+            columns = np.flatnonzero(changed[row_index])
+            breaks = np.flatnonzero(np.diff(columns) > self.MAX_GAP + 1)
+            run_starts = np.concatenate(([columns[0]], columns[breaks + 1]))
+            run_ends = np.concatenate((columns[breaks], [columns[-1]])) + 1
+            for start, end in zip(run_starts, run_ends):
+                parts.append(f"\x1b[{row_index + 1};{start + 1}H")
+                run_keys = keys[row_index, start:end] if keys is not None else None
+                encoded, current_key = self.encode_cells(row[start:end], run_keys, current_key)
+                parts.append(encoded)
+        if parts:
+            # Leave the cursor below the frame like a full redraw does
+            parts.append(f"{RESET}\x1b[{len(frame) + 1};1H")
+        return ''.join(parts).encode()
@@ -0,0 +1,144 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from urllib.parse import urlsplit
+from PIL import Image, ImageFile
+from ascii_art.image_handler import ImageHandler
+from ascii_art.profiler import profiler
+
+DEFAULT_TIMEOUT = 10.0
+DEFAULT_MAX_BYTES = 32 << 20
+DEFAULT_CONNECTIONS = 16
+DEFAULT_CONNECTIONS_PER_HOST = 4
+CHUNK_SIZE = 64 << 10
+# ImageFile.Parser copies everything it has received on every feed until it
+# recognizes the header, so give up on progressive decoding after this much
+HEADER_PROBE_BYTES = 1 << 20
+
+
+class DownloadError(Exception):
+    pass
+
+
+class StreamDecoder:
+    # Decodes an image from chunks as they arrive. Pillow decodes formats such
+    # as GIF, BMP and TIFF progressively through ImageFile.Parser. For the
+    # others (JPEG, PNG, WebP) it can only buffer, so those are collected in a
+    # bytearray and decoded once, at the reduced resolution ImageHandler picks
+    # for the target width. Either way the header is parsed from the first
+    # chunks, so oversized images are rejected before they are downloaded.
+    def __init__(self, target_width=None, max_pixels=None):
+        self.handler = ImageHandler("bytes", None, target_width=target_width)
+        self.max_pixels = max_pixels if max_pixels is not None else Image.MAX_IMAGE_PIXELS
+        self.parser = ImageFile.Parser()
+        self.buffer = None
+        self.size = None
+
+    def feed(self, chunk):
+        if self.buffer is not None:
+            self.buffer += chunk
+            return
+        self.parser.feed(chunk)
+        if self.parser.image is None:
+            if len(self.parser.data) > HEADER_PROBE_BYTES:
+                self.buffer = bytearray(self.parser.data)
+                self.parser = None
+        elif self.size is None:
+            self.size = self.parser.image.size
+            if self.max_pixels and self.size[0] * self.size[1] > self.max_pixels:
+                raise DownloadError(f"Image is too large: {self.size[0]}x{self.size[1]} pixels")
+            if self.parser.decoder is None:
+                # Not progressive; take over the data collected so far
+                self.buffer = bytearray(self.parser.data)
+                self.parser = None
+
+    def close(self):
+        with profiler.span("decode_image"):
+            if self.buffer is not None:
+                return self.handler.decode_image(BytesIO(self.buffer))
+            with self.parser.close() as img:
+                return self.handler.reduce_image(img)
+
+
+def fetch_image(session, url, target_width=None, timeout=DEFAULT_TIMEOUT, max_bytes=DEFAULT_MAX_BYTES,
+                chunk_size=CHUNK_SIZE):
+    # Streams an image into a StreamDecoder. timeout bounds both every network
+    # wait and the transfer as a whole, so a server dripping bytes cannot hold
+    # a connection forever.
+    deadline = time.monotonic() + timeout
+    with session.get(url, stream=True, timeout=timeout) as response:
+        response.raise_for_status()
+        length = response.headers.get("Content-Length")
+        if length is not None and length.isdigit() and int(length) > max_bytes:
+            raise DownloadError(f"Image is larger than {max_bytes} bytes: {url}")
+        decoder = StreamDecoder(target_width)
+        received = 0
+        for chunk in response.iter_content(chunk_size):
+            received += len(chunk)
+            if received > max_bytes:
+                raise DownloadError(f"Image is larger than {max_bytes} bytes: {url}")
+            if time.monotonic() > deadline:
+                raise DownloadError(f"Download took longer than {timeout}s: {url}")
+            decoder.feed(chunk)
+    profiler.count("bytes_downloaded", received)
+    return decoder.close()
+
+
+def create_session(connections=DEFAULT_CONNECTIONS):
+    import requests
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=connections, pool_maxsize=connections)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+class UrlLoader:
+    def __init__(self, target_width=None, connections=DEFAULT_CONNECTIONS,
+                 connections_per_host=DEFAULT_CONNECTIONS_PER_HOST, timeout=DEFAULT_TIMEOUT,
+                 max_bytes=DEFAULT_MAX_BYTES, session=None):
+        self.target_width = target_width
+        self.connections = connections
+        self.connections_per_host = connections_per_host
+        self.timeout = timeout
+        self.max_bytes = max_bytes
+        self.session = session if session is not None else create_session(connections)
+
+    def fetch(self, url):
+        with profiler.span("fetch_image"):
+            return fetch_image(self.session, url, self.target_width, self.timeout, self.max_bytes)
+
+    async def fetch_all(self, urls):
+        # Yields (url, image or exception) pairs as downloads complete. requests
+        # blocks, so each download runs on a pool thread; the event loop only
+        # schedules them within the global and per-host connection limits.
+        # Chunks are decoded on that thread as they arrive, so a download
+        # overlaps the others and the caller's conversions, but not its own
+        # network waits as a fully asynchronous client would.
+        import asyncio
+        loop = asyncio.get_running_loop()
+        host_limits = {}
+        with ThreadPoolExecutor(max_workers=self.connections, thread_name_prefix="fetch") as executor:
+            async def fetch_one(url):
+                host = urlsplit(url).netloc
+                if host not in host_limits:
+                    host_limits[host] = asyncio.Semaphore(self.connections_per_host)
+                async with host_limits[host]:
+                    try:
+                        return url, await loop.run_in_executor(executor, self.fetch, url)
+                    except Exception as e:
+                        return url, e
+
+            for future in asyncio.as_completed([fetch_one(url) for url in urls]):
+                yield await future
+
+    def load_all(self, urls, callback):
+        # Calls callback(url, image or exception) from the event loop thread
+        # for every URL as soon as it has been fetched
+        import asyncio
+
+        async def run():
+            async for url, result in self.fetch_all(urls):
+                callback(url, result)
+
+        asyncio.run(run())
@@ -0,0 +1,201 @@
+import queue
+import sys
+import threading
+import time
+import numpy as np
+from ascii_art.terminal_renderer import DeltaRenderer
+
+CLEAR_SCREEN = "\x1b[2J"
+HIDE_CURSOR = "\x1b[?25l"
+SHOW_CURSOR = "\x1b[?25h"
+
+
+class StageStats:
+    def __init__(self, name):
+        self.name = name
+        self.latencies = []
+        self.dropped = 0
+
+    def record(self, seconds):
+        self.latencies.append(seconds)
+
+    def summary(self):
+        if not self.latencies:
+            return f"{self.name:>10}: no frames"
+        latencies_ms = np.array(self.latencies) * 1000
+        return (f"{self.name:>10}: {len(latencies_ms)} frames, "
+                f"mean {latencies_ms.mean():.1f} ms, p95 {np.percentile(latencies_ms, 95):.1f} ms, "
+                f"max {latencies_ms.max():.1f} ms, dropped {self.dropped}")
+
+
+class VideoStream:
+    def __init__(self, source, ascii_handler, fps=15, adaptive_hist_eq=False, invert=False,
+                 monochrome=False, queue_size=2, stream=None):
+        # A purely numeric source is a camera index, anything else a file path or URL
+        self.source = int(source) if str(source).isdigit() else source
+        self.ascii_handler = ascii_handler
+        self.fps = fps
+        self.adaptive_hist_eq = adaptive_hist_eq
+        self.invert = invert
+        self.monochrome = monochrome
+        self.renderer = DeltaRenderer(ascii_handler.color_manager, stream)
+        self.frame_queue = queue.Queue(maxsize=queue_size)
+        self.render_queue = queue.Queue(maxsize=queue_size)
+        self.stop_event = threading.Event()
+        self.stats = {name: StageStats(name) for name in ("capture", "convert", "render", "end-to-end")}
+        self.bytes_written = 0
+
+    def put_latest(self, target_queue, item, stats):
+        # Slow consumers should see the newest frame, so the oldest queued
+        # frame is dropped instead of blocking the producer
+        while True:
+            try:
+                target_queue.put_nowait(item)
+                return
+            except queue.Full:
+                try:
+                    target_queue.get_nowait()
+                    stats.dropped += 1
+                except queue.Empty:
+                    pass
+
+    def open_capture(self):
+        import cv2
+        cap = cv2.VideoCapture(self.source)
+        if not cap.isOpened():
+            raise IOError(f"Could not open video source: {self.source}")
+        return cap
+
+    def capture(self, cap):
+        import cv2
+        is_file = not isinstance(self.source, int)
+        source_fps = cap.get(cv2.CAP_PROP_FPS) or self.fps
+        frame_interval = 1 / self.fps
+        next_frame_time = time.perf_counter()
+        source_position = 0.0
+        frames_read = 0
+        try:
+            while not self.stop_event.is_set():
+                start = time.perf_counter()
+                if is_file:
+                    # Skip source frames so files play back in real time at the target fps
+                    while frames_read < int(source_position):
+                        if not cap.grab():
+                            return
+                        frames_read += 1
+                    source_position += max(source_fps / self.fps, 1)
+                ret, frame = cap.read()
+                if not ret:
+                    return
+                frames_read += 1
+                frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+                self.stats["capture"].record(time.perf_counter() - start)
+                self.put_latest(self.frame_queue, (start, frame), self.stats["capture"])
+
+                next_frame_time += frame_interval
+                delay = next_frame_time - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                else:
+                    next_frame_time = time.perf_counter()
+        finally:
+            cap.release()
+            self.frame_queue.put(None)
+
+    def frames(self):
+        # Yields (frame, duration in ms) for the source at the target fps
+        # without dropping any, for recording. Files are converted as fast as
+        # possible, cameras are read at the target fps until interrupted.
+        import cv2
+        cap = self.open_capture()
+        is_file = not isinstance(self.source, int)
+        source_fps = cap.get(cv2.CAP_PROP_FPS) or self.fps
+        step = max(source_fps / self.fps, 1) if is_file else 1
+        clock_fps = source_fps if is_file else self.fps
+        source_position = 0.0
+        frames_read = 0
+        shown_ms = 0
+        started = time.perf_counter()
+        try:
+            while True:
+                if is_file:
+                    while frames_read < int(source_position):
+                        if not cap.grab():
+                            return
+                        frames_read += 1
+                else:
+                    time.sleep(max(0.0, started + source_position / self.fps - time.perf_counter()))
+                ret, frame = cap.read()
+                if not ret:
+                    return
+                frames_read += 1
+                source_position += step
+                self.ascii_handler.img = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+                frame = self.ascii_handler.image_to_frame(adaptive_hist_eq=self.adaptive_hist_eq, invert=self.invert)
+                # Rounding the end time rather than each duration keeps the
+                # recording in sync with the source
+                end_ms = round(1000 * source_position / clock_fps)
+                yield frame, end_ms - shown_ms
+                shown_ms = end_ms
+        finally:
+            cap.release()
+            self.ascii_handler.img = None
+
+    def record(self, output_path):
+        from ascii_art.recording import Recorder
+        with Recorder(output_path) as recorder:
+            try:
+                for frame, duration in self.frames():
+                    recorder.add(frame.monochrome() if self.monochrome else frame, duration)
+            except KeyboardInterrupt:
+                pass
+        print(f"{len(recorder.entries)} frames, {recorder.start / 1000:.1f} s, "
+              f"{recorder.compressed_bytes / max(1, len(recorder.entries)):.0f} bytes/frame", file=sys.stderr)
+
+    def convert(self):
+        try:
+            while True:
+                item = self.frame_queue.get()
+                if item is None:
+                    return
+                captured_at, frame = item
+                start = time.perf_counter()
+                self.ascii_handler.img = frame
+                frame = self.ascii_handler.image_to_frame(
+                    adaptive_hist_eq=self.adaptive_hist_eq, invert=self.invert)
+                self.stats["convert"].record(time.perf_counter() - start)
+                self.put_latest(self.render_queue, (captured_at, frame), self.stats["convert"])
+        finally:
+            self.render_queue.put(None)
+
+    def render(self):
+        while True:
+            item = self.render_queue.get()
+            if item is None:
+                return
+            captured_at, frame = item
+            start = time.perf_counter()
+            self.bytes_written += self.renderer.write_frame(frame.monochrome() if self.monochrome else frame)
+            end = time.perf_counter()
+            self.stats["render"].record(end - start)
+            self.stats["end-to-end"].record(end - captured_at)
+
+    def run(self):
+        renderer = self.renderer
+        cap = self.open_capture()
+        renderer.write((CLEAR_SCREEN + HIDE_CURSOR).encode())
+        threads = [threading.Thread(target=self.capture, args=(cap,), daemon=True),
+                   threading.Thread(target=self.convert, daemon=True)]
+        for thread in threads:
+            thread.start()
+        try:
+            self.render()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop_event.set()
+            renderer.write(SHOW_CURSOR.encode())
+            print("\n".join(stats.summary() for stats in self.stats.values()), file=sys.stderr)
+            frames_rendered = len(self.stats["render"].latencies)
+            if frames_rendered:
+                print(f"{'output':>10}: {self.bytes_written / frames_rendered:.0f} bytes/frame", file=sys.stderr)
@@ -0,0 +1,249 @@
+import os
+import shutil
+import sys
+import time
+from collections import OrderedDict
+import numpy as np
+from ascii_art.ascii_handler import reduce_strips
+from ascii_art.profiler import profiler
+from ascii_art.strip_source import MemoryStrips
+from ascii_art.terminal_renderer import DeltaRenderer
+from ascii_art.video_stream import CLEAR_SCREEN, HIDE_CURSOR, SHOW_CURSOR, StageStats
+
+CHUNK_CELLS = 64
+# Cells of the overview grid that levels this coarse or coarser are reduced
+# from, so that zooming out never reads the whole source again
+OVERVIEW_CELLS = 1 << 20
+DEFAULT_VIEWER_BYTES = 64 << 20
+KEY_ACTIONS = {
+    "\x1b[A": "up", "k": "up", "\x1b[B": "down", "j": "down",
+    "\x1b[D": "left", "h": "left", "\x1b[C": "right", "l": "right",
+    "+": "zoom_in", "=": "zoom_in", "i": "zoom_in", "-": "zoom_out", "o": "zoom_out",
+    "f": "fit", "0": "fit", "q": "quit", "\x1b": "quit",
+}
+
+
+def parse_keys(data):
+    # Splits what the terminal sent into keys; arrow keys arrive as
+    # three-character escape sequences
+    keys = []
+    index = 0
+    while index < len(data):
+        if data.startswith("\x1b[", index) and index + 2 < len(data):
+            keys.append(data[index:index + 3])
+            index += 3
+        else:
+            keys.append(data[index])
+            index += 1
+    return keys
+
+
+class TilePyramid:
+    # Cell grids of an image at power-of-two zoom levels. At level k a cell
+    # spans 2**k source pixels across and the height that keeps the
+    # character aspect ratio, so level 0 shows every pixel. Levels are split
+    # into chunks of chunk_cells x chunk_cells cells, each reduced and
+    # quantized when it first comes into view and evicted least recently used
+    # beyond memory_bytes. Chunks of fine levels are reduced from the source,
+    # which only reads the pixels under them; chunks of the coarse levels are
+    # reduced from an overview grid built in one pass over the source.
+    def __init__(self, source, ascii_handler, invert=False, memory_bytes=DEFAULT_VIEWER_BYTES,
+                 chunk_cells=CHUNK_CELLS):
+        self.source = source
+        self.ascii_handler = ascii_handler
+        self.invert = invert
+        self.memory_bytes = memory_bytes
+        self.chunk_cells = chunk_cells
+        self.chunks = OrderedDict()
+        self.bytes_used = 0
+        # The level at which the whole image is a single column
+        self.top_level = int(np.ceil(np.log2(source.shape[1])))
+        self.overview_level = 0
+        while np.prod(self.level_shape(self.overview_level)) > OVERVIEW_CELLS:
+            self.overview_level += 1
+        self.overview = None
+        self.counters = dict.fromkeys(("chunk_hits", "chunks_built", "chunks_evicted"), 0)
+
+    def level_shape(self, level):
+        height, width = self.source.shape[:2]
+        scale = 2 ** level
+        aspect_ratio = self.ascii_handler.character_aspect_ratio
+        return max(1, round(height * aspect_ratio / scale)), max(1, round(width / scale))
+
+    def chunk_source(self, level):
+        if level < self.overview_level:
+            return self.source
+        if self.overview is None:
+            with profiler.span("build_overview"):
+                self.overview = MemoryStrips(reduce_strips(self.source, *self.level_shape(self.overview_level)))
+        return self.overview
+
+    def chunk(self, level, chunk_row, chunk_column):
+        key = (level, chunk_row, chunk_column)
+        entry = self.chunks.get(key)
+        if entry is not None:
+            self.chunks.move_to_end(key)
+            self.counters["chunk_hits"] += 1
+            return entry
+
+        rows, columns = self.level_shape(level)
+        size = self.chunk_cells
+        row_bins = (chunk_row * size, min((chunk_row + 1) * size, rows))
+        column_bins = (chunk_column * size, min((chunk_column + 1) * size, columns))
+        with profiler.span("build_chunk"):
+            means = reduce_strips(self.chunk_source(level), rows, columns, row_bins=row_bins,
+                                  column_bins=column_bins)
+            if means.shape[2] == 1:
+                means = np.repeat(means, 3, axis=2)
+            entry = self.ascii_handler.generate_index_maps(means, means.shape[0], means.shape[1], self.invert)
+        self.counters["chunks_built"] += 1
+
+        self.chunks[key] = entry
+        self.bytes_used += entry[0].nbytes + entry[1].nbytes
+        while self.bytes_used > self.memory_bytes and len(self.chunks) > 1:
+            _, (char_indices, color_indices) = self.chunks.popitem(last=False)
+            self.bytes_used -= char_indices.nbytes + color_indices.nbytes
+            self.counters["chunks_evicted"] += 1
+        return entry
+
+    def region(self, level, top, left, num_rows, num_columns):
+        # Char and palette indices of a rectangle of cells within a level,
+        # stitched together from the chunks it overlaps
+        size = self.chunk_cells
+        char_rows, color_rows = [], []
+        for chunk_row in range(top // size, (top + num_rows - 1) // size + 1):
+            row_slice = slice(max(top - chunk_row * size, 0), min(top + num_rows - chunk_row * size, size))
+            char_parts, color_parts = [], []
+            for chunk_column in range(left // size, (left + num_columns - 1) // size + 1):
+                column_slice = slice(max(left - chunk_column * size, 0),
+                                     min(left + num_columns - chunk_column * size, size))
+                char_indices, color_indices = self.chunk(level, chunk_row, chunk_column)
+                char_parts.append(char_indices[row_slice, column_slice])
+                color_parts.append(color_indices[row_slice, column_slice])
+            char_rows.append(np.concatenate(char_parts, axis=1))
+            color_rows.append(np.concatenate(color_parts, axis=1))
+        return np.concatenate(char_rows), np.concatenate(color_rows)
+
+
+class PyramidViewer:
+    def __init__(self, pyramid, monochrome=False, stream=None, viewport=None):
+        self.pyramid = pyramid
+        self.monochrome = monochrome
+        self.renderer = DeltaRenderer(pyramid.ascii_handler.color_manager, stream)
+        # (rows, columns) to draw, or None to fill the terminal
+        self.fixed_viewport = viewport
+        self.level = None
+        self.top = 0
+        self.left = 0
+        self.last_shape = None
+        self.stats = StageStats("keypress")
+
+    def viewport(self):
+        if self.fixed_viewport is not None:
+            return self.fixed_viewport
+        columns, rows = shutil.get_terminal_size()
+        # The last line shows the status
+        return max(1, rows - 1), max(1, columns)
+
+    def fit(self):
+        # The finest level at which the whole image fits the viewport
+        rows, columns = self.viewport()
+        self.level = self.pyramid.top_level
+        while self.level > 0:
+            level_rows, level_columns = self.pyramid.level_shape(self.level - 1)
+            if level_rows > rows or level_columns > columns:
+                break
+            self.level -= 1
+        self.top = self.left = 0
+
+    def clamp(self):
+        rows, columns = self.viewport()
+        level_rows, level_columns = self.pyramid.level_shape(self.level)
+        self.top = min(max(self.top, 0), max(level_rows - rows, 0))
+        self.left = min(max(self.left, 0), max(level_columns - columns, 0))
+
+    def zoom(self, steps):
+        # Changes level keeping the cell in the middle of the viewport there
+        level = min(max(self.level - steps, 0), self.pyramid.top_level)
+        if level == self.level:
+            return
+        rows, columns = self.viewport()
+        scale = 2.0 ** (self.level - level)
+        self.top = int((self.top + rows / 2) * scale - rows / 2)
+        self.left = int((self.left + columns / 2) * scale - columns / 2)
+        self.level = level
+        self.clamp()
+
+    def pan(self, rows, columns):
+        self.top += rows
+        self.left += columns
+        self.clamp()
+
+    def handle_key(self, key):
+        # Returns False once the viewer should close
+        action = KEY_ACTIONS.get(key)
+        rows, columns = self.viewport()
+        row_step, column_step = max(1, rows // 8), max(1, columns // 8)
+        if action == "quit":
+            return False
+        elif action == "up":
+            self.pan(-row_step, 0)
+        elif action == "down":
+            self.pan(row_step, 0)
+        elif action == "left":
+            self.pan(0, -column_step)
+        elif action == "right":
+            self.pan(0, column_step)
+        elif action == "zoom_in":
+            self.zoom(1)
+        elif action == "zoom_out":
+            self.zoom(-1)
+        elif action == "fit":
+            self.fit()
+        return True
+
+    def draw(self):
+        start = time.perf_counter()
+        rows, columns = self.viewport()
+        level_rows, level_columns = self.pyramid.level_shape(self.level)
+        num_rows, num_columns = min(rows, level_rows - self.top), min(columns, level_columns - self.left)
+        char_indices, color_indices = self.pyramid.region(self.level, self.top, self.left, num_rows, num_columns)
+        frame = self.pyramid.ascii_handler.make_frame(char_indices, color_indices)
+        if frame.shape != self.last_shape:
+            # Clear what a larger previous frame left outside this one
+            self.renderer.write(CLEAR_SCREEN.encode())
+            self.renderer.reset()
+            self.last_shape = frame.shape
+        self.renderer.write_frame(frame.monochrome() if self.monochrome else frame)
+        elapsed = time.perf_counter() - start
+        self.stats.record(elapsed)
+        status = (f"level {self.level}/{self.pyramid.top_level}  row {self.top}/{level_rows}  "
+                  f"column {self.left}/{level_columns}  {elapsed * 1000:.1f} ms  "
+                  f"arrows/hjkl pan, +/- zoom, f fit, q quit")
+        self.renderer.write(f"\x1b[{rows + 1};1H\x1b[2K{status[:columns]}".encode())
+
+    def run(self):
+        import termios
+        import tty
+        fd = sys.stdin.fileno()
+        if not os.isatty(fd):
+            raise OSError("The viewer needs an interactive terminal")
+        saved = termios.tcgetattr(fd)
+        tty.setcbreak(fd)
+        self.renderer.write((CLEAR_SCREEN + HIDE_CURSOR).encode())
+        try:
+            self.fit()
+            self.draw()
+            while True:
+                data = os.read(fd, 64).decode(errors="ignore")
+                if not data or not all(self.handle_key(key) for key in parse_keys(data)):
+                    break
+                self.draw()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            termios.tcsetattr(fd, termios.TCSADRAIN, saved)
+            self.renderer.write((CLEAR_SCREEN + "\x1b[H" + SHOW_CURSOR).encode())
+            counters = self.pyramid.counters
+            print(f"{self.stats.summary()}\n{'chunks':>10}: {counters['chunks_built']} built, "
+                  f"{counters['chunk_hits']} reused, {counters['chunks_evicted']} evicted", file=sys.stderr)
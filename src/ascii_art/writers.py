@@ -0,0 +1,204 @@
+import gzip
+import html
+import numpy as np
+from PIL import GifImagePlugin, Image
+from ascii_art.ascii_frame import as_frame
+from ascii_art.color_manager import ColorManager, ColorPalettes
+from ascii_art.glyph_matcher import load_font, render_glyph_cells
+from ascii_art.terminal_renderer import color_runs
+
+GIF_FONT_SIZE = 12
+# Every palette starts with black, which is also the GIF background
+GIF_BACKGROUND_INDEX = 0
+MONOCHROME_GIF_PALETTE = np.array([(0, 0, 0), (192, 192, 192)], dtype=np.uint8)
+
+HTML_HEADER = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>ASCII art</title>
+<style>
+body {{ margin: 0; background: #000; display: flex; justify-content: center; }}
+pre {{ margin: 0; font-family: monospace; line-height: 1.2; font-size: calc(100vw / {columns} / 0.6); }}
+{color_classes}
+</style>
+</head>
+<body>
+<pre>"""
+HTML_FOOTER = """</pre>
+</body>
+</html>
+"""
+ANIMATED_HTML_HEADER = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>ASCII art</title>
+<style>
+body {{ margin: 0; background: #000; display: flex; justify-content: center; }}
+pre {{ margin: 0; font-family: monospace; line-height: 1.2; font-size: calc(100vw / {columns} / 0.6); }}
+pre.frame {{ display: none; }}
+pre.frame:first-of-type {{ display: block; }}
+</style>
+</head>
+<body>
+"""
+# Shows every frame for its data-duration in milliseconds, looping forever
+ANIMATED_HTML_FOOTER = """<script>
+const frames = document.getElementsByClassName("frame");
+let current = 0;
+function advance() {
+  frames[current].style.display = "none";
+  current = (current + 1) % frames.length;
+  frames[current].style.display = "block";
+  setTimeout(advance, frames[current].dataset.duration);
+}
+if (frames.length > 1) {
+  setTimeout(advance, frames[0].dataset.duration);
+}
+</script>
+</body>
+</html>
+"""
+
+
+def open_output(output_path, compress=False):
+    if compress or output_path.endswith(".gz"):
+        return gzip.open(output_path, "wt", encoding="utf-8", newline="")
+    return open(output_path, "w", encoding="utf-8", newline="")
+
+
+def monochrome_text_rows(ascii_map):
+    for row in as_frame(ascii_map).text_rows():
+        yield row + '\n'
+
+
+def write_monochrome_text(ascii_map, output_path, compress=False):
+    with open_output(output_path, compress) as f:
+        f.writelines(monochrome_text_rows(ascii_map))
+
+
+def color_class_name(color_manager, key):
+    if color_manager.palette_type == ColorPalettes.truecolor:
+        return f"c{key:06x}"
+    return f"c{key}"
+
+
+def color_class_rules(color_manager, keys):
+    colors = color_manager.palette_colors(keys)
+    return "\n".join(
+        f".{color_class_name(color_manager, key)} {{ color: #{r:02x}{g:02x}{b:02x}; }}"
+        for key, (r, g, b) in zip(keys.tolist(), colors.tolist()))
+
+
+def colored_html_rows(ascii_map, color_map, color_manager):
+    # One CSS class per color actually used in the image, and one <span> per
+    # run of same-colored cells. Yields the header, one chunk per row and the
+    # footer, so the document is never held in memory as a whole.
+    frame = as_frame(ascii_map, color_map, color_manager)
+    keys = frame.color_keys(color_manager)
+    color_classes = color_class_rules(color_manager, np.unique(keys))
+
+    yield HTML_HEADER.format(columns=keys.shape[1], color_classes=color_classes)
+    yield from colored_html_frame_rows(frame, keys, color_manager)
+    yield HTML_FOOTER
+
+
+def colored_html_frame_rows(frame, keys, color_manager):
+    for row, row_keys in zip(frame.text_rows(), keys):
+        changes, filled = color_runs(row, row_keys)
+        # Leading spaces before the first colored cell form a run of no color
+        starts = np.union1d([0], changes)
+        ends = np.append(starts[1:], len(row))
+        parts = []
+        for start, end in zip(starts, ends):
+            text = html.escape(row[start:end], quote=False)
+            if filled[start] < 0:
+                parts.append(text)
+            else:
+                parts.append(f'<span class="{color_class_name(color_manager, int(filled[start]))}">{text}</span>')
+        parts.append('\n')
+        yield ''.join(parts)
+
+
+def write_colored_html(ascii_map, color_map, color_manager, output_path, compress=False):
+    with open_output(output_path, compress) as f:
+        f.writelines(colored_html_rows(ascii_map, color_map, color_manager))
+
+
+def animated_html_chunks(frames, color_manager):
+    # Streams (frame, duration in ms) pairs into one document with a <pre>
+    # per frame. Color classes are defined the first time a frame uses them,
+    # so the document grows with the frames but memory does not.
+    defined_keys = set()
+    for index, (frame, duration) in enumerate(frames):
+        keys = frame.color_keys(color_manager)
+        if index == 0:
+            yield ANIMATED_HTML_HEADER.format(columns=keys.shape[1])
+        new_keys = [key for key in np.unique(keys).tolist() if key not in defined_keys]
+        if new_keys:
+            defined_keys.update(new_keys)
+            yield f"<style>\n{color_class_rules(color_manager, np.array(new_keys))}\n</style>\n"
+        yield f'<pre class="frame" data-duration="{int(duration)}">'
+        yield from colored_html_frame_rows(frame, keys, color_manager)
+        yield "</pre>\n"
+    yield ANIMATED_HTML_FOOTER
+
+
+def write_animated_html(frames, color_manager, output_path, compress=False):
+    with open_output(output_path, compress) as f:
+        f.writelines(animated_html_chunks(frames, color_manager))
+
+
+def write_animated_text(frames, output_path, compress=False):
+    # Frames separated by form feeds, the plain text page break
+    with open_output(output_path, compress) as f:
+        for index, (frame, _) in enumerate(frames):
+            if index:
+                f.write("\f\n")
+            f.write(frame.to_text())
+
+
+def glyph_masks(chars, font_path=None, font_size=GIF_FONT_SIZE):
+    font = load_font(font_path, font_size)
+    return np.stack([np.asarray(img) >= 128 for img in render_glyph_cells(chars, font)])
+
+
+def glyph_pixels(glyphs, keys, masks):
+    # Draws every cell's glyph mask in its palette index over the background,
+    # returning a (rows * cell height, columns * cell width) index image
+    rows, columns = glyphs.shape
+    cell_height, cell_width = masks.shape[1:]
+    pixels = np.where(masks[glyphs], keys[:, :, np.newaxis, np.newaxis], GIF_BACKGROUND_INDEX).astype(np.uint8)
+    return pixels.transpose(0, 2, 1, 3).reshape(rows * cell_height, columns * cell_width)
+
+
+def write_glyph_gif(frames, output_path, font_path=None, font_size=GIF_FONT_SIZE, loop=0):
+    # Draws (frame, duration in ms) pairs with a font's glyphs and streams
+    # them into an animated GIF one frame at a time. Glyphs are drawn without
+    # antialiasing, so every pixel is a palette index and all frames share
+    # one global color table; truecolor frames are reduced to xterm256.
+    masks = palette_manager = palette = None
+    with open(output_path, "wb") as f:
+        for index, (frame, duration) in enumerate(frames):
+            if index == 0:
+                masks = glyph_masks(frame.chars.tolist(), font_path, font_size)
+                if frame.colors is None:
+                    palette = MONOCHROME_GIF_PALETTE
+                else:
+                    palette_manager = frame.color_manager
+                    if palette_manager.palette_type == ColorPalettes.truecolor:
+                        palette_manager = ColorManager(ColorPalettes.xterm256)
+                    palette = palette_manager.palette_array
+            if palette_manager is not None:
+                keys = frame.color_keys(palette_manager)
+            else:
+                keys = np.ones(frame.shape, dtype=np.uint8)
+            pixels = glyph_pixels(frame.glyphs, keys, masks)
+            img = Image.frombytes("P", (pixels.shape[1], pixels.shape[0]), pixels.tobytes())
+            img.putpalette(palette.tobytes())
+            if index == 0:
+                header, _ = GifImagePlugin.getheader(img, info={"loop": loop})
+                f.writelines(header)
+            f.writelines(GifImagePlugin.getdata(img, duration=duration))
+        f.write(b";")
@@ -1,11 +1,13 @@
 import os
 import sys
 from colorama import init
-from ascii_art import get_cli_arguments, ImageHandler, AsciiHandler, ColorPalettes
+from ascii_art.cli import get_cli_arguments
+from ascii_art.options import ColorPalettes
+from ascii_art.profiler import profiler, PROFILE_ENV_VAR, PROFILE_OUTPUT_ENV_VAR
 import shutil
 
 def get_terminal_size():
-    columns, rows = os.get_terminal_size()
+    columns, rows = shutil.get_terminal_size()
     return rows, columns
 
 def generate_default_url(args):
@@ -18,23 +20,137 @@ def generate_default_url(args):
 
 def main():
     args = get_cli_arguments()
+    # Imported once the arguments are parsed, so that -h and argument errors
+    # do not wait for numpy, Pillow and OpenCV to load
+    from ascii_art import AsciiHandler, ImageHandler
     terminal_rows, terminal_columns = get_terminal_size()
     if args.width <= 0:
         args.width = terminal_columns
     init()
 
+    profile_format = args.profile or os.environ.get(PROFILE_ENV_VAR)
+    if args.profile:
+        profiler.enable()
+
+    ascii_handler = None
     try:
+        result_cache = None
+        if args.result_cache:
+            from ascii_art.result_cache import ResultCache
+            result_cache = ResultCache(disk=args.result_cache == "disk", disk_bytes=args.result_cache_bytes)
+
+        glyph_matcher = None
+        if args.glyph_mode == "shape":
+            from ascii_art.glyph_matcher import GlyphMatcher
+            glyph_matcher = GlyphMatcher(glyph_size=args.glyph_size, font_path=args.font)
+
+        if args.play:
+            from ascii_art.recording import Recording
+            recording = Recording(args.play)
+            try:
+                recording.play(monochrome=args.mono, loop=args.loop, start_ms=args.seek * 1000)
+            finally:
+                recording.close()
+            return
+
+        if args.video:
+            from ascii_art import VideoStream
+            ascii_handler = AsciiHandler(None, args.width, palette=ColorPalettes(
+                args.palette), density_map=args.density_map, glyph_matcher=glyph_matcher,
+                threads=args.threads, character_aspect_ratio=args.character_aspect_ratio)
+            video_stream = VideoStream(args.video, ascii_handler, fps=args.fps, adaptive_hist_eq=True,
+                                       invert=args.invert, monochrome=args.mono)
+            if args.record:
+                video_stream.record(args.record)
+            else:
+                video_stream.run()
+            return
+
+        if args.serve:
+            from ascii_art.server import ConversionService, ConversionServer, parse_address
+            service = ConversionService(args.width, ColorPalettes(args.palette), args.density_map,
+                                        invert=args.invert, adaptive_hist_eq=True, output_format=args.format,
+                                        glyph_matcher=glyph_matcher, result_cache=result_cache,
+                                        workers=args.server_workers,
+                                        queue_size=args.queue_size, max_request_bytes=args.max_request_bytes,
+                                        character_aspect_ratio=args.character_aspect_ratio)
+            ConversionServer(parse_address(args.serve), service).serve_forever()
+            return
+
+        if args.batch or args.url_list:
+            from ascii_art import BatchConverter
+            from ascii_art.url_loader import UrlLoader
+            paths = list(args.batch or [])
+            if args.url_list:
+                with open(args.url_list) as f:
+                    paths.extend(line.strip() for line in f if line.strip() and not line.startswith("#"))
+            url_loader = UrlLoader(target_width=args.width, connections=args.connections,
+                                   connections_per_host=args.connections_per_host, timeout=args.timeout,
+                                   max_bytes=args.max_download_bytes)
+            converter = BatchConverter(paths, args.output_dir, args.width, ColorPalettes(args.palette),
+                                       args.density_map, invert=args.invert, adaptive_hist_eq=True,
+                                       output_format=args.format, workers=args.workers, force=args.force,
+                                       compress=args.gzip, url_loader=url_loader,
+                                       result_cache=args.result_cache, result_cache_bytes=args.result_cache_bytes,
+                                       glyph_matcher=glyph_matcher, threads=args.threads,
+                                       character_aspect_ratio=args.character_aspect_ratio)
+            converter.run()
+            if converter.errors:
+                sys.exit(1)
+            return
+
+        strip_source = None
+        if args.file:
+            from ascii_art.strip_source import needs_strips, open_strip_source
+            if args.out_of_core or needs_strips(args.file, args.raw_size):
+                strip_source = open_strip_source(args.file, args.raw_size)
+
+        if args.view:
+            from ascii_art.strip_source import MemoryStrips
+            from ascii_art.viewer import PyramidViewer, TilePyramid
+            if not args.file:
+                raise ValueError("--view needs an image --file")
+            if strip_source is None:
+                strip_source = MemoryStrips(ImageHandler("file", args.file).load_image())
+            ascii_handler = AsciiHandler(None, args.width, palette=ColorPalettes(
+                args.palette), density_map=args.density_map,
+                character_aspect_ratio=args.character_aspect_ratio)
+            pyramid = TilePyramid(strip_source, ascii_handler, invert=args.invert,
+                                  memory_bytes=args.view_memory_bytes)
+            PyramidViewer(pyramid, monochrome=args.mono).run()
+            return
+
+        if args.file and strip_source is None:
+            from ascii_art.animation import Animation, is_animated
+            if args.gif or args.record or is_animated(args.file):
+                ascii_handler = AsciiHandler(None, args.width, palette=ColorPalettes(
+                    args.palette), density_map=args.density_map, glyph_matcher=glyph_matcher,
+                    result_cache=result_cache, threads=args.threads,
+                    character_aspect_ratio=args.character_aspect_ratio)
+                animation = Animation(args.file, ascii_handler, adaptive_hist_eq=True, invert=args.invert)
+                if args.gif:
+                    animation.save_gif(args.gif, monochrome=args.mono, font_path=args.font)
+                elif args.record:
+                    animation.save_recording(args.record, monochrome=args.mono)
+                elif args.output:
+                    animation.save_text(args.output, compress=args.gzip)
+                elif args.html:
+                    animation.save_html(args.html, compress=args.gzip)
+                else:
+                    animation.play(monochrome=args.mono, loop=args.loop)
+                return
+
         if args.url:
-            img_handler = ImageHandler("url", args.url)
+            img_handler = ImageHandler("url", args.url, target_width=args.width)
         elif args.file:
-            img_handler = ImageHandler("file", args.file)
+            img_handler = ImageHandler("file", args.file, target_width=args.width)
         elif args.webcam:
             img_handler = ImageHandler("webcam", None)
         elif args.clipboard:
             img_handler = ImageHandler("clipboard", None)
         else:
             img_url = generate_default_url(args)
-            img_handler = ImageHandler("url", img_url)
+            img_handler = ImageHandler("url", img_url, target_width=args.width)
 
         if args.width <= 0:
             term_width, term_height = get_terminal_size()
@@ -42,26 +158,38 @@ def main():
         else:
             width = args.width
 
-        img = img_handler.load_image()
-
-        ascii_handler = AsciiHandler(img, args.width, palette=ColorPalettes(
-            args.palette), density_map=args.density_map)
-        ascii_map, color_map = ascii_handler.image_to_ascii(
-            adaptive_hist_eq=True,
-            invert=args.invert
-        )
+        ascii_handler = AsciiHandler(None, args.width, palette=ColorPalettes(
+            args.palette), density_map=args.density_map, glyph_matcher=glyph_matcher,
+            result_cache=result_cache, threads=args.threads, character_aspect_ratio=args.character_aspect_ratio)
+        if strip_source is not None:
+            frame = ascii_handler.strips_to_frame(strip_source, adaptive_hist_eq=True, invert=args.invert)
+        else:
+            ascii_handler.img = img_handler.load_image()
+            frame = ascii_handler.image_to_frame(
+                adaptive_hist_eq=True,
+                invert=args.invert
+            )
 
         if args.output:
-            ascii_handler.save_monochrome_ascii(ascii_map, args.output)
+            ascii_handler.save_monochrome_ascii(frame, args.output, compress=args.gzip)
         elif args.html:
             ascii_handler.save_colored_ascii_html(
-                ascii_map, color_map, args.html)
+                frame, None, args.html, compress=args.gzip)
         else:
             ascii_handler.print_ascii(
-                ascii_map, color_map, monochrome=args.mono)
+                frame, monochrome=args.mono)
+            if args.report_bytes:
+                frame_bytes = ascii_handler.renderer.last_frame_bytes
+                legacy_bytes = ascii_handler.renderer.legacy_frame_bytes(frame, None)
+                print(f"Frame: {frame_bytes} bytes (per-character output: {legacy_bytes} bytes)", file=sys.stderr)
 
     except Exception as e:
         print(f"An error occurred: {e}", file=sys.stderr)
+    finally:
+        if ascii_handler is not None:
+            ascii_handler.close()
+        if profiler.enabled:
+            profiler.export(profile_format, args.profile_output or os.environ.get(PROFILE_OUTPUT_ENV_VAR))
 
 
 if __name__ == "__main__":
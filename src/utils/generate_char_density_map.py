@@ -1,12 +1,20 @@
+import os
 import sys
 import argparse
+import glob
+import json
+from concurrent.futures import ProcessPoolExecutor, as_completed
 import numpy as np
 from PIL import Image, ImageDraw, ImageFont
-from sklearn.cluster import KMeans
-import fontconfig
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from ascii_art.artifact_cache import artifact_cache, file_digest
+from ascii_art.options import RAMP_FILE_VERSION
 
 ASCII_CHARS = ' !"#$%&\'()*+,-./0123456789:;<=>?@ABCDEFGHIJKLMNOPQRSTUVWXYZ[\\]^_`abcdefghijklmnopqrstuvwxyz{|}~'
 FULL_BLOCK_CHAR = "█"
+FONT_EXTENSIONS = ('.ttf', '.otf', '.ttc')
 
 def get_full_block_char_dimensions(font_path, base_font_size=40):
     """
@@ -17,47 +25,74 @@ def get_full_block_char_dimensions(font_path, base_font_size=40):
     :return: tuple of width and height dimensions
     """
     font = ImageFont.truetype(font_path, base_font_size)
-    return font.getmask(FULL_BLOCK_CHAR).size
+    width, height = font.getmask(FULL_BLOCK_CHAR).size
+    if not width or not height:
+        # The font has no full block; use one advance width by the line height
+        ascent, descent = font.getmetrics()
+        width, height = round(font.getlength('M')), ascent + descent
+    return width, height
 
-def render_single_char_image(char, font_path, block_dimensions):
+def render_glyph_atlas(font_path, chars, block_dimensions):
     """
-    Render an image of a single character using the provided font.
+    Render every character into one atlas image with a single font object.
+
+    Each character gets a cell of the block dimensions with a gutter of one
+    cell on either side, so ink reaching outside its cell lands in a gutter
+    rather than in a neighbouring cell.
 
-    :param char: str, character to render
     :param font_path: str, path to the font file
+    :param chars: str, characters to render
     :param block_dimensions: tuple, dimensions of the character block
-    :return: PIL.Image.Image
+    :return: numpy.ndarray of shape (len(chars), height, width) and dtype uint8
     """
     w, h = block_dimensions
-    img = Image.new('L', (w, h), color=0)  # Black background
-    draw = ImageDraw.Draw(img)
     font = ImageFont.truetype(font_path, h)
-    draw.text((0, 0), char, font=font, fill=255)  # White text
-    return img
+    atlas = Image.new('L', (3 * w * len(chars), h), color=0)  # Black background
+    draw = ImageDraw.Draw(atlas)
+    for index, char in enumerate(chars):
+        draw.text((3 * w * index + w, 0), char, font=font, fill=255)  # White text
+    cells = np.asarray(atlas).reshape(h, len(chars), 3, w)[:, :, 1]
+    return cells.transpose(1, 0, 2)
 
-def calculate_pixel_density(img):
+def calculate_pixel_densities(cells):
     """
-    Calculate the average pixel density of an image.
+    Calculate the average pixel density of every cell of an atlas.
 
-    :param img: PIL.Image.Image, input image
-    :return: float, average pixel density
+    :param cells: numpy.ndarray of shape (num_chars, height, width)
+    :return: numpy.ndarray of float64 densities
     """
-    return np.mean(np.asarray(img))
+    return cells.mean(axis=(1, 2))
 
 def create_font_char_density_map(font_path, chars=ASCII_CHARS):
     """
     Create a character density map for the provided font and characters.
 
+    Densities and block dimensions are cached on disk, keyed by the font file's
+    content hash and the character set, so repeated runs skip the rendering.
+
     :param font_path: str, path to the font file
     :param chars: str, optional string of characters to include in the density map (default: ASCII_CHARS)
     :return: tuple of the density map (list of char-density tuples) and block dimensions (tuple)
     """
-    block_dimensions = get_full_block_char_dimensions(font_path)
-    densities = [(char, calculate_pixel_density(render_single_char_image(char, font_path, block_dimensions))) for char in chars]
-    densities.sort(key=lambda x: x[1])
-    return densities, block_dimensions
+    font_id = file_digest(font_path)
+    block_dimensions = tuple(int(size) for size in artifact_cache.get_or_create(
+        'block-dimensions', (font_id,), lambda: np.array(get_full_block_char_dimensions(font_path))))
+    densities = artifact_cache.get_or_create('char-densities', (font_id, chars, block_dimensions), lambda:
+        calculate_pixel_densities(render_glyph_atlas(font_path, chars, block_dimensions)))
+    density_map = sorted(zip(chars, densities.tolist()), key=lambda x: x[1])
+    return density_map, block_dimensions
 
 def select_gradient_chars_kmeans(density_map, num_chars=16):
+    """
+    Pick gradient characters by clustering the densities between the darkest
+    and the lightest character.
+
+    :param density_map: list of char-density tuples sorted by density
+    :param num_chars: int, optional number of gradient characters (default: 16)
+    :return: tuple of the gradient characters (list) and the cluster label of
+             every character between the darkest and the lightest (numpy.ndarray)
+    """
+    from sklearn.cluster import KMeans
     min_density_char, max_density_char = density_map[0], density_map[-1]
     remaining_densities = density_map[1:-1]
     densities = np.array([density for _, density in remaining_densities]).reshape(-1, 1)
@@ -76,7 +111,154 @@ def select_gradient_chars_kmeans(density_map, num_chars=16):
         )[1][0]
         ideal_chars.append(ideal_char)
     ideal_chars.append(max_density_char[0])  # Add the lightest character
-    return ideal_chars
+    return ideal_chars, kmeans.labels_
+
+def select_gradient_chars_dp(density_map, num_chars=16):
+    """
+    Pick gradient characters by splitting the densities between the darkest
+    and the lightest character into the contiguous groups with the least
+    squared deviation from their means. In one dimension the optimal
+    clustering consists of contiguous runs of the sorted values, so dynamic
+    programming over split points finds it exactly, where KMeans may settle
+    in a local optimum.
+
+    :param density_map: list of char-density tuples sorted by density
+    :param num_chars: int, optional number of gradient characters (default: 16)
+    :return: tuple of the gradient characters (list) and the cluster label of
+             every character between the darkest and the lightest (numpy.ndarray)
+    """
+    remaining_densities = density_map[1:-1]
+    densities = np.array([density for _, density in remaining_densities], dtype=np.float64)
+    num_clusters = num_chars - 2
+    size = len(densities)
+    if not 1 <= num_clusters <= size:
+        raise ValueError(f'Cannot pick {num_chars} gradient characters from {len(density_map)} characters')
+
+    # cost[i, j]: squared deviation of densities[i:j] from their mean
+    sums = np.concatenate([[0], np.cumsum(densities)])
+    squares = np.concatenate([[0], np.cumsum(densities ** 2)])
+    starts, stops = np.arange(size + 1)[:, None], np.arange(size + 1)[None, :]
+    counts = stops - starts
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cost = squares[stops] - squares[starts] - (sums[stops] - sums[starts]) ** 2 / counts
+    cost = np.where(counts > 0, np.maximum(cost, 0), np.inf)
+
+    # best[c, j]: least cost of splitting densities[:j] into c + 1 groups,
+    # with the start of the last group in split[c, j]
+    best = np.empty((num_clusters, size + 1))
+    split = np.zeros((num_clusters, size + 1), dtype=np.intp)
+    best[0] = cost[0]
+    for cluster in range(1, num_clusters):
+        totals = best[cluster - 1][:, None] + cost
+        split[cluster] = np.argmin(totals, axis=0)
+        best[cluster] = totals[split[cluster], np.arange(size + 1)]
+
+    bounds = [size]
+    for cluster in range(num_clusters - 1, 0, -1):
+        bounds.append(split[cluster, bounds[-1]])
+    bounds = [0] + bounds[::-1]
+
+    ideal_chars = [density_map[0][0]]  # Add the darkest character
+    for start, stop in zip(bounds[:-1], bounds[1:]):
+        # Find the closest character in density to the group's mean
+        closest = start + np.argmin(np.abs(densities[start:stop] - densities[start:stop].mean()))
+        ideal_chars.append(remaining_densities[closest][0])
+    ideal_chars.append(density_map[-1][0])  # Add the lightest character
+    labels = np.repeat(np.arange(num_clusters), np.diff(bounds))
+    return ideal_chars, labels
+
+GRADIENT_METHODS = {'dp': select_gradient_chars_dp, 'kmeans': select_gradient_chars_kmeans}
+
+def load_gradient_chars(density_map, num_chars=16, method='dp'):
+    """
+    Select gradient characters, reusing a cached selection for the same density map.
+
+    :param density_map: list of char-density tuples sorted by density
+    :param num_chars: int, optional number of gradient characters (default: 16)
+    :param method: str, optional 'dp' for the exact selection or 'kmeans' (default: 'dp')
+    :return: tuple of the gradient characters (list) and the cluster labels (numpy.ndarray)
+    """
+    def build():
+        ideal_chars, labels = GRADIENT_METHODS[method](density_map, num_chars)
+        # Stored as one array: the codepoints of the gradient followed by the labels
+        return np.concatenate([[ord(char) for char in ideal_chars], labels]).astype(np.int64)
+
+    selection = artifact_cache.get_or_create('gradient', (tuple(density_map), num_chars, method), build)
+    return [chr(code) for code in selection[:num_chars]], np.asarray(selection[num_chars:])
+
+def write_ramp_file(path, font_path, density_map, gradient_chars, block_dimensions):
+    """
+    Write a ramp file, which AsciiHandler loads through load_ramp and the CLI through --ramp.
+
+    :param path: str, output path
+    :param font_path: str, path to the font the ramp was measured on
+    :param density_map: list of char-density tuples sorted by density
+    :param gradient_chars: list of the selected gradient characters
+    :param block_dimensions: tuple, dimensions of the character block
+    """
+    ramp = {
+        'version': RAMP_FILE_VERSION,
+        'font': os.path.basename(font_path),
+        'ramp': ''.join(gradient_chars),
+        'full_ramp': ''.join(char for char, _ in density_map),
+        'densities': [density for _, density in density_map],
+        'aspect_ratio': block_dimensions[0] / block_dimensions[1],
+    }
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(ramp, f, ensure_ascii=False, indent=2)
+
+def generate_ramp_file(font_path, output_dir, num_chars=16, method='dp', chars=ASCII_CHARS):
+    """
+    Measure one font and write its ramp file to output_dir.
+
+    :param font_path: str, path to the font file
+    :param output_dir: str, directory for the ramp file
+    :return: str, path of the ramp file
+    """
+    density_map, block_dimensions = create_font_char_density_map(font_path, chars)
+    gradient_chars, _ = load_gradient_chars(density_map, num_chars, method)
+    output_path = os.path.join(output_dir, os.path.splitext(os.path.basename(font_path))[0] + '.ramp')
+    write_ramp_file(output_path, font_path, density_map, gradient_chars, block_dimensions)
+    return output_path
+
+def collect_font_paths(paths):
+    """
+    Expand font files, directories (searched recursively) and glob patterns.
+
+    :param paths: list of str
+    :return: sorted list of font file paths
+    """
+    fonts = set()
+    for path in paths:
+        if os.path.isdir(path):
+            matches = glob.glob(os.path.join(path, '**', '*'), recursive=True)
+        else:
+            matches = glob.glob(path) or [path]
+        fonts.update(match for match in matches
+                     if os.path.isfile(match) and match.lower().endswith(FONT_EXTENSIONS))
+    return sorted(fonts)
+
+def generate_ramp_files(font_paths, output_dir, num_chars=16, method='dp', workers=None):
+    """
+    Write a ramp file for every font, measuring the fonts in parallel worker processes.
+
+    :param font_paths: list of str, font files
+    :param output_dir: str, directory for the ramp files
+    :param workers: int, optional number of processes (default: number of CPUs)
+    :return: int, number of fonts that failed
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    errors = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(generate_ramp_file, font_path, output_dir, num_chars, method): font_path
+                   for font_path in font_paths}
+        for future in as_completed(futures):
+            try:
+                print(f'{futures[future]} -> {future.result()}')
+            except Exception as e:
+                errors += 1
+                print(f'{futures[future]}: {e}', file=sys.stderr)
+    return errors
 
 def find_font_by_name(name_pattern):
     """
@@ -84,6 +266,7 @@ def find_font_by_name(name_pattern):
     :param name_pattern: str, pattern to match the desired font
     :return: str, path to the font file or None if not found
     """
+    import fontconfig
     fonts = fontconfig.query(family=name_pattern, lang='en')
     if fonts:
         return fonts[0].file
@@ -91,11 +274,27 @@ def find_font_by_name(name_pattern):
         return None
 
 def main():
-    parser = argparse.ArgumentParser(description='Generate a character density map using K-Means clustering.')
+    parser = argparse.ArgumentParser(description='Generate a character density map for a font.')
     parser.add_argument('--font', type=str, default='NotoSansMono', help='Font name (default: NotoSansMono)')
     parser.add_argument('--num_chars', type=int, default=16, help='Number of gradient characters (default: 16)')
+    parser.add_argument('--method', choices=list(GRADIENT_METHODS), default='dp',
+                        help='Exact selection (dp) or K-Means clustering (kmeans) of the gradient (default: dp)')
+    parser.add_argument('--fonts', nargs='+', metavar='PATH',
+                        help='Write a ramp file for every font file in these files, directories or globs')
+    parser.add_argument('--output_dir', type=str, default='ramps', help='Directory for ramp files (default: ramps)')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Processes measuring fonts with --fonts (default: number of CPUs)')
     args = parser.parse_args()
 
+    if args.fonts:
+        font_paths = collect_font_paths(args.fonts)
+        if not font_paths:
+            print(f"No fonts found in {' '.join(args.fonts)}")
+            sys.exit(1)
+        if generate_ramp_files(font_paths, args.output_dir, args.num_chars, args.method, args.workers):
+            sys.exit(1)
+        return
+
     noto_sans_mono_font_path = find_font_by_name(args.font)
 
     if not(notfound:= noto_sans_mono_font_path is None):
@@ -105,22 +304,16 @@ def main():
         sys.exit(1)
 
     full_density_chars = ''.join([char for char, _ in density_map])
-    gradient_chars = select_gradient_chars_kmeans(density_map, args.num_chars)
+    gradient_chars, cluster_labels = load_gradient_chars(density_map, args.num_chars, args.method)
     aspect_ratio = block_dimensions[0] / block_dimensions[1]
     print(f"DENSITY_MAP_256 = '{full_density_chars}'")
     print(f"DENSITY_MAP_{args.num_chars} = '{''.join(gradient_chars)}'")
     print(f"CHARACTER_ASPECT_RATIO = '{aspect_ratio}'")
 
-    # Print the K clusters
-    num_chars = args.num_chars
-    min_density_char, max_density_char = density_map[0], density_map[-1]
+    # Print the clusters found while selecting the gradient characters
     remaining_densities = density_map[1:-1]
-    densities = np.array([density for _, density in remaining_densities]).reshape(-1, 1)
-    kmeans = KMeans(n_clusters=num_chars - 2, random_state=0)
-    kmeans.fit(densities)
-    cluster_labels = kmeans.labels_
-    print("\nK clusters:")
-    for i in range(num_chars - 2):
+    print("\nClusters:")
+    for i in range(args.num_chars - 2):
         cluster_chars = [char for (char, _), label in zip(remaining_densities, cluster_labels) if label == i]
         print(f"Cluster {i + 1}: {', '.join(cluster_chars)}")
 
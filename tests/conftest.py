@@ -0,0 +1,16 @@
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+
+@pytest.fixture(scope='session', autouse=True)
+def isolated_artifact_cache(tmp_path_factory):
+    # Keep lookup tables and glyph bitmaps built by the tests out of the
+    # user's cache directory; session scoped so that it also covers module
+    # and session fixtures
+    from ascii_art.artifact_cache import artifact_cache
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setattr(artifact_cache, 'directory', str(tmp_path_factory.mktemp('artifacts')))
+        yield
@@ -0,0 +1,79 @@
+import io
+import re
+import time
+import numpy as np
+import pytest
+from PIL import Image
+from ascii_art.animation import Animation, is_animated, iter_frames
+from ascii_art.ascii_handler import AsciiHandler
+
+DURATIONS = [50, 120, 80]
+
+
+@pytest.fixture
+def gif_path(tmp_path):
+    # Three frames, each a bright square in a different place
+    frames = []
+    for index in range(3):
+        pixels = np.zeros((40, 60, 3), dtype=np.uint8)
+        pixels[10:30, index * 20:index * 20 + 20] = (255, 200, 50)
+        frames.append(Image.fromarray(pixels))
+    path = str(tmp_path / 'anim.gif')
+    frames[0].save(path, save_all=True, append_images=frames[1:], duration=DURATIONS, loop=0)
+    return path
+
+
+def animation(path):
+    return Animation(path, AsciiHandler(None, 12))
+
+
+def test_frames_and_durations(gif_path, tmp_path):
+    assert is_animated(gif_path)
+    still = str(tmp_path / 'still.png')
+    Image.new('RGB', (10, 10)).save(still)
+    assert not is_animated(still)
+
+    frames = list(iter_frames(gif_path))
+    assert [duration for _, duration in frames] == DURATIONS
+    assert [frame.shape for frame, _ in frames] == [(40, 60, 3)] * 3
+
+    converted = list(animation(gif_path).frames())
+    assert [duration for _, duration in converted] == DURATIONS
+    for (img, _), (frame, _) in zip(frames, converted):
+        handler = AsciiHandler(img, 12)
+        assert frame.to_bytes() == handler.image_to_frame().to_bytes()
+    assert len({frame.to_text() for frame, _ in converted}) == 3
+
+
+def test_text_and_html_hold_every_frame(gif_path, tmp_path):
+    text_path, html_path = str(tmp_path / 'anim.txt'), str(tmp_path / 'anim.html')
+    animation(gif_path).save_text(text_path)
+    animation(gif_path).save_html(html_path)
+    frames = [frame for frame, _ in animation(gif_path).frames()]
+    with open(text_path) as f:
+        assert f.read() == '\f\n'.join(frame.to_text() for frame in frames)
+    with open(html_path) as f:
+        html = f.read()
+    assert [int(duration) for duration in re.findall(r'data-duration="(\d+)"', html)] == DURATIONS
+
+
+@pytest.mark.parametrize('monochrome', [False, True])
+def test_gif_output_keeps_frames_and_durations(gif_path, tmp_path, monochrome):
+    output = str(tmp_path / 'out.gif')
+    animation(gif_path).save_gif(output, monochrome=monochrome)
+    with Image.open(output) as img:
+        assert img.n_frames == 3
+        durations = []
+        for index in range(3):
+            img.seek(index)
+            durations.append(img.info['duration'])
+        assert durations == DURATIONS
+
+
+def test_play_shows_every_frame_for_its_duration(gif_path, capsys):
+    stream = io.StringIO()
+    start = time.perf_counter()
+    animation(gif_path).play(stream=stream)
+    assert time.perf_counter() - start >= sum(DURATIONS) / 1000 - 0.01
+    assert capsys.readouterr().err.startswith('3 frames,')
+    assert stream.getvalue().endswith('\x1b[?25h')
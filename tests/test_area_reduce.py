@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+from ascii_art import ascii_handler
+from ascii_art.ascii_handler import area_reduce, reduce_strips
+from ascii_art.strip_source import MemoryStrips
+
+
+def brute_force(values, num_bins, axis):
+    # Mean of every bin as the integral of the pixels over its extent
+    size = values.shape[axis]
+    weights = np.zeros((num_bins, size))
+    for index in range(num_bins):
+        low, high = index * size / num_bins, (index + 1) * size / num_bins
+        for pixel in range(int(low), min(size, int(np.ceil(high)))):
+            weights[index, pixel] = min(high, pixel + 1) - max(low, pixel)
+    weights /= size / num_bins
+    return np.moveaxis(np.tensordot(weights, np.moveaxis(values.astype(np.float64), axis, 0), axes=1), 0, axis)
+
+
+@pytest.fixture
+def values():
+    rng = np.random.default_rng(7)
+    return rng.integers(0, 256, size=(97, 61, 3), dtype=np.uint8)
+
+
+@pytest.mark.parametrize("axis", [0, 1])
+@pytest.mark.parametrize("num_bins", [1, 7, 13, 30, 61])
+def test_area_reduce_matches_brute_force(values, axis, num_bins):
+    np.testing.assert_allclose(area_reduce(values, num_bins, axis), brute_force(values, num_bins, axis),
+                               rtol=1e-5, atol=1e-3)
+
+
+def test_chunks_and_bin_ranges_do_not_change_the_result(values, monkeypatch):
+    expected = area_reduce(values, 23, 0)
+    monkeypatch.setattr(ascii_handler, "AREA_REDUCE_CHUNK_ELEMENTS", 100)
+    np.testing.assert_array_equal(area_reduce(values, 23, 0), expected)
+    np.testing.assert_array_equal(area_reduce(values, 23, 0, 5, 17), expected[5:17])
+
+
+def test_more_bins_than_pixels_sample_the_pixel_under_each_bin(values):
+    reduced = area_reduce(values[:5], 12, 0)
+    np.testing.assert_array_equal(reduced, values[((np.arange(12) + 0.5) * 5 / 12).astype(int)])
+
+
+@pytest.mark.parametrize("strip_bytes", [1, 500, 1 << 20])
+def test_strips_reduce_like_the_whole_image(values, strip_bytes):
+    expected = area_reduce(area_reduce(values, 20, 0), 15, 1)
+    source = MemoryStrips(values)
+    np.testing.assert_allclose(reduce_strips(source, 20, 15, strip_bytes=strip_bytes), expected, rtol=1e-5)
+    np.testing.assert_allclose(reduce_strips(source, 20, 15, strip_bytes=strip_bytes, row_bins=(3, 11),
+                                             column_bins=(4, 9)), expected[3:11, 4:9], rtol=1e-5)
@@ -0,0 +1,65 @@
+import os
+import numpy as np
+from ascii_art import artifact_cache as artifact_cache_module
+from ascii_art.artifact_cache import ArtifactCache
+
+
+def array(value, size=1000):
+    return np.full(size, value, dtype=np.uint8)
+
+
+def test_get_or_create_builds_once(tmp_path):
+    cache = ArtifactCache(str(tmp_path))
+    builds = []
+
+    def build():
+        builds.append(1)
+        return array(7)
+
+    first = cache.get_or_create('lut', ('palette', 6), build)
+    second = ArtifactCache(str(tmp_path)).get_or_create('lut', ('palette', 6), build)
+    np.testing.assert_array_equal(second, first)
+    assert len(builds) == 1 and cache.misses == 1
+    cache.get_or_create('lut', ('palette', 5), build)
+    assert len(builds) == 2
+
+
+def test_least_recently_used_artifacts_are_evicted(tmp_path):
+    probe = ArtifactCache(str(tmp_path / 'probe'))
+    probe.store('lut', 0, array(0))
+    entry_bytes = os.path.getsize(probe.path_for('lut', 0))
+    cache = ArtifactCache(str(tmp_path / 'cache'), max_bytes=3 * entry_bytes)
+    for key in range(3):
+        cache.store('lut', key, array(key))
+        os.utime(cache.path_for('lut', key), (key, key))
+    # Reading key 0 makes it the most recently used
+    assert cache.load('lut', 0) is not None
+    cache.store('lut', 3, array(3))
+    assert cache.load('lut', 1) is None
+    for key in (0, 2, 3):
+        np.testing.assert_array_equal(cache.load('lut', key), array(key))
+    assert sum(size for _, size, _ in cache.entries()) <= cache.max_bytes
+
+
+def test_versions_live_apart(tmp_path, monkeypatch):
+    cache = ArtifactCache(str(tmp_path))
+    cache.store('lut', 'key', array(1))
+    monkeypatch.setattr(artifact_cache_module, 'CACHE_VERSION', artifact_cache_module.CACHE_VERSION + 1)
+    newer = ArtifactCache(str(tmp_path))
+    assert newer.directory != cache.directory
+    assert newer.load('lut', 'key') is None
+
+
+def test_damaged_and_unwritable_caches_are_ignored(tmp_path):
+    cache = ArtifactCache(str(tmp_path))
+    cache.store('lut', 'key', array(1))
+    with open(cache.path_for('lut', 'key'), 'wb') as f:
+        f.write(b'not an array')
+    assert cache.load('lut', 'key') is None
+    np.testing.assert_array_equal(cache.get_or_create('lut', 'key', lambda: array(2)), array(2))
+
+    blocked = tmp_path / 'file'
+    blocked.write_bytes(b'')
+    unwritable = ArtifactCache(str(blocked))
+    np.testing.assert_array_equal(unwritable.get_or_create('lut', 'key', lambda: array(3)), array(3))
+    assert not [name for name in os.listdir(tmp_path) if name.endswith('.tmp')]
@@ -0,0 +1,71 @@
+import mmap
+import numpy as np
+import pytest
+from ascii_art.ascii_frame import AsciiFrame
+from ascii_art.color_manager import ColorManager
+from ascii_art.options import ColorPalettes
+
+
+def make_frame(palette=ColorPalettes.xterm256, chars=" .:-=+*#%@", shape=(9, 13), seed=11):
+    rng = np.random.default_rng(seed)
+    color_manager = ColorManager(palette)
+    glyphs = rng.integers(0, len(chars), size=shape).astype(np.uint8 if len(chars) <= 256 else np.uint16)
+    colors, _ = color_manager.quantize(rng.integers(0, 256, size=shape + (3,)))
+    return AsciiFrame(glyphs, colors, list(chars), color_manager)
+
+
+def assert_same_frame(actual, expected):
+    assert actual.shape == expected.shape
+    assert actual.to_text() == expected.to_text()
+    if expected.colors is None:
+        assert actual.colors is None
+    else:
+        assert actual.color_manager.palette_type == expected.color_manager.palette_type
+        np.testing.assert_array_equal(actual.colors, expected.colors)
+        np.testing.assert_array_equal(actual.color_map, expected.color_map)
+
+
+@pytest.mark.parametrize('palette', list(ColorPalettes))
+def test_bytes_round_trip(palette):
+    frame = make_frame(palette)
+    assert_same_frame(AsciiFrame.from_buffer(frame.to_bytes()), frame)
+    assert_same_frame(AsciiFrame.from_buffer(frame.monochrome().to_bytes()), frame.monochrome())
+
+
+def test_round_trip_of_slices_and_wide_ramps():
+    frame = make_frame()[2:7, ::3]
+    assert_same_frame(AsciiFrame.from_buffer(frame.to_bytes()), frame)
+    # More than 256 characters, several of them outside ASCII and the BMP
+    chars = [chr(code) for code in range(0x2500, 0x2600)] + ['é', '😀', ' ']
+    wide = make_frame(chars=chars)
+    assert wide.glyphs.dtype == np.uint16
+    assert_same_frame(AsciiFrame.from_buffer(wide.to_bytes()), wide)
+
+
+def test_frames_view_mapped_buffers(tmp_path):
+    frame = make_frame(ColorPalettes.truecolor)
+    path = tmp_path / 'frame.bin'
+    path.write_bytes(b'header' + frame.to_bytes())
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        loaded = AsciiFrame.from_buffer(memoryview(mapped)[6:])
+        assert not loaded.glyphs.flags.writeable
+        assert_same_frame(loaded, frame)
+        del loaded
+
+
+def test_other_buffers_are_rejected():
+    with pytest.raises(ValueError):
+        AsciiFrame.from_buffer(b'GIF89a' + bytes(32))
+
+
+def test_text_and_maps_agree():
+    frame = make_frame()
+    text = frame.to_text()
+    assert text.splitlines() == list(frame.text_rows()) == [frame.row_text(row) for row in range(len(frame))]
+    assert [''.join(row) for row in frame.ascii_map] == text.splitlines()
+    rebuilt = AsciiFrame.from_maps(frame.ascii_map, frame.color_map, frame.color_manager)
+    assert rebuilt.to_text() == text
+    np.testing.assert_array_equal(rebuilt.colors, frame.colors)
+    # Integer indices keep the grid two-dimensional
+    assert frame[3].shape == (1, 13) and frame[:, 4].shape == (9, 1)
+    assert frame[3].to_text() == text.splitlines()[3] + '\n'
@@ -0,0 +1,37 @@
+import threading
+import numpy as np
+import pytest
+from ascii_art.ascii_handler import AsciiHandler
+from ascii_art.options import DENSITY_MAP_256, ColorPalettes
+
+
+@pytest.fixture
+def pixels():
+    rng = np.random.default_rng(2)
+    return rng.integers(0, 256, size=(97, 131, 3), dtype=np.uint8)
+
+
+def band_threads():
+    return [thread for thread in threading.enumerate() if thread.name.startswith("ascii-band")]
+
+
+@pytest.mark.parametrize('palette', [ColorPalettes.truecolor, ColorPalettes.xterm256, ColorPalettes.ansi])
+@pytest.mark.parametrize('width', [7, 60])
+def test_threads_do_not_change_the_output(pixels, palette, width):
+    frames = []
+    for threads in (1, 4):
+        with AsciiHandler(pixels, width, palette=palette, density_map=DENSITY_MAP_256, threads=threads) as handler:
+            frame = handler.image_to_frame(adaptive_hist_eq=True, invert=True)
+            frames.append((frame.to_bytes(), handler.renderer.render(frame)))
+    assert frames[0] == frames[1]
+
+
+def test_close_stops_the_band_threads(pixels):
+    handler = AsciiHandler(pixels, 40, threads=3)
+    first = handler.image_to_frame()
+    assert band_threads()
+    handler.close()
+    assert handler.thread_pool is None and not band_threads()
+    # A closed handler starts a new pool when it is used again
+    assert handler.image_to_frame().to_bytes() == first.to_bytes()
+    handler.close()
@@ -0,0 +1,126 @@
+import json
+import os
+import signal
+import threading
+import time
+import numpy as np
+import pytest
+from PIL import Image
+from ascii_art import batch
+from ascii_art.batch import STAMPS_FILE, BatchConverter
+from ascii_art.options import DENSITY_MAP_256
+
+
+def save_image(path, seed=0):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    rng = np.random.default_rng(seed)
+    Image.fromarray(rng.integers(0, 256, size=(40, 60, 3), dtype=np.uint8)).save(path)
+    return path
+
+
+def converter(paths, output_dir, **options):
+    return BatchConverter(paths, str(output_dir), 20, "truecolor", DENSITY_MAP_256, workers=1, **options)
+
+
+def test_failed_writes_leave_no_temporary_file(tmp_path, monkeypatch):
+    batch.init_worker(20, "truecolor", DENSITY_MAP_256, False, False, "text", False)
+
+    def fail(frame, path, compress):
+        with open(path, "w") as f:
+            f.write("partial")
+        raise OSError("disk full")
+
+    monkeypatch.setattr(batch._worker["handler"], "save_monochrome_ascii", fail)
+    with pytest.raises(OSError):
+        batch.convert_image(np.zeros((20, 30, 3), dtype=np.uint8), str(tmp_path / "out.txt"))
+    assert os.listdir(tmp_path) == []
+
+
+class InterruptedLoader:
+    # Waits for the file jobs to be recorded, then stands in for a Ctrl-C
+    # while the downloads are still running
+    def __init__(self, converter):
+        self.converter = converter
+
+    def load_all(self, urls, callback):
+        deadline = time.monotonic() + 30
+        while not self.converter.stamps and time.monotonic() < deadline:
+            time.sleep(0.01)
+        signal.pthread_kill(threading.main_thread().ident, signal.SIGINT)
+        time.sleep(30)
+
+
+def test_interrupted_downloads_keep_finished_stamps(tmp_path):
+    image_path = save_image(str(tmp_path / "in" / "a.png"))
+    output_dir = tmp_path / "out"
+    run = converter([image_path, "http://localhost/b.png"], output_dir)
+    run.url_loader = InterruptedLoader(run)
+    with pytest.raises(KeyboardInterrupt):
+        run.run()
+    with open(output_dir / STAMPS_FILE) as f:
+        assert list(json.load(f)) == ["a.txt"]
+
+
+def test_collect_inputs_mirrors_directories_and_globs(tmp_path):
+    for name in ("a.png", "sub/b.jpg", "sub/deeper/c.png", "sub/notes.txt"):
+        path = tmp_path / "in" / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b"")
+    root = str(tmp_path / "in")
+
+    assert batch.collect_inputs([root]) == [
+        (os.path.join(root, "a.png"), "a.png"),
+        (os.path.join(root, "sub", "b.jpg"), os.path.join("sub", "b.jpg")),
+        (os.path.join(root, "sub", "deeper", "c.png"), os.path.join("sub", "deeper", "c.png")),
+    ]
+    assert batch.collect_inputs([os.path.join(root, "sub", "**", "*.png")]) == [
+        (os.path.join(root, "sub", "deeper", "c.png"), os.path.join("deeper", "c.png")),
+    ]
+    assert batch.collect_inputs([os.path.join(root, "a.png")]) == [(os.path.join(root, "a.png"), "a.png")]
+
+
+def test_url_relative_paths_do_not_collide():
+    paths = {batch.url_relative_path(url) for url in (
+        "http://example.com/a/b.png", "http://example.com/a/b.png?size=1", "http://example.com/a/b.png?size=2",
+        "http://example.com:8080/a/b.png", "http://example.org/a/b.png", "http://example.com/")}
+    assert len(paths) == 6
+    assert batch.url_relative_path("http://example.com:8080/a/b.png") == os.path.join("example.com_8080", "a", "b.png")
+    assert batch.url_relative_path("http://example.com/") == os.path.join("example.com", "index")
+
+
+def test_up_to_date_outputs_are_skipped(tmp_path, capsys):
+    image_path = save_image(str(tmp_path / "in" / "a.png"))
+    output_path = tmp_path / "out" / "a.txt"
+    assert converter([image_path], tmp_path / "out").run() == 1
+    converted_at = output_path.stat().st_mtime_ns
+
+    assert converter([image_path], tmp_path / "out").run() == 0
+    assert "Skipping 1 up-to-date outputs" in capsys.readouterr().err
+    assert output_path.stat().st_mtime_ns == converted_at
+
+    assert converter([image_path], tmp_path / "out", force=True).run() == 1
+
+
+def test_changed_settings_invalidate_outputs(tmp_path):
+    image_path = save_image(str(tmp_path / "in" / "a.png"))
+    output_path = tmp_path / "out" / "a.txt"
+    assert converter([image_path], tmp_path / "out").run() == 1
+    inverted = converter([image_path], tmp_path / "out", invert=True)
+    assert inverted.pending_jobs() == ([(image_path, str(output_path))], [], 0)
+    assert inverted.run() == 1
+    with open(tmp_path / "out" / STAMPS_FILE) as f:
+        assert json.load(f) == {"a.txt": inverted.stamp}
+
+
+def test_failures_are_reported_and_not_stamped(tmp_path, capsys):
+    good = save_image(str(tmp_path / "in" / "good.png"))
+    bad = tmp_path / "in" / "bad.png"
+    bad.write_bytes(b"not an image")
+    assert converter([str(tmp_path / "in")], tmp_path / "out").run() == 1
+
+    assert f"Failed to convert {bad}" in capsys.readouterr().err
+    with open(tmp_path / "out" / STAMPS_FILE) as f:
+        assert list(json.load(f)) == ["good.txt"]
+    assert sorted(os.listdir(tmp_path / "out")) == [STAMPS_FILE, "good.txt"]
+    retry, _, skipped = converter([good, str(bad)], tmp_path / "out").pending_jobs()
+    assert retry == [(str(bad), str(tmp_path / "out" / "bad.txt"))] and skipped == 1
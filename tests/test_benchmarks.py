@@ -0,0 +1,57 @@
+import importlib.util
+import json
+import os
+import subprocess
+import sys
+import pytest
+
+BENCHMARKS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'benchmarks')
+
+
+@pytest.fixture(scope='module')
+def run_benchmarks():
+    spec = importlib.util.spec_from_file_location('run_benchmarks', os.path.join(BENCHMARKS_DIR, 'run_benchmarks.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def result(stage, seconds, peak_bytes=1000, output_bytes=None):
+    return {'image': 'thumbnail', 'width': 40, 'palette': 'ansi', 'stage': stage, 'seconds': seconds,
+            'peak_bytes': peak_bytes, 'output_bytes': output_bytes}
+
+
+def test_compare_reports_regressions_beyond_the_threshold(run_benchmarks):
+    baseline = [result('convert', 0.010), result('render', 0.010, output_bytes=100), result('clahe', 0.0001)]
+    results = [result('convert', 0.014), result('render', 0.011, peak_bytes=2000, output_bytes=100),
+               result('clahe', 0.0009), result('new_stage', 1.0)]
+    regressions = run_benchmarks.compare(results, baseline, 0.25)
+    # convert is 40% slower and render uses twice the memory; clahe's change
+    # is within timer noise and new_stage has no baseline
+    assert len(regressions) == 2
+    assert regressions[0].startswith('thumbnail/40/ansi/convert seconds')
+    assert regressions[1].startswith('thumbnail/40/ansi/render peak_bytes')
+
+
+def test_measure_times_untraced_runs_and_traces_one_more(run_benchmarks):
+    calls = []
+
+    def allocate():
+        calls.append(run_benchmarks.tracemalloc.is_tracing())
+        return bytearray(1 << 20)
+
+    data, seconds, peak = run_benchmarks.measure(allocate, 3)
+    assert calls == [False, False, False, True]
+    assert len(data) == 1 << 20 and seconds > 0 and peak >= 1 << 20
+
+
+def test_a_run_against_its_own_output_has_no_regressions(tmp_path):
+    output = str(tmp_path / 'results.json')
+    command = [sys.executable, os.path.join(BENCHMARKS_DIR, 'run_benchmarks.py'), '--sizes', 'thumbnail',
+               '--widths', '40', '--palettes', 'ansi', '--threads', '1', '2', '--repeat', '1']
+    subprocess.run(command + ['--output', output], check=True, stdout=subprocess.DEVNULL)
+    with open(output) as f:
+        stages = [entry['stage'] for entry in json.load(f)['results']]
+    assert stages == ['color_manager', 'clahe', 'convert', 'convert_2t', 'render']
+    # A huge threshold keeps timing noise from failing the comparison
+    subprocess.run(command + ['--compare', output, '--threshold', '100'], check=True, stdout=subprocess.DEVNULL)
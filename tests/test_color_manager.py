@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+from scipy.spatial import cKDTree
+from ascii_art.color_manager import ColorManager
+from ascii_art.options import ColorPalettes
+
+
+def random_colors(seed=3, count=20000):
+    rng = np.random.default_rng(seed)
+    # Integer colors, colors between them and the extremes of every channel
+    return np.concatenate([rng.integers(0, 256, size=(count, 3)).astype(np.float64),
+                           rng.uniform(0, 255, size=(count, 3)),
+                           np.array([[0, 0, 0], [255, 255, 255], [255, 0, 128], [127.5, 127.5, 127.5]])])
+
+
+def assert_nearest(color_manager, colors, indices):
+    # Ties may pick either entry, so compare distances rather than indices
+    reference_distances, _ = cKDTree(color_manager.palette_array.astype(np.float64)).query(colors)
+    chosen = color_manager.palette_array[indices].astype(np.float64)
+    np.testing.assert_allclose(np.linalg.norm(chosen - colors, axis=-1), reference_distances, atol=1e-3)
+
+
+def test_ansi_quantization_matches_the_nearest_neighbour():
+    color_manager = ColorManager(ColorPalettes.ansi)
+    colors = random_colors()
+    indices, rgb = color_manager.quantize(colors)
+    assert_nearest(color_manager, colors, indices)
+    np.testing.assert_array_equal(rgb, color_manager.palette_array[indices])
+
+
+def test_quantize_keeps_the_grid_shape_and_inverts():
+    color_manager = ColorManager(ColorPalettes.ansi)
+    grid = random_colors(count=50)[:100].reshape(10, 10, 3)
+    indices, rgb = color_manager.quantize(grid, invert=True)
+    assert indices.shape == (10, 10) and rgb.shape == (10, 10, 3)
+    assert_nearest(color_manager, (255 - grid).reshape(-1, 3), indices.reshape(-1))
+
+
+def test_closest_color_returns_a_palette_entry():
+    color_manager = ColorManager(ColorPalettes.ansi)
+    assert color_manager.closest_color(np.array([250, 10, 5, 255])) == (255, 0, 0)
+    assert color_manager.closest_color(np.array([250, 10, 5]), invert=True) == (0, 255, 255)
+
+
+def test_xterm256_quantization_matches_the_nearest_neighbour():
+    color_manager = ColorManager(ColorPalettes.xterm256)
+    colors = random_colors(seed=4)
+    # Grays and the midpoints between cube levels sit on Voronoi boundaries
+    levels = np.array([0, 47.5, 95, 115, 135, 155, 175, 195, 215, 235, 255])
+    colors = np.concatenate([colors, np.repeat(np.arange(256.0)[:, None], 3, axis=1),
+                             np.stack(np.meshgrid(levels, levels, levels), axis=-1).reshape(-1, 3)])
+    indices, _ = color_manager.quantize(colors)
+    assert indices.dtype == np.uint8
+    assert_nearest(color_manager, colors, indices)
+
+
+def test_truecolor_indices_round_to_the_nearest_color():
+    color_manager = ColorManager(ColorPalettes.truecolor)
+    colors = random_colors(seed=5)
+    indices, rgb = color_manager.quantize(colors)
+    np.testing.assert_array_equal(rgb, np.rint(colors))
+    np.testing.assert_array_equal(color_manager.palette_colors(indices), rgb)
+    assert color_manager.quantize(np.array([1, 2, 3]))[0] == (1 << 16) | (2 << 8) | 3
@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+from ascii_art import glyph_matcher
+from ascii_art.glyph_matcher import GlyphMatcher
+
+
+@pytest.fixture(scope='module')
+def matcher():
+    return GlyphMatcher(glyph_size=(4, 8))
+
+
+def test_every_glyph_matches_its_own_bitmap(matcher):
+    width, height = matcher.glyph_size
+    tiles = (matcher.bitmaps / matcher.coverage_scale).reshape(1, -1, height, width)
+    matched = matcher.match(tiles)[0]
+    # Glyphs that render identically are interchangeable
+    np.testing.assert_allclose(matcher.bitmaps[matched], matcher.bitmaps, atol=1e-6)
+
+
+def test_flat_tiles_follow_the_coverage_ramp(matcher):
+    levels = np.linspace(0, 1, 50)
+    tiles = np.broadcast_to(levels[:, None, None, None], (50, 1) + matcher.glyph_size[::-1])
+    coverage = matcher.coverage[matcher.match(tiles)[:, 0]]
+    assert np.all(np.diff(coverage) >= 0)
+    assert matcher.chars[matcher.match(tiles[:1])[0, 0]] == ' '
+
+
+def test_chunks_do_not_change_the_matches(matcher, monkeypatch):
+    rng = np.random.default_rng(8)
+    tiles = rng.random((9, 11) + matcher.glyph_size[::-1])
+    expected = matcher.match(tiles)
+    monkeypatch.setattr(glyph_matcher, 'MATCH_CHUNK_TILES', 7)
+    np.testing.assert_array_equal(matcher.match(tiles), expected)
+
+
+def test_bitmaps_come_from_the_artifact_cache(matcher):
+    again = GlyphMatcher(glyph_size=(4, 8))
+    np.testing.assert_array_equal(again.bitmaps, matcher.bitmaps)
+    assert again.digest == matcher.digest
+    assert GlyphMatcher(glyph_size=(2, 4)).digest != matcher.digest
+
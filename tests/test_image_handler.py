@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+from PIL import Image
+from ascii_art.image_handler import MIN_PIXELS_PER_COLUMN, ImageHandler
+
+
+@pytest.fixture
+def gradient():
+    y, x = np.mgrid[0:255:1000j, 0:255:2400j]
+    return np.stack([y, x, (x + y) / 2], axis=-1).astype(np.uint8)
+
+
+@pytest.mark.parametrize("name", ["image.jpg", "image.png"])
+def test_large_images_decode_at_a_reduced_resolution(tmp_path, gradient, name):
+    path = str(tmp_path / name)
+    Image.fromarray(gradient).save(path)
+    img = ImageHandler("file", path, target_width=100).load_image()
+    # Enough pixels for every column, but far fewer than the source
+    assert 100 * MIN_PIXELS_PER_COLUMN <= img.shape[1] < gradient.shape[1]
+    assert img.shape[0] / img.shape[1] == pytest.approx(1000 / 2400, rel=0.02)
+    assert img.dtype == np.uint8 and img.shape[2] == 3
+    # Reduced, not cropped: the corners keep their colors
+    for row, column in ((0, 0), (-1, -1), (0, -1), (-1, 0)):
+        np.testing.assert_allclose(img[row, column], gradient[row, column], atol=20)
+
+
+def test_small_images_and_no_target_decode_in_full(tmp_path, gradient):
+    path = str(tmp_path / "image.png")
+    Image.fromarray(gradient).save(path)
+    np.testing.assert_array_equal(ImageHandler("file", path).load_image(), gradient)
+    np.testing.assert_array_equal(ImageHandler("file", path, target_width=1000).load_image(), gradient)
+
+
+def test_bytes_decode_like_files(tmp_path, gradient):
+    path = tmp_path / "image.jpg"
+    Image.fromarray(gradient).save(path)
+    from_file = ImageHandler("file", str(path), target_width=50).load_image()
+    from_bytes = ImageHandler("bytes", path.read_bytes(), target_width=50).load_image()
+    np.testing.assert_array_equal(from_bytes, from_file)
+
+
+@pytest.mark.parametrize("mode,channels", [("P", 3), ("L", 3), ("LA", 4), ("RGBA", 4), ("I;16", 3)])
+def test_modes_are_normalized(tmp_path, gradient, mode, channels):
+    path = str(tmp_path / "image.png")
+    img = Image.fromarray(gradient)
+    img = img.convert("L").convert(mode) if mode == "I;16" else img.convert(mode)
+    img.save(path)
+    assert ImageHandler("file", path, target_width=100).load_image().shape[2] == channels
@@ -0,0 +1,74 @@
+import json
+import os
+import subprocess
+import sys
+import numpy as np
+import pytest
+from PIL import Image
+from ascii_art.profiler import NULL_SPAN, PROFILE_ENV_VAR, PROFILE_OUTPUT_ENV_VAR, Profiler
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+
+
+@pytest.fixture
+def profiler():
+    profiler = Profiler()
+    profiler.enable()
+    with profiler.span('outer'):
+        for _ in range(3):
+            with profiler.span('inner'):
+                profiler.count('cells', 10)
+    profiler.count('bytes')
+    return profiler
+
+
+def test_disabled_profiler_records_nothing():
+    profiler = Profiler()
+    assert profiler.span('anything') is NULL_SPAN
+    with profiler.span('anything'):
+        profiler.count('cells', 10)
+    assert profiler.events == [] and profiler.counters == {}
+
+
+def test_spans_and_counters(profiler):
+    totals = profiler.span_totals()
+    assert totals['inner'][0] == 3 and totals['outer'][0] == 1
+    # The outer span encloses the inner ones
+    assert totals['outer'][1] >= totals['inner'][1]
+    assert profiler.counters == {'cells': 30, 'bytes': 1}
+    profiler.enable()
+    assert profiler.events == [] and profiler.counters == {}
+
+
+def test_exports(profiler, tmp_path):
+    table = profiler.stats_table()
+    assert 'outer' in table and 'inner' in table and 'cells' in table
+
+    records = [json.loads(line) for line in profiler.json_lines().splitlines()]
+    assert [record['name'] for record in records if record['type'] == 'span'] == ['inner'] * 3 + ['outer']
+    assert {record['name']: record['value'] for record in records if record['type'] == 'counter'} == \
+        {'bytes': 1, 'cells': 30}
+
+    trace = json.loads(profiler.chrome_trace())['traceEvents']
+    assert sorted(event['ph'] for event in trace) == ['C', 'C', 'X', 'X', 'X', 'X']
+    assert all(event['dur'] >= 0 for event in trace if event['ph'] == 'X')
+
+    path = str(tmp_path / 'trace.json')
+    profiler.export('chrome', path)
+    with open(path) as f:
+        assert json.load(f)['traceEvents'] == trace
+    with pytest.raises(ValueError):
+        profiler.export('xml', path)
+
+
+def test_environment_variable_profiles_the_cli(tmp_path):
+    image_path = str(tmp_path / 'image.png')
+    Image.fromarray(np.zeros((30, 40, 3), dtype=np.uint8)).save(image_path)
+    report_path = str(tmp_path / 'profile.jsonl')
+    env = dict(os.environ, XDG_CACHE_HOME=str(tmp_path))
+    env.update({PROFILE_ENV_VAR: 'json', PROFILE_OUTPUT_ENV_VAR: report_path})
+    subprocess.run([sys.executable, 'main.py', '--file', image_path, '--width', '20', '--output',
+                    str(tmp_path / 'out.txt')], cwd=SRC_DIR, env=env, check=True)
+    with open(report_path) as f:
+        names = {json.loads(line)['name'] for line in f}
+    assert {'load_image:file', 'quantize', 'palette_lookups'} <= names
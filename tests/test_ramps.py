@@ -0,0 +1,61 @@
+import itertools
+import json
+import sys
+import numpy as np
+import pytest
+from ascii_art.cli import get_cli_arguments
+from ascii_art.options import CHARACTER_ASPECT_RATIO, load_ramp
+from utils.generate_char_density_map import select_gradient_chars_dp, write_ramp_file
+
+DENSITY_MAP = [(' ', 0.0), ('.', 0.05), (',', 0.07), (':', 0.2), ('-', 0.22), ('=', 0.41), ('+', 0.45),
+               ('*', 0.6), ('%', 0.71), ('#', 0.8), ('@', 1.0)]
+
+
+def test_ramp_file_round_trip(tmp_path):
+    path = tmp_path / 'Font.ramp'
+    write_ramp_file(str(path), '/fonts/Font.ttf', DENSITY_MAP, [' ', ':', '+', '@'], (10, 20))
+    assert load_ramp(str(path)) == (' :+@', 0.5)
+
+
+def test_ramp_file_without_aspect_ratio(tmp_path):
+    path = tmp_path / 'Old.ramp'
+    path.write_text(json.dumps({'version': 1, 'ramp': ' .:@'}))
+    assert load_ramp(str(path)) == (' .:@', CHARACTER_ASPECT_RATIO)
+
+
+@pytest.mark.parametrize('contents', [None, 'not json', json.dumps({'version': 99, 'ramp': ' @'})])
+def test_bad_ramp_file_is_a_usage_error(tmp_path, monkeypatch, capsys, contents):
+    path = tmp_path / 'bad.ramp'
+    if contents is not None:
+        path.write_text(contents)
+    monkeypatch.setattr(sys, 'argv', ['main.py', '-f', 'x.png', '--ramp', str(path)])
+    with pytest.raises(SystemExit) as exit_info:
+        get_cli_arguments()
+    assert exit_info.value.code == 2
+    assert f'cannot read ramp file {path}' in capsys.readouterr().err
+
+
+def test_ramp_option_sets_density_map_and_aspect_ratio(tmp_path, monkeypatch):
+    path = tmp_path / 'Font.ramp'
+    write_ramp_file(str(path), 'Font.ttf', DENSITY_MAP, [' ', '+', '@'], (12, 16))
+    monkeypatch.setattr(sys, 'argv', ['main.py', '-f', 'x.png', '--ramp', str(path)])
+    args = get_cli_arguments()
+    assert (args.density_map, args.character_aspect_ratio) == (' +@', 0.75)
+
+
+def squared_deviation(values, labels):
+    return sum(((values[labels == label] - values[labels == label].mean()) ** 2).sum() for label in set(labels))
+
+
+def test_dp_gradient_selection_is_optimal():
+    rng = np.random.default_rng(0)
+    densities = np.sort(rng.random(10))
+    density_map = [(chr(65 + index), density) for index, density in enumerate(densities)]
+    num_chars = 6
+    _, labels = select_gradient_chars_dp(density_map, num_chars)
+    inner = densities[1:-1]
+
+    best = min(
+        squared_deviation(inner, np.searchsorted(splits, np.arange(len(inner)), side='right'))
+        for splits in itertools.combinations(range(1, len(inner)), num_chars - 3))
+    assert squared_deviation(inner, np.asarray(labels)) == pytest.approx(best)
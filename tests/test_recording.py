@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+from ascii_art.ascii_frame import AsciiFrame
+from ascii_art.color_manager import ColorManager
+from ascii_art.options import ColorPalettes
+from ascii_art.recording import Recording, write_recording
+
+CHARS = list(" .:-=+*#%@")
+
+
+def make_frames(count=23, seed=12):
+    # A drifting pattern with a few changed cells per frame, and a resize
+    # part way through
+    rng = np.random.default_rng(seed)
+    color_manager = ColorManager(ColorPalettes.xterm256)
+    glyphs = rng.integers(0, len(CHARS), size=(8, 12)).astype(np.uint8)
+    colors = rng.integers(0, 256, size=(8, 12)).astype(np.uint8)
+    frames = []
+    for index in range(count):
+        if index == 15:
+            glyphs, colors = glyphs[:, :10].copy(), colors[:, :10].copy()
+        cells = rng.integers(0, glyphs.size, size=3)
+        glyphs.flat[cells] = rng.integers(0, len(CHARS), size=3)
+        colors.flat[cells] = rng.integers(0, 256, size=3)
+        frames.append((AsciiFrame(glyphs.copy(), colors.copy(), CHARS, color_manager), 40 + index % 3 * 10))
+    return frames
+
+
+@pytest.fixture
+def recorded(tmp_path):
+    frames = make_frames()
+    path = str(tmp_path / 'video.arec')
+    recorder = write_recording(frames, path, keyframe_interval=4)
+    assert recorder.compressed_bytes < recorder.raw_bytes / 2
+    recording = Recording(path)
+    yield frames, recording
+    recording.close()
+
+
+def test_sequential_playback_returns_every_frame(recorded):
+    frames, recording = recorded
+    assert len(recording) == len(frames)
+    assert recording.duration == sum(duration for _, duration in frames)
+    played = list(recording.frames())
+    assert [duration for _, duration in played] == [duration for _, duration in frames]
+    for (frame, _), (expected, _) in zip(played, frames):
+        assert frame.to_bytes() == expected.to_bytes()
+    # Keyframes every four frames and where the size changes
+    assert np.flatnonzero(recording.index['keyframe']).tolist() == [0, 4, 8, 12, 15, 16, 20]
+
+
+def test_seeking_matches_sequential_decoding(recorded):
+    frames, recording = recorded
+    for position in np.random.default_rng(13).permutation(len(frames)).tolist() + [7, 7, 3]:
+        assert recording.frame(position).to_bytes() == frames[position][0].to_bytes()
+
+
+def test_start_times(recorded):
+    frames, recording = recorded
+    starts = np.cumsum([0] + [duration for _, duration in frames])
+    assert recording.position_at(0) == 0
+    assert recording.position_at(starts[5]) == 5
+    assert recording.position_at(starts[5] - 1) == 4
+    assert recording.position_at(10 ** 9) == len(frames) - 1
+    played = list(recording.frames(start_ms=starts[9] + 1))
+    assert len(played) == len(frames) - 9
+    assert played[0][0].to_bytes() == frames[9][0].to_bytes()
+
+
+def test_damaged_recordings_are_rejected(tmp_path, recorded):
+    path = tmp_path / 'video.arec'
+    data = path.read_bytes()
+    truncated = tmp_path / 'truncated.arec'
+    truncated.write_bytes(data[:len(data) // 2])
+    with pytest.raises(ValueError, match='index is missing'):
+        Recording(str(truncated))
+    other = tmp_path / 'other.arec'
+    other.write_bytes(b'GIF89a' + data[6:])
+    with pytest.raises(ValueError, match='not an ASCII recording'):
+        Recording(str(other))
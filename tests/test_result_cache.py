@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+from ascii_art.ascii_handler import AsciiHandler
+from ascii_art.options import DENSITY_MAP_256
+from ascii_art.result_cache import ResultCache, image_digest
+
+
+def maps(value, shape=(10, 10)):
+    return np.full(shape, value, dtype=np.uint8), np.full(shape, value, dtype=np.uint8)
+
+
+@pytest.fixture
+def img():
+    rng = np.random.default_rng(10)
+    return rng.integers(0, 256, size=(60, 80, 3), dtype=np.uint8)
+
+
+def test_keys_depend_on_content_shape_and_settings(img):
+    cache = ResultCache()
+    assert cache.key_for(img, (1, 2)) == cache.key_for(img.copy(), (1, 2))
+    assert cache.key_for(img, (1, 2)) != cache.key_for(img, (1, 3))
+    assert image_digest(img) != image_digest(img.reshape(80, 60, 3))
+    changed = img.copy()
+    changed[0, 0, 0] ^= 1
+    assert image_digest(changed) != image_digest(img)
+
+
+def test_memory_tier_evicts_the_least_recently_used():
+    entry_bytes = 2 * 10 * 10
+    cache = ResultCache(memory_bytes=3 * entry_bytes)
+    for key in range(3):
+        cache.put(key, *maps(key))
+    assert cache.get(0) is not None
+    cache.put(3, *maps(3))
+    assert cache.get(1) is None
+    for key in (0, 2, 3):
+        np.testing.assert_array_equal(cache.get(key)[0], maps(key)[0])
+    stats = cache.stats()
+    assert (stats['entries'], stats['bytes'], stats['evictions'], stats['misses']) == (3, 3 * entry_bytes, 1, 1)
+
+
+def test_disk_tier_outlives_the_process(tmp_path):
+    ResultCache(disk=True, directory=str(tmp_path)).put(('image', 'settings'), *maps(5))
+    cache = ResultCache(disk=True, directory=str(tmp_path))
+    char_indices, color_indices = cache.get(('image', 'settings'))
+    np.testing.assert_array_equal(char_indices, maps(5)[0])
+    assert cache.get(('image', 'settings')) is not None
+    assert cache.stats()['disk_hits'] == 1 and cache.stats()['hits'] == 1
+
+
+def test_cached_conversions_match_fresh_ones(img):
+    cache = ResultCache()
+    handler = AsciiHandler(img, 30, density_map=DENSITY_MAP_256, result_cache=cache)
+    first = handler.image_to_frame(adaptive_hist_eq=True)
+    second = handler.image_to_frame(adaptive_hist_eq=True)
+    assert second.to_bytes() == first.to_bytes()
+    assert handler.image_to_frame(adaptive_hist_eq=True, invert=True).to_bytes() != first.to_bytes()
+    handler.width = 31
+    handler.image_to_frame(adaptive_hist_eq=True)
+    assert (cache.stats()['hits'], cache.stats()['misses']) == (1, 3)
+    uncached = AsciiHandler(img, 30, density_map=DENSITY_MAP_256).image_to_frame(adaptive_hist_eq=True)
+    assert uncached.to_bytes() == first.to_bytes()
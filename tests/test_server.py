@@ -0,0 +1,130 @@
+import http.client
+import io
+import json
+import socket
+import threading
+import time
+from contextlib import contextmanager
+import numpy as np
+import pytest
+from PIL import Image
+from ascii_art.ascii_handler import AsciiHandler
+from ascii_art.server import ConversionServer, ConversionService
+
+
+def png_bytes(seed=9):
+    rng = np.random.default_rng(seed)
+    buffer = io.BytesIO()
+    Image.fromarray(rng.integers(0, 256, size=(30, 40, 3), dtype=np.uint8)).save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+@contextmanager
+def serving(service):
+    server = ConversionServer(('127.0.0.1', 0), service)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield server
+    finally:
+        server.httpd.shutdown()
+        thread.join()
+
+
+def small_service():
+    return ConversionService(width=20, workers=1, queue_size=0, max_request_bytes=1 << 16)
+
+
+@pytest.fixture(scope='module')
+def server():
+    with serving(small_service()) as server:
+        yield server
+
+
+def request(server, method, path, body=None, headers=None):
+    connection = http.client.HTTPConnection(*server.httpd.server_address, timeout=30)
+    try:
+        connection.request(method, path, body=body, headers=headers or {})
+        response = connection.getresponse()
+        return response.status, dict(response.getheaders()), response.read()
+    finally:
+        connection.close()
+
+
+def raw_request(server, data):
+    # For requests http.client will not send: no Content-Length, or headers
+    # that wait for 100 Continue
+    with socket.create_connection(server.httpd.server_address, timeout=30) as sock:
+        sock.sendall(data)
+        return sock.recv(65536).split(b'\r\n', 1)[0]
+
+
+def test_converts_like_the_handler(server):
+    data = png_bytes()
+    status, headers, body = request(server, 'POST', '/convert?width=30&invert=1', data)
+    assert status == 200 and headers['Content-Type'] == 'text/plain; charset=utf-8'
+    handler = AsciiHandler(None, 30)
+    handler.img = np.asarray(Image.open(io.BytesIO(data)))
+    assert body.decode() == handler.image_to_frame(adaptive_hist_eq=True, invert=True).to_text()
+
+    status, headers, body = request(server, 'POST', '/convert?format=html&palette=ansi', data)
+    assert status == 200 and headers['Content-Type'] == 'text/html; charset=utf-8'
+    status, _, body = request(server, 'POST', '/convert?format=ansi&palette=truecolor', data)
+    assert status == 200 and b'\x1b[38;2;' in body
+
+
+@pytest.mark.parametrize('path,body,status', [
+    ('/convert?width=0', b'x', 400),
+    ('/convert?width=wide', b'x', 400),
+    ('/convert?palette=cmyk', b'x', 400),
+    ('/convert?format=pdf', b'x', 400),
+    ('/convert?density_map=', b'x', 400),
+    ('/elsewhere', b'x', 404),
+    ('/convert', b'x' * ((1 << 16) + 1), 413),
+    ('/convert', b'not an image', 422),
+], ids=['zero width', 'bad width', 'bad palette', 'bad format', 'empty density map', 'bad path', 'too large',
+        'bad image'])
+def test_request_errors(server, path, body, status):
+    assert request(server, 'POST', path, body)[0] == status
+
+
+def test_missing_length_and_unknown_paths(server):
+    assert raw_request(server, b'POST /convert HTTP/1.1\r\nHost: test\r\n\r\n') == b'HTTP/1.1 411 Length Required'
+    assert request(server, 'GET', '/convert')[0] == 404
+
+
+def test_large_uploads_are_refused_before_they_are_sent(server):
+    status = raw_request(server, b'POST /convert HTTP/1.1\r\nHost: test\r\nContent-Length: 100000000\r\n'
+                                 b'Expect: 100-continue\r\n\r\n')
+    assert status == b'HTTP/1.1 413 Request Entity Too Large'
+
+
+def test_busy_server_turns_requests_away():
+    service = small_service()
+    release = threading.Event()
+    convert = service.convert
+
+    def slow_convert(data, options):
+        release.wait(30)
+        return convert(data, options)
+
+    service.convert = slow_convert
+    with serving(service) as server:
+        first = []
+        thread = threading.Thread(target=lambda: first.append(request(server, 'POST', '/convert', png_bytes())))
+        thread.start()
+        deadline = time.monotonic() + 30
+        while service.stats.in_flight == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        status, headers, _ = request(server, 'POST', '/convert', png_bytes())
+        assert status == 503 and headers['Retry-After'] == '1'
+        release.set()
+        thread.join()
+        assert first[0][0] == 200
+
+        status, _, body = request(server, 'GET', '/stats')
+    stats = json.loads(body)
+    assert status == 200
+    assert (stats['completed'], stats['rejected'], stats['in_flight']) == (1, 1, 0)
+    assert stats['latency_ms']['window'] == 1
@@ -0,0 +1,57 @@
+import json
+import os
+import subprocess
+import sys
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+MAIN_SCRIPT = os.path.join(SRC_DIR, 'main.py')
+# Backends that only the conversion itself needs; none of them may load while
+# the command line is parsed
+HEAVY_MODULES = ('numpy', 'PIL', 'cv2', 'scipy', 'skimage', 'requests', 'sklearn')
+# Import time main.py -h may add to the bare interpreter
+IMPORT_BUDGET_MICROSECONDS = 100_000
+LOADED_MODULES_SCRIPT = """
+import json, runpy, sys
+sys.argv = ['main.py'] + sys.argv[1:]
+sys.stdout = sys.stderr = open('/dev/null', 'w')
+try:
+    runpy.run_path({main!r}, run_name='__main__')
+except SystemExit:
+    pass
+sys.stdout = sys.__stdout__
+print(json.dumps(sorted({{name.split('.')[0] for name in sys.modules}} & set({heavy!r}))))
+"""
+
+
+def loaded_heavy_modules(*args):
+    script = LOADED_MODULES_SCRIPT.format(main=MAIN_SCRIPT, heavy=HEAVY_MODULES)
+    output = subprocess.check_output([sys.executable, '-c', script, *args], cwd=SRC_DIR)
+    return json.loads(output)
+
+
+def test_help_loads_no_backends():
+    assert loaded_heavy_modules('-h') == []
+
+
+def test_invalid_arguments_load_no_backends():
+    assert loaded_heavy_modules('--width', 'wide') == []
+    assert loaded_heavy_modules('--glyph-size', '0x8') == []
+
+
+def import_microseconds(*args):
+    # Total cumulative time of the top-level imports reported by -X importtime
+    result = subprocess.run([sys.executable, '-X', 'importtime', *args], cwd=SRC_DIR,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    total = 0
+    for line in result.stderr.splitlines():
+        if line.startswith('import time:') and '|' in line:
+            _, cumulative, name = line.split('|')
+            if cumulative.strip().isdigit() and not name.startswith('  '):
+                total += int(cumulative)
+    return total
+
+
+def test_help_imports_are_cheap():
+    # Coarse budget: the backends alone take hundreds of milliseconds
+    overhead = min(import_microseconds(MAIN_SCRIPT, '-h') - import_microseconds('-c', 'pass') for _ in range(3))
+    assert overhead < IMPORT_BUDGET_MICROSECONDS
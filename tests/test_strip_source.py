@@ -0,0 +1,94 @@
+import numpy as np
+import pytest
+from PIL import Image
+from ascii_art import strip_source
+from ascii_art.ascii_handler import AsciiHandler
+from ascii_art.strip_source import MemoryStrips, RawTileStrips, needs_strips, open_strip_source
+
+
+@pytest.fixture
+def pixels():
+    rng = np.random.default_rng(0)
+    return rng.integers(0, 256, size=(150, 211, 3), dtype=np.uint8)
+
+
+@pytest.fixture
+def small_out_of_core(monkeypatch):
+    monkeypatch.setattr(strip_source, 'OUT_OF_CORE_BYTES', 0)
+
+
+@pytest.mark.parametrize('name,mode', [('image.tif', 'RGB'), ('image.tif', 'L'), ('image.bmp', 'RGB'),
+                                       ('image.ppm', 'RGB')])
+def test_raw_tiles_read_the_decoded_pixels(tmp_path, pixels, small_out_of_core, name, mode):
+    path = str(tmp_path / name)
+    img = Image.fromarray(pixels).convert(mode)
+    img.save(path)
+    expected = np.asarray(img).reshape(img.height, img.width, -1)
+
+    assert needs_strips(path)
+    source = open_strip_source(path)
+    assert source.shape == expected.shape
+    for start, stop in ((0, 150), (7, 8), (33, 101), (149, 150)):
+        np.testing.assert_array_equal(source.read_rows(start, stop), expected[start:stop])
+
+
+def test_plain_tuple_tiles(tmp_path, pixels):
+    # Pillow before 11 describes tiles with plain tuples
+    path = str(tmp_path / 'image.tif')
+    Image.fromarray(pixels).save(path)
+    with Image.open(path) as img:
+        img.tile = [tuple(tile) for tile in img.tile]
+        source = RawTileStrips(path, img)
+    np.testing.assert_array_equal(source.read_rows(0, 150), pixels)
+
+
+@pytest.mark.parametrize('name,mode,options', [
+    ('bgra.bmp', 'RGBA', {}),
+    ('wide.tif', 'I;16', {}),
+    ('rgbx.tif', 'CMYK', {}),
+    ('lzw.tif', 'RGB', {'compression': 'tiff_lzw'}),
+])
+def test_unsupported_layouts_load_normally(tmp_path, pixels, small_out_of_core, name, mode, options):
+    path = str(tmp_path / name)
+    img = Image.fromarray(pixels)
+    img = img.convert('L').convert(mode) if mode == 'I;16' else img.convert(mode)
+    img.save(path, **options)
+    assert not needs_strips(path)
+    with pytest.raises(ValueError):
+        open_strip_source(path)
+
+
+def test_npy_strips(tmp_path, pixels):
+    path = str(tmp_path / 'image.npy')
+    np.save(path, pixels)
+    assert needs_strips(path)
+    np.testing.assert_array_equal(open_strip_source(path).read_rows(10, 90), pixels[10:90])
+
+
+def test_raw_strips(tmp_path, pixels):
+    path = str(tmp_path / 'image.raw')
+    pixels.tofile(path)
+    source = open_strip_source(path, (211, 150, 3))
+    np.testing.assert_array_equal(source.read_rows(0, 150), pixels)
+
+
+def test_strip_conversion_does_not_depend_on_the_source(tmp_path, pixels):
+    path = str(tmp_path / 'image.tif')
+    Image.fromarray(pixels).save(path)
+    handler = AsciiHandler(None, 40)
+    in_memory = handler.strips_to_frame(MemoryStrips(pixels), adaptive_hist_eq=True)
+    from_file = handler.strips_to_frame(open_strip_source(path), adaptive_hist_eq=True)
+    assert from_file.to_bytes() == in_memory.to_bytes()
+
+
+@pytest.mark.parametrize('name', ['image.tif', 'image.npy'])
+def test_read_rows_column_range(tmp_path, pixels, small_out_of_core, name):
+    path = str(tmp_path / name)
+    if name.endswith('.npy'):
+        np.save(path, pixels)
+    else:
+        Image.fromarray(pixels).save(path)
+    for source in (open_strip_source(path), MemoryStrips(pixels)):
+        for start, stop, column_start, column_stop in ((0, 150, 0, 211), (7, 8, 100, 101), (33, 101, 5, 180)):
+            np.testing.assert_array_equal(source.read_rows(start, stop, column_start, column_stop),
+                                          pixels[start:stop, column_start:column_stop])
@@ -0,0 +1,152 @@
+import io
+import re
+import numpy as np
+import pytest
+from ascii_art.ascii_frame import AsciiFrame
+from ascii_art.color_manager import ColorManager
+from ascii_art.options import ColorPalettes
+from ascii_art.terminal_renderer import DeltaRenderer, TerminalRenderer, raw_fd
+
+ESCAPE_SEQUENCE = re.compile(r"\x1b\[([0-9;]*)([A-Za-z])")
+
+
+class Screen:
+    # Just enough of a terminal to replay the renderers' output: text,
+    # newlines, cursor positioning and foreground colors
+    def __init__(self, rows, columns):
+        self.text = [[" "] * columns for _ in range(rows)]
+        self.colors = [[None] * columns for _ in range(rows)]
+        self.row = self.column = 0
+        self.color = None
+
+    def feed(self, data):
+        text = data.decode()
+        position = 0
+        for match in ESCAPE_SEQUENCE.finditer(text):
+            self.put(text[position:match.start()])
+            position = match.end()
+            params = [int(param) for param in match.group(1).split(";") if param]
+            if match.group(2) == "H":
+                row, column = params or (1, 1)
+                self.row, self.column = row - 1, column - 1
+            elif match.group(2) == "m":
+                if params in ([], [0]):
+                    self.color = None
+                elif params[:2] == [38, 5]:
+                    self.color = ("xterm", params[2])
+                elif params[:2] == [38, 2]:
+                    self.color = ("rgb", tuple(params[2:5]))
+                else:
+                    raise AssertionError(f"unexpected SGR sequence {match.group(0)!r}")
+            else:
+                raise AssertionError(f"unexpected escape sequence {match.group(0)!r}")
+        self.put(text[position:])
+
+    def put(self, text):
+        for char in text:
+            if char == "\n":
+                self.row, self.column = self.row + 1, 0
+                continue
+            self.text[self.row][self.column] = char
+            self.colors[self.row][self.column] = self.color
+            self.column += 1
+
+    def assert_shows(self, frame, color_manager):
+        assert ["".join(row) for row in self.text] == frame.to_text().splitlines()
+        if frame.colors is None:
+            return
+        codes = None
+        if color_manager.palette_type != ColorPalettes.truecolor:
+            codes = color_manager.terminal_color_codes()
+        for row, column in zip(*np.nonzero(frame.codepoints() != ord(" "))):
+            key = int(frame.colors[row, column])
+            expected = ("xterm", codes[key]) if codes else ("rgb", (key >> 16, (key >> 8) & 0xFF, key & 0xFF))
+            assert self.colors[row][column] == expected, (row, column)
+
+
+def random_frame(color_manager, shape=(12, 30), seed=6, chars=" .:-=+*#%@"):
+    rng = np.random.default_rng(seed)
+    glyphs = rng.integers(0, len(chars), size=shape).astype(np.uint8)
+    # Runs of one color, so that the renderers have something to coalesce
+    colors, _ = color_manager.quantize(np.repeat(rng.integers(0, 256, size=(shape[0], shape[1] // 5, 3)), 5, axis=1))
+    return AsciiFrame(glyphs, colors, list(chars), color_manager)
+
+
+@pytest.mark.parametrize("palette", list(ColorPalettes))
+def test_render_draws_every_cell_in_its_color(palette):
+    color_manager = ColorManager(palette)
+    frame = random_frame(color_manager)
+    data = TerminalRenderer(color_manager).render(frame)
+    screen = Screen(*frame.shape)
+    screen.feed(data)
+    screen.assert_shows(frame, color_manager)
+    assert data.endswith(b"\x1b[0m\n")
+    # Runs of one color are written with a single color change
+    assert data.count(b"\x1b[38") <= frame.shape[0] * frame.shape[1] // 5
+
+
+def test_monochrome_render_is_the_plain_text():
+    color_manager = ColorManager(ColorPalettes.ansi)
+    frame = random_frame(color_manager).monochrome()
+    assert TerminalRenderer(color_manager).render(frame) == frame.to_text().encode()
+
+
+def test_raw_fd(tmp_path):
+    with open(tmp_path / "out", "wb") as f:
+        assert raw_fd(f) == f.fileno()
+    assert raw_fd(io.BytesIO()) is None
+    assert raw_fd(io.StringIO()) is None
+
+    class Wrapper:
+        # Like the stream colorama.init() puts around sys.stdout
+        def fileno(self):
+            return 1
+
+    assert raw_fd(Wrapper()) is None
+
+
+def test_write_goes_through_streams_without_a_descriptor(tmp_path):
+    color_manager = ColorManager(ColorPalettes.xterm256)
+    frame = random_frame(color_manager)
+    stream = io.StringIO()
+    renderer = TerminalRenderer(color_manager, stream)
+    size = renderer.write_frame(frame)
+    assert stream.getvalue().encode() == renderer.render(frame)
+    assert size == renderer.last_frame_bytes == len(stream.getvalue().encode())
+
+    with open(tmp_path / "out", "w") as f:
+        TerminalRenderer(color_manager, f).write_frame(frame)
+    assert (tmp_path / "out").read_bytes() == renderer.render(frame)
+
+
+def changed_frame(frame, color_manager, fraction, seed):
+    # A copy of frame with about fraction of its cells given new glyphs or colors
+    rng = np.random.default_rng(seed)
+    other = random_frame(color_manager, frame.shape, seed=seed + 100)
+    glyphs, colors = frame.glyphs.copy(), frame.colors.copy()
+    new_glyphs = rng.random(frame.shape) < fraction / 2
+    new_colors = rng.random(frame.shape) < fraction / 2
+    glyphs[new_glyphs] = other.glyphs[new_glyphs]
+    colors[new_colors] = other.colors[new_colors]
+    return AsciiFrame(glyphs, colors, frame.chars, color_manager)
+
+
+@pytest.mark.parametrize("palette", list(ColorPalettes))
+def test_deltas_turn_each_frame_into_the_next(palette):
+    color_manager = ColorManager(palette)
+    renderer = DeltaRenderer(color_manager)
+    screen = Screen(12, 30)
+    frame = random_frame(color_manager)
+    full_redraw = renderer.render(frame)
+    screen.feed(full_redraw)
+    screen.assert_shows(frame, color_manager)
+
+    for step, fraction in enumerate((0.02, 0.1, 0, 0.3, 0.9, 0.05)):
+        frame = changed_frame(frame, color_manager, fraction, seed=step)
+        data = renderer.render(frame)
+        screen.feed(data)
+        screen.assert_shows(frame, color_manager)
+        if fraction == 0:
+            assert data == b""
+        elif fraction < 0.1:
+            assert len(data) < len(full_redraw) / 2
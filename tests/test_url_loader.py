@@ -0,0 +1,122 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO
+import numpy as np
+import pytest
+from PIL import Image
+
+pytest.importorskip('requests')
+
+from ascii_art.url_loader import DownloadError, UrlLoader  # noqa: E402
+
+REQUEST_DELAY = 0.1
+
+
+def image_bytes(seed, image_format='PNG', size=(64, 48)):
+    rng = np.random.default_rng(seed)
+    buffer = BytesIO()
+    Image.fromarray(rng.integers(0, 256, (size[1], size[0], 3), dtype=np.uint8)).save(buffer, image_format)
+    return buffer.getvalue()
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    # /img/<n>.png and /img/<n>.gif serve images after REQUEST_DELAY, /slow
+    # never answers in time, /big is larger than it says, /broken is not an
+    # image. Tracks the most requests in flight per Host header.
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        server = self.server
+        host = self.headers['Host']
+        with server.lock:
+            server.active[host] = server.active.get(host, 0) + 1
+            server.peak[host] = max(server.peak.get(host, 0), server.active[host])
+        try:
+            if self.path == '/slow':
+                time.sleep(2)
+                body = image_bytes(0)
+            elif self.path == '/big':
+                body = b'\0' * (1 << 20)
+            elif self.path == '/broken':
+                body = b'not an image' * 100
+            else:
+                time.sleep(REQUEST_DELAY)
+                name, extension = self.path.rsplit('/', 1)[1].split('.')
+                body = image_bytes(int(name), 'GIF' if extension == 'gif' else 'PNG')
+            self.send_response(200)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        except ConnectionError:
+            pass
+        finally:
+            with server.lock:
+                server.active[host] -= 1
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StandInHandler)
+    server.daemon_threads = True
+    server.lock = threading.Lock()
+    server.active, server.peak = {}, {}
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def url(server, path, host='127.0.0.1'):
+    return f'http://{host}:{server.server_address[1]}{path}'
+
+
+def load_all(loader, urls):
+    results = {}
+    loader.load_all(urls, results.__setitem__)
+    return results
+
+
+def test_timeout(server):
+    loader = UrlLoader(timeout=0.3)
+    start = time.monotonic()
+    with pytest.raises(Exception):
+        loader.fetch(url(server, '/slow'))
+    assert time.monotonic() - start < 1.5
+
+
+def test_max_bytes(server):
+    loader = UrlLoader(max_bytes=1000)
+    with pytest.raises(DownloadError):
+        loader.fetch(url(server, '/big'))
+
+
+def test_decode_error_does_not_abort_the_others(server):
+    urls = [url(server, '/img/1.png'), url(server, '/broken'), url(server, '/img/2.gif')]
+    results = load_all(UrlLoader(), urls)
+    assert set(results) == set(urls)
+    assert isinstance(results[urls[1]], Exception)
+    assert isinstance(results[urls[0]], np.ndarray) and isinstance(results[urls[2]], np.ndarray)
+
+
+def test_per_host_connection_limit(server):
+    urls = [url(server, f'/img/{n}.png', host) for n in range(8) for host in ('127.0.0.1', 'localhost')]
+    results = load_all(UrlLoader(connections=8, connections_per_host=2), urls)
+    assert all(isinstance(result, np.ndarray) for result in results.values())
+    port = server.server_address[1]
+    assert server.peak[f'127.0.0.1:{port}'] <= 2
+    assert server.peak[f'localhost:{port}'] <= 2
+
+
+def test_concurrent_fetch_matches_serial_fetch(server):
+    urls = [url(server, f'/img/{n}.{extension}') for n in range(6) for extension in ('png', 'gif')]
+    loader = UrlLoader(target_width=20)
+    serial = {u: loader.fetch(u) for u in urls}
+    concurrent = load_all(loader, urls)
+    assert set(concurrent) == set(urls)
+    for u in urls:
+        np.testing.assert_array_equal(concurrent[u], serial[u])
@@ -0,0 +1,47 @@
+import io
+import queue
+import numpy as np
+import pytest
+from ascii_art.ascii_handler import AsciiHandler
+from ascii_art.video_stream import StageStats, VideoStream
+
+cv2 = pytest.importorskip("cv2")
+
+
+@pytest.fixture
+def video_path(tmp_path):
+    # 30 frames at 30 fps, each a different gray so that frames can be told apart
+    path = str(tmp_path / "video.avi")
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), 30, (64, 48))
+    for index in range(30):
+        writer.write(np.full((48, 64, 3), index * 8, dtype=np.uint8))
+    writer.release()
+    return path
+
+
+def test_put_latest_drops_the_oldest_item():
+    stream = VideoStream(0, AsciiHandler(None, 10))
+    target, stats = queue.Queue(maxsize=2), StageStats("test")
+    for item in range(5):
+        stream.put_latest(target, item, stats)
+    assert [target.get_nowait(), target.get_nowait()] == [3, 4]
+    assert stats.dropped == 3
+
+
+def test_frames_follow_the_target_rate(video_path):
+    stream = VideoStream(video_path, AsciiHandler(None, 16), fps=10)
+    frames = list(stream.frames())
+    # Every third source frame, each shown for a tenth of a second
+    assert [duration for _, duration in frames] == [100] * 10
+    assert all(frame.shape[1] == 16 for frame, _ in frames)
+    brightness = [frame.glyphs.mean() for frame, _ in frames]
+    assert brightness == sorted(brightness)
+
+
+def test_run_renders_every_frame_without_drops(video_path):
+    output = io.StringIO()
+    stream = VideoStream(video_path, AsciiHandler(None, 16), fps=100, queue_size=64, stream=output)
+    stream.run()
+    assert len(stream.stats["render"].latencies) == 30
+    assert stream.stats["capture"].dropped == stream.stats["convert"].dropped == 0
+    assert stream.bytes_written > 0 and output.getvalue().endswith("\x1b[?25h")
@@ -0,0 +1,85 @@
+import io
+import numpy as np
+import pytest
+from PIL import Image
+from ascii_art.ascii_handler import AsciiHandler, bin_pixel_range, reduce_strips
+from ascii_art.profiler import profiler
+from ascii_art.strip_source import MemoryStrips, open_strip_source
+from ascii_art import viewer
+from ascii_art.viewer import PyramidViewer, TilePyramid, parse_keys
+
+
+@pytest.fixture
+def image_path(tmp_path):
+    rng = np.random.default_rng(1)
+    path = str(tmp_path / 'image.tif')
+    Image.fromarray(rng.integers(0, 256, size=(300, 400, 3), dtype=np.uint8)).save(path)
+    return path
+
+
+@pytest.fixture
+def no_overview(monkeypatch):
+    # Reduce every level from the source rather than the overview grid
+    monkeypatch.setattr(viewer, 'OVERVIEW_CELLS', 1)
+
+
+@pytest.mark.parametrize('level', [0, 2, 4])
+def test_region_matches_a_direct_reduction(image_path, no_overview, level):
+    handler = AsciiHandler(None, 40)
+    pyramid = TilePyramid(open_strip_source(image_path), handler, chunk_cells=16)
+    rows, columns = pyramid.level_shape(level)
+    expected = reduce_strips(open_strip_source(image_path), rows, columns)
+    char_indices, color_indices = handler.generate_index_maps(expected, rows, columns, False)
+
+    top, left = rows // 3, columns // 4
+    region = pyramid.region(level, top, left, rows - top, columns - left)
+    np.testing.assert_array_equal(region[0], char_indices[top:, left:])
+    np.testing.assert_array_equal(region[1], color_indices[top:, left:])
+
+
+def test_chunks_read_only_their_pixels(image_path, no_overview):
+    pyramid = TilePyramid(open_strip_source(image_path), AsciiHandler(None, 40), chunk_cells=16)
+    rows, columns = pyramid.level_shape(0)
+    start, stop = bin_pixel_range(16, 32, rows, 300)
+    column_start, column_stop = bin_pixel_range(16, 32, columns, 400)
+    profiler.enable()
+    try:
+        pyramid.chunk(0, 1, 1)
+        bytes_read = profiler.counters["strip_bytes_read"]
+    finally:
+        profiler.disable()
+    assert bytes_read == (stop - start) * (column_stop - column_start) * 3
+
+
+def test_chunks_are_evicted_beyond_the_budget():
+    pyramid = TilePyramid(MemoryStrips(np.zeros((64, 64, 3), np.uint8)), AsciiHandler(None, 40),
+                          memory_bytes=1, chunk_cells=8)
+    pyramid.chunk(0, 0, 0)
+    pyramid.chunk(0, 0, 1)
+    pyramid.chunk(0, 0, 1)
+    assert list(pyramid.chunks) == [(0, 0, 1)]
+    assert pyramid.counters == {"chunk_hits": 1, "chunks_built": 2, "chunks_evicted": 1}
+
+
+def test_parse_keys():
+    assert parse_keys('jj\x1b[A+q') == ['j', 'j', '\x1b[A', '+', 'q']
+    assert parse_keys('\x1b') == ['\x1b']
+
+
+def test_navigation_stays_inside_the_level(image_path):
+    pyramid = TilePyramid(open_strip_source(image_path), AsciiHandler(None, 40), chunk_cells=16)
+    view = PyramidViewer(pyramid, stream=io.StringIO(), viewport=(10, 20))
+    view.fit()
+    rows, columns = pyramid.level_shape(view.level)
+    assert rows <= 10 and columns <= 20
+    assert pyramid.level_shape(view.level - 1)[1] > 20 or pyramid.level_shape(view.level - 1)[0] > 10
+
+    for key in '+' * 8 + 'l' * 200 + 'j' * 200:
+        assert view.handle_key(key)
+    view.draw()
+    rows, columns = pyramid.level_shape(view.level)
+    assert view.level == 0 and (view.top, view.left) == (rows - 10, columns - 20)
+    for key in 'hk-':
+        view.handle_key(key)
+    assert view.level == 1 and view.top >= 0 and view.left >= 0
+    assert not view.handle_key('q')
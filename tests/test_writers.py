@@ -0,0 +1,44 @@
+import gzip
+import tracemalloc
+import numpy as np
+from ascii_art.ascii_frame import AsciiFrame
+from ascii_art.color_manager import ColorManager, ColorPalettes
+from ascii_art.writers import write_colored_html, write_monochrome_text
+
+
+def large_frame(rows=2000, columns=2000, seed=0):
+    rng = np.random.default_rng(seed)
+    glyphs = rng.integers(0, 16, size=(rows, columns), dtype=np.uint8)
+    colors = rng.integers(0, 16, size=(rows, columns), dtype=np.uint8)
+    return AsciiFrame(glyphs, colors, list(' .,:"<+[?e=E*%#@'), ColorManager(ColorPalettes.ansi))
+
+
+def test_text_rows_match_to_text():
+    frame = large_frame(50, 70)
+    assert ''.join(row + '\n' for row in frame.text_rows()) == frame.to_text()
+
+
+def test_text_writer_streams_rows(tmp_path, monkeypatch):
+    frame = large_frame()
+    expected = frame.to_text()
+    monkeypatch.setattr(AsciiFrame, 'to_text', lambda self: (_ for _ in ()).throw(AssertionError('joined text')))
+    path = tmp_path / 'frame.txt'
+
+    tracemalloc.start()
+    write_monochrome_text(frame, str(path))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    assert path.read_text(encoding='utf-8') == expected
+    # The text alone is 4 MB; rows are written as they are decoded
+    assert peak < len(expected) // 8
+
+
+def test_html_writer_does_not_join_text(tmp_path, monkeypatch):
+    frame = large_frame(200, 300)
+    monkeypatch.setattr(AsciiFrame, 'to_text', lambda self: (_ for _ in ()).throw(AssertionError('joined text')))
+    path = tmp_path / 'frame.html.gz'
+    write_colored_html(frame, None, frame.color_manager, str(path))
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        document = f.read()
+    assert document.count('\n', document.index('<pre>'), document.index('</pre>')) == 200